@@ -1,18 +1,48 @@
 from pypdf import PdfReader
 
-def extract_text_from_pdf(pdf_path):
+
+def iter_pdf_pages(pdf_path):
+    """
+    逐页提取文本的生成器，每次 yield 一页的文本（空白页跳过）
+    调用方停止迭代时，后面的页不会再被解析
+    """
     reader = PdfReader(pdf_path)
-    full_text = ""
-    
-    # 遍历每一页提取文本
     for page in reader.pages:
         text = page.extract_text()
         if text:
-            full_text += text + "\n"
-            
-    return full_text
+            yield text
+
+
+def extract_text_from_pdf_bounded(pdf_path, max_pages=None, max_chars=None):
+    """
+    有上限的提取：最多解析 max_pages 页、保留 max_chars 个字符，达到任一上限立即停止
+    返回 (文本, 是否被截断)
+    """
+    parts = []
+    chars = 0
+    truncated = False
+    for index, text in enumerate(iter_pdf_pages(pdf_path)):
+        if max_pages is not None and index >= max_pages:
+            truncated = True
+            break
+        if max_chars is not None and chars + len(text) > max_chars:
+            remaining = max_chars - chars
+            if remaining > 0:
+                parts.append(text[:remaining])
+            truncated = True
+            break
+        parts.append(text)
+        chars += len(text) + 1
+
+    return "\n".join(parts), truncated
+
+
+def extract_text_from_pdf(pdf_path):
+    # 遍历每一页提取文本（用 join 拼接，避免逐页 += 的重复拷贝）
+    return "".join(text + "\n" for text in iter_pdf_pages(pdf_path))
 
 # --- 测试代码 ---
 # 你可以在本地随便找个 PDF 简历试试
 # text = extract_text_from_pdf("test_resume.pdf")
-# print(text[:500]) # 打印前500个字看看
\ No newline at end of file
+# print(text[:500]) # 打印前500个字看看
+# text, truncated = extract_text_from_pdf_bounded("test_resume.pdf", max_pages=5, max_chars=4000)
@@ -37,14 +37,50 @@ def _safe_import_ai_advisor():
         return e
 
 
+def _safe_import_extraction_service():
+    """后端的解析进程池（仓库根目录运行时可用；独立部署的简历医生没有 backend 包）"""
+    try:
+        from backend.extraction_service import get_extraction_service  # type: ignore
+        return get_extraction_service()
+    except Exception as e:
+        return e
+
+
+def _safe_import_prompt_packer():
+    """后端的提示词打包（本地估算 token，去页眉页脚，按分节重要程度截断）"""
+    try:
+        from backend import prompt_packer  # type: ignore
+        return prompt_packer
+    except Exception as e:
+        return e
+
+
+# 生成优化版简历时，原始简历在提示词中的 token 预算
+RESUME_PROMPT_TOKEN_BUDGET = 1500
+
+
+def _resume_for_prompt(resume_text: str) -> str:
+    """把原始简历压缩到预算之内；打包模块不可用时退回按字符截断"""
+    prompt_packer = _safe_import_prompt_packer()
+    if isinstance(prompt_packer, Exception):
+        return resume_text[:2000]
+    return prompt_packer.pack_resume(resume_text, budget=RESUME_PROMPT_TOKEN_BUDGET).text
+
+
 def _extract_text_from_pdf(uploaded_file) -> str:
     """
-    兼容两种实现：
+    兼容三种实现：
+    - 若后端解析服务可用，则在独立进程中解析（带超时和页数上限，卡死的解析进程会被重建）
     - 若项目现有 `resume_parser.extract_text_from_pdf` 可用，则优先调用
       - 如果它只能接受路径：会先落盘为临时文件再调用
       - 如果它能接受 file-like：直接传入
     - 否则使用内置兜底（pypdf）从 UploadedFile bytes 中提取
     """
+    # 0) 后端解析服务：解析失败/超时直接报错，不再在页面进程里重新解析一遍
+    extraction_service = _safe_import_extraction_service()
+    if not isinstance(extraction_service, Exception):
+        return extraction_service.extract_sync(uploaded_file.getvalue(), uploaded_file.name or "resume.pdf")
+
     resume_parser = _safe_import_resume_parser()
 
     # 1) 复用项目实现（如果存在）
@@ -257,7 +293,7 @@ def main():
 请根据以下原始简历内容和修改建议，重写一份优化后的简历。
 
 【原始简历】：
-{st.session_state.resume_text[:2000]}
+{_resume_for_prompt(st.session_state.resume_text)}
 
 【修改建议】：
 {json.dumps(analysis_result.get('suggestions', []), ensure_ascii=False)}
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+resume_history.ai_analysis 压缩编码基准脚本
+用模拟的诊断报告 + 优化简历样本，对比明文与压缩格式的行大小、编码/解码耗时；
+加 --mysql 时在当前配置的数据库里建临时表，实测插入和读取延迟（连接结束后临时表自动删除）
+
+用法（在 backend 目录下运行）：
+    python benchmark_history_codec.py [--rows 200] [--mysql]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from history_codec import decode_ai_analysis, encode_ai_analysis
+
+SKILLS = ["Python", "Java", "Go", "MySQL", "Redis", "Kafka", "Docker", "Kubernetes", "Vue3", "React", "PyTorch"]
+VERBS = ["主导", "负责", "参与", "设计并实现", "重构", "优化"]
+RESULTS = ["接口 P99 延迟降低 40%", "日活提升 12%", "部署耗时从 30 分钟缩短到 5 分钟",
+           "人工审核工作量减少一半", "线上故障率下降 60%", "覆盖 20 万用户"]
+
+
+def make_ai_analysis(rng: random.Random) -> str:
+    """生成与 analyze_resume 保存内容结构一致的样本"""
+    projects = []
+    for i in range(rng.randint(3, 6)):
+        bullets = "\n".join(
+            f"- {rng.choice(VERBS)}{rng.choice(SKILLS)}相关模块的开发，使用 {rng.choice(SKILLS)} 和 "
+            f"{rng.choice(SKILLS)}，{rng.choice(RESULTS)}"
+            for _ in range(rng.randint(3, 6))
+        )
+        projects.append(f"### 项目{i + 1}：{rng.choice(SKILLS)} 平台建设（2025.0{rng.randint(1, 9)} - 至今）\n{bullets}")
+    optimized_resume = (
+        "# 张三\n电话：138-0000-0000 | 邮箱：zhangsan@example.com\n\n## 教育背景\n"
+        "某某大学 计算机科学与技术 本科 GPA 3.7/4.0\n\n## 项目经历\n" + "\n\n".join(projects)
+        + "\n\n## 专业技能\n" + "\n".join(f"- 熟悉 {s}" for s in rng.sample(SKILLS, 6))
+    )
+    diagnosis_report = (
+        "# 简历诊断报告\n\n## 综合评分：" + str(rng.randint(60, 95)) + "\n\n## 主要问题\n"
+        + "\n".join(f"- 项目描述缺少量化结果，建议补充{rng.choice(RESULTS)}之类的数据" for _ in range(5))
+        + "\n\n## 优化建议\n" + "\n".join(f"- 突出 {rng.choice(SKILLS)} 方向的深度" for _ in range(6))
+    )
+    return json.dumps({
+        "diagnosis_report": diagnosis_report,
+        "optimized_resume": optimized_resume,
+        "fallback": False,
+    }, ensure_ascii=False)
+
+
+def timed_each(fn, items):
+    """逐条执行并返回每条耗时（毫秒）"""
+    costs = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        costs.append((time.perf_counter() - started) * 1000)
+    return costs
+
+
+def describe(label: str, costs):
+    costs = sorted(costs)
+    p95 = costs[int(len(costs) * 0.95) - 1] if len(costs) >= 20 else costs[-1]
+    print(f"  {label:<20} 平均 {statistics.mean(costs):8.3f} ms，P95 {p95:8.3f} ms")
+
+
+def bench_mysql(plain_rows, encoded_rows):
+    from db_config import get_db_cursor
+
+    conn, cursor = get_db_cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE bench_resume_history ("
+            " id INT AUTO_INCREMENT PRIMARY KEY, ai_analysis TEXT NOT NULL"
+            ") DEFAULT CHARSET=utf8mb4"
+        )
+        for label, rows in (("明文", plain_rows), ("压缩", encoded_rows)):
+            cursor.execute("TRUNCATE TABLE bench_resume_history")
+
+            def insert(value):
+                cursor.execute("INSERT INTO bench_resume_history (ai_analysis) VALUES (%s)", (value,))
+                conn.commit()
+
+            describe(f"{label}插入", timed_each(insert, rows))
+            cursor.execute("SELECT id FROM bench_resume_history")
+            ids = [row["id"] for row in cursor.fetchall()]
+
+            def read(row_id):
+                cursor.execute("SELECT ai_analysis FROM bench_resume_history WHERE id = %s", (row_id,))
+                decode_ai_analysis(cursor.fetchone()["ai_analysis"])
+
+            describe(f"{label}读取+解码", timed_each(read, ids))
+            cursor.execute("SELECT SUM(LENGTH(ai_analysis)) AS total FROM bench_resume_history")
+            print(f"  {label}列总字节数          {int(cursor.fetchone()['total'] or 0) / 1024:8.1f} KB")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ai_analysis 压缩编码基准")
+    parser.add_argument("--rows", type=int, default=200, help="样本行数")
+    parser.add_argument("--mysql", action="store_true", help="在当前配置的 MySQL 中实测插入/读取延迟")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    plain_rows = [make_ai_analysis(rng) for _ in range(args.rows)]
+    print("=" * 60)
+    print(f"ai_analysis 压缩编码基准：{args.rows} 行样本")
+    print("=" * 60)
+
+    encoded_rows = [encode_ai_analysis(v) for v in plain_rows]
+    assert all(decode_ai_analysis(e) == p for e, p in zip(encoded_rows, plain_rows)), "解码结果与原文不一致"
+
+    plain_sizes = [len(v.encode("utf-8")) for v in plain_rows]
+    encoded_sizes = [len(v.encode("utf-8")) for v in encoded_rows]
+    print("\n[行大小]")
+    print(f"  明文平均 {statistics.mean(plain_sizes) / 1024:6.1f} KB，压缩后平均 {statistics.mean(encoded_sizes) / 1024:6.1f} KB，"
+          f"压缩比 {sum(encoded_sizes) / sum(plain_sizes):.0%}")
+
+    print("\n[编码/解码耗时（不含数据库）]")
+    describe("编码", timed_each(encode_ai_analysis, plain_rows))
+    describe("解码", timed_each(decode_ai_analysis, encoded_rows))
+
+    if args.mysql:
+        print("\n[MySQL 实测]")
+        try:
+            bench_mysql(plain_rows, encoded_rows)
+        except Exception as e:
+            print(f"❌ MySQL 实测失败: {e}")
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
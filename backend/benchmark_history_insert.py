@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+简历历史记录插入延迟基准
+对比旧写法（每次插入前执行 SET NAMES / SET CHARACTER SET / SET character_set_connection 三条语句）
+与连接池会话初始化（每条物理连接只执行一次 build_session_init_sql()）的单次插入耗时和语句数
+
+默认用模拟数据库：每条语句（含 commit）加一段固定延迟（--rtt-ms），模拟云数据库的网络往返；
+加 --mysql 时在当前配置的数据库里建临时表实测（连接池限制为 1 条连接，连接结束后临时表自动删除），
+并打印连接上实际生效的会话变量
+
+用法（在 backend 目录下运行）：
+    python benchmark_history_insert.py [--rows 300] [--rtt-ms 2]
+    python benchmark_history_insert.py --mysql
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import db_config
+from benchmark_history_codec import make_ai_analysis
+from history_codec import encode_ai_analysis
+
+LEGACY_SESSION_SQL = [
+    "SET NAMES utf8mb4",
+    "SET CHARACTER SET utf8mb4",
+    "SET character_set_connection=utf8mb4",
+]
+
+
+class _FakeRaw:
+    """模拟的 pymysql 连接：每次 execute / commit / ping 都是一次往返"""
+
+    statements = 0
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.open = True
+        self.lastrowid = 0
+
+    def _round_trip(self):
+        _FakeRaw.statements += 1
+        time.sleep(self.rtt)
+
+    def cursor(self):
+        raw = self
+
+        class _Cursor:
+            lastrowid = 0
+
+            def execute(self, sql, params=()):
+                raw._round_trip()
+                if sql.lstrip().upper().startswith("INSERT"):
+                    raw.lastrowid += 1
+                    self.lastrowid = raw.lastrowid
+
+            def close(self):
+                pass
+
+        return _Cursor()
+
+    def commit(self):
+        self._round_trip()
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        self._round_trip()
+
+    def close(self):
+        self.open = False
+
+
+def insert_once(table: str, ai_analysis: str, legacy: bool) -> float:
+    """按 create_resume_history 的语句顺序插入一条记录，返回耗时（毫秒）"""
+    started = time.perf_counter()
+    with db_config.db_cursor() as (conn, cursor):
+        if legacy:
+            for sql in LEGACY_SESSION_SQL:
+                cursor.execute(sql)
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, resume_type, resume_file_url, ai_analysis, created_at) "
+            f"VALUES (%s, %s, %s, %s, NOW())",
+            (1, "normal", "text_input_bench", ai_analysis),
+        )
+        conn.commit()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(label: str, table: str, samples, legacy: bool):
+    _FakeRaw.statements = 0
+    costs = sorted(insert_once(table, value, legacy) for value in samples)
+    line = f"  {label:<32} 平均 {statistics.mean(costs):7.2f} ms，P95 {costs[int(len(costs) * 0.95) - 1]:7.2f} ms"
+    if _FakeRaw.statements:
+        line += f"，每次插入 {_FakeRaw.statements / len(samples):.1f} 次往返"
+    print(line)
+    return statistics.mean(costs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="简历历史记录插入延迟基准")
+    parser.add_argument("--rows", type=int, default=300, help="每种写法插入的行数")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="模拟数据库每次往返的延迟（毫秒）")
+    parser.add_argument("--mysql", action="store_true", help="在当前配置的 MySQL 中实测")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    samples = [encode_ai_analysis(make_ai_analysis(rng)) for _ in range(args.rows)]
+
+    # 单连接：模拟数据库下等价于连接复用的稳定状态；真实数据库下保证临时表可见
+    os.environ["DB_POOL_MIN_SIZE"] = "1"
+    os.environ["DB_POOL_MAX_SIZE"] = "1"
+    if args.mysql:
+        table = "bench_resume_history"
+        target = "当前配置的 MySQL（临时表）"
+        with db_config.db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {table} ("
+                "id INT AUTO_INCREMENT PRIMARY KEY, user_id INT NOT NULL, resume_type VARCHAR(20), "
+                "resume_file_url VARCHAR(500), ai_analysis TEXT, created_at DATETIME"
+                ") DEFAULT CHARSET=utf8mb4"
+            )
+            cursor.execute("SELECT @@character_set_connection AS charset, @@sql_mode AS sql_mode, "
+                           "@@time_zone AS time_zone")
+            session = cursor.fetchone()
+    else:
+        rtt = args.rtt_ms / 1000
+        db_config._open_raw_connection = lambda: _FakeRaw(rtt)
+        table = "resume_history"
+        target = f"模拟数据库（每次往返 {args.rtt_ms} ms）"
+        session = None
+
+    print("=" * 60)
+    print(f"简历历史记录插入延迟：每种写法 {args.rows} 行，{target}")
+    print("=" * 60)
+    print(f"  会话初始化语句：{db_config.build_session_init_sql()}")
+    if session:
+        print(f"  连接上的会话变量：{session}")
+
+    legacy = run("旧写法（每次 3 条 SET + INSERT）", table, samples, legacy=True)
+    pooled = run("会话初始化（仅 INSERT）", table, samples, legacy=False)
+    print(f"\n[结论] 单次插入平均耗时降低 {(1 - pooled / legacy):.0%}")
+    db_config.close_db_pool()
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
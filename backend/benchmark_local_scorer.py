@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地规则量化基准脚本
+在一份样例语料上统计本地规则能拦截多少 DeepSeek 量化请求，以及本地量化的耗时
+
+用法（在 backend 目录下运行）：
+    python benchmark_local_scorer.py [--llm-latency 3.0] [--rules data/score_rules.json]
+"""
+import sys
+import time
+import argparse
+
+from local_scorer import LocalScorer, DEFAULT_RULES_PATH
+
+# 竞争力分析表单的样例输入：(维度名称, 用户输入)
+FORM_CORPUS = [
+    ("GPA", "3.8/4.0"), ("GPA", "GPA 3.5/4"), ("GPA", "绩点3.6"), ("GPA", "排名前10%"),
+    ("GPA", "专业排名前5%"), ("GPA", "排名 12/150"), ("GPA", "国家奖学金"), ("GPA", "保研"),
+    ("GPA", "一等奖学金"), ("GPA", "中等偏上吧"), ("GPA", "挂过一科"), ("GPA", "4.5/5"),
+    ("项目实战经验", "两个项目"), ("项目实战经验", "3个完整项目"), ("项目实战经验", "无"),
+    ("项目实战经验", "做过一个课程项目"), ("项目实战经验", "开源项目贡献者"),
+    ("项目实战经验", "参与过实验室的横向课题"), ("项目实战经验", "5个项目"),
+    ("项目实战经验", "写过一些小工具"),
+    ("名企实习经历", "字节实习3个月"), ("名企实习经历", "腾讯实习半年"), ("名企实习经历", "无"),
+    ("名企实习经历", "两段实习"), ("名企实习经历", "国企实习2个月"), ("名企实习经历", "阿里"),
+    ("名企实习经历", "创业公司实习6个月"), ("名企实习经历", "在家里亲戚公司帮忙"),
+    ("名企实习经历", "微软 6个月"),
+    ("竞赛获奖情况", "省一"), ("竞赛获奖情况", "省二"), ("竞赛获奖情况", "国二"),
+    ("竞赛获奖情况", "校级"), ("竞赛获奖情况", "全国一等奖"), ("竞赛获奖情况", "美赛M奖"),
+    ("竞赛获奖情况", "无"), ("竞赛获奖情况", "蓝桥杯省一"), ("竞赛获奖情况", "数模国三"),
+    ("竞赛获奖情况", "ACM区域赛铜牌"),
+    ("英语学术能力", "六级560"), ("英语学术能力", "CET-6 520"), ("英语学术能力", "雅思7"),
+    ("英语学术能力", "托福105"), ("英语学术能力", "四级"), ("英语学术能力", "六级"),
+    ("英语学术能力", "专八"), ("英语学术能力", "能看懂英文文献"), ("英语学术能力", "IELTS 6.5"),
+    ("领导力与协作", "班长"), ("领导力与协作", "学生会主席"), ("领导力与协作", "社团社长"),
+    ("领导力与协作", "无"), ("领导力与协作", "项目负责人"), ("领导力与协作", "参与团队协作"),
+    ("领导力与协作", "团队里经常带节奏"), ("领导力与协作", "班委"),
+]
+
+# 自然语言量化接口的样例输入
+TEXT_CORPUS = [
+    "GPA 3.8/4.0，排名前10%，做过两个项目，字节实习3个月，省一，六级560，班长",
+    "绩点3.5，3个项目，腾讯实习6个月，国二，雅思7，学生会主席",
+    "专业排名前20%，一个课程项目，没有实习，校级奖，四级，普通成员",
+    "成绩中等，项目经验比较少，英语一般",
+    "GPA 3.2/4，2个项目，两段实习，省三，六级480，团支书",
+]
+
+
+def run_form_benchmark(scorer: LocalScorer, llm_latency: float):
+    print("\n[表单维度量化]")
+    hits = 0
+    started = time.perf_counter()
+    for dimension, value in FORM_CORPUS:
+        result = scorer.score(value, dimension)
+        confident = scorer.is_confident(result)
+        hits += confident
+        mark = "✅" if confident else "🔄"
+        detail = f"{result.score} 分 / 置信度 {result.confidence}" if result else "未识别"
+        print(f"  {mark} {dimension:<8} {value:<16} → {detail}")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    total = len(FORM_CORPUS)
+    print(f"\n  样本数: {total}，本地命中: {hits}，需要 LLM: {total - hits}")
+    print(f"  LLM 请求减少: {hits / total:.1%}")
+    print(f"  本地量化总耗时: {elapsed_ms:.2f} ms（平均 {elapsed_ms / total:.3f} ms/条）")
+    print(f"  按单次 LLM {llm_latency:.1f}s 估算，逐条调用可节省约 {hits * llm_latency:.1f}s")
+    return hits, total
+
+
+def run_text_benchmark(scorer: LocalScorer):
+    print("\n[自然语言量化]")
+    skipped = 0
+    for text in TEXT_CORPUS:
+        results = scorer.score_text(text)
+        confident = {dim: r.score for dim, r in results.items() if scorer.is_confident(r)}
+        full = len(confident) == len(scorer.dimensions)
+        skipped += full
+        mark = "✅" if full else "🔄"
+        print(f"  {mark} {text[:36]}... → {confident}")
+    print(f"\n  样本数: {len(TEXT_CORPUS)}，完全无需 LLM: {skipped}")
+    return skipped, len(TEXT_CORPUS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地规则量化基准")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="规则文件路径")
+    parser.add_argument("--llm-latency", type=float, default=3.0, help="单次 DeepSeek 量化的估计耗时（秒）")
+    parser.add_argument("--repeat", type=int, default=1000, help="吞吐测试的重复轮数")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("本地规则量化基准")
+    print("=" * 60)
+    scorer = LocalScorer.from_file(args.rules)
+    print(f"规则文件: {args.rules}（版本 {scorer.version}，阈值 {scorer.min_confidence}）")
+
+    hits, total = run_form_benchmark(scorer, args.llm_latency)
+    run_text_benchmark(scorer)
+
+    print(f"\n[吞吐]")
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for dimension, value in FORM_CORPUS:
+            scorer.score(value, dimension)
+    elapsed = time.perf_counter() - started
+    calls = args.repeat * len(FORM_CORPUS)
+    print(f"  {calls} 次量化耗时 {elapsed:.2f}s，约 {calls / elapsed:,.0f} 次/秒")
+    return hits > 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
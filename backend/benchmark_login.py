@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录路径微基准
+对比旧登录路径（user_login 验证 + get_user_by_username 取资料，两次借连接、两次 SELECT *）
+与 authenticate_user（一次借连接、一次投影查询）的数据库往返次数和耗时
+
+默认用模拟数据库：每次借连接、每次查询各加一段固定延迟（--rtt-ms），模拟云数据库的网络往返；
+加 --mysql 时对当前配置的真实数据库测试（需要 --username/--password 指定一个可登录的账号）
+
+用法（在 backend 目录下运行）：
+    python benchmark_login.py [--logins 500] [--rtt-ms 2] [--threads 16]
+    python benchmark_login.py --mysql --username alice --password 123456
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import db_config
+
+# 模拟 users 表的一行（带几个登录用不到的大字段）
+FAKE_USER = {
+    "id": 1, "username": "alice", "password": "secret123", "grade": "大三", "target_role": "后端开发",
+    "nickname": "Alice", "email": "alice@example.com", "phone": "13800000000", "department": "",
+    "city": "北京", "avatar": "https://example.com/static/avatars/alice.png",
+    "createTaskNum": 12, "uploadedResumeNum": 3,
+}
+
+
+class _Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquires = 0
+        self.queries = 0
+
+    def reset(self):
+        with self.lock:
+            self.acquires = self.queries = 0
+
+
+class _FakeCursor:
+    def __init__(self, counter: _Counter, rtt: float):
+        self.counter, self.rtt = counter, rtt
+        self.row = None
+
+    def execute(self, sql, params=()):
+        with self.counter.lock:
+            self.counter.queries += 1
+        time.sleep(self.rtt)
+        if params and params[0] == FAKE_USER["username"]:
+            if sql.lstrip().upper().startswith("SELECT *"):
+                self.row = dict(FAKE_USER)
+            else:
+                columns = sql.split("SELECT", 1)[1].split("FROM", 1)[0]
+                self.row = {c.strip(): FAKE_USER[c.strip()] for c in columns.split(",")}
+        else:
+            self.row = None
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class _FakeConn:
+    def close(self):
+        pass
+
+
+def install_fake_db(rtt_ms: float) -> _Counter:
+    counter = _Counter()
+    rtt = rtt_ms / 1000
+
+    def fake_get_db_cursor():
+        with counter.lock:
+            counter.acquires += 1
+        # 借连接时的 ping / 建连同样是一次往返
+        time.sleep(rtt)
+        return _FakeConn(), _FakeCursor(counter, rtt)
+
+    db_config.get_db_cursor = fake_get_db_cursor
+    return counter
+
+
+def old_login(username: str, password: str):
+    """与改造前 /api/login 的调用顺序一致"""
+    success, message = db_config.user_login(username, password)
+    if not success:
+        return None
+    return db_config.get_user_by_username(username)
+
+
+def new_login(username: str, password: str):
+    success, _, profile = db_config.authenticate_user(username, password)
+    return profile if success else None
+
+
+def run(label: str, fn, username: str, password: str, logins: int, threads: int, counter=None):
+    if counter is not None:
+        counter.reset()
+    costs = []
+
+    def one(_):
+        started = time.perf_counter()
+        assert fn(username, password) is not None, "登录失败，请检查账号密码"
+        costs.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(logins)))
+    elapsed = time.perf_counter() - started
+    costs.sort()
+    line = (f"  {label:<28} 平均 {statistics.mean(costs):7.2f} ms，P95 {costs[int(len(costs) * 0.95) - 1]:7.2f} ms，"
+            f"吞吐 {logins / elapsed:8.1f} 次/秒")
+    if counter is not None:
+        line += f"，每次登录借连接 {counter.acquires / logins:.1f} 次、查询 {counter.queries / logins:.1f} 次"
+    print(line)
+    return statistics.mean(costs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录路径微基准")
+    parser.add_argument("--logins", type=int, default=500, help="登录次数")
+    parser.add_argument("--threads", type=int, default=16, help="并发线程数（模拟开学登录高峰）")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="模拟数据库每次往返的延迟（毫秒）")
+    parser.add_argument("--mysql", action="store_true", help="对真实数据库测试")
+    parser.add_argument("--username", default=FAKE_USER["username"])
+    parser.add_argument("--password", default=FAKE_USER["password"])
+    args = parser.parse_args()
+
+    counter = None
+    if args.mysql:
+        target = "当前配置的 MySQL"
+    else:
+        counter = install_fake_db(args.rtt_ms)
+        target = f"模拟数据库（每次往返 {args.rtt_ms} ms）"
+    print("=" * 60)
+    print(f"登录路径微基准：{args.logins} 次登录，{args.threads} 个并发线程，{target}")
+    print("=" * 60)
+
+    # 旧路径中的 get_user_by_username 现在会经过用户缓存；登录高峰时大多是各不相同的用户，
+    # 这里关闭缓存，测的是每个用户首次登录的成本
+    db_config.user_cache.ttl = 0
+    old = run("旧路径（验证 + 取资料）", old_login, args.username, args.password, args.logins, args.threads, counter)
+    new = run("authenticate_user（单次查询）", new_login, args.username, args.password, args.logins, args.threads, counter)
+    print(f"\n[结论] 单次登录平均耗时降低 {(1 - new / old):.0%}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户资料存储基准脚本
+对比旧的 profiles.csv（读取线性扫描、写入整表重写）与 SQLite 资料存储在大量用户下的读写耗时，
+同时验证从 CSV 一次性迁移的正确性和耗时
+
+用法（在 backend 目录下运行，数据写在临时目录中，不影响 data/）：
+    python benchmark_profile_store.py [--users 100000] [--reads 2000] [--writes 500] [--csv-ops 20]
+"""
+import os
+import csv
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import threading
+
+from profile_store import ProfileStore, PROFILE_FIELDS
+
+
+def make_profile(i: int) -> dict:
+    return {
+        "username": f"user{i:06d}",
+        "avatar": f"https://example.com/static/avatars/user{i:06d}.png",
+        "email": f"user{i:06d}@example.com",
+        "phone": f"138{i:08d}",
+        "city": random.choice(["北京", "上海", "广州", "深圳", "杭州"]),
+        "style": "专业正式",
+        "file_format": "PDF",
+        "notify": "True",
+        "auto_save": "True",
+    }
+
+
+# ---------- 旧实现：与原 main.py 中的 CSV 读写逻辑一致 ----------
+def csv_get(path: str, username: str):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            if row.get("username") == username:
+                return row
+    return None
+
+
+def csv_update_avatar(path: str, username: str, avatar: str):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        profiles = list(csv.DictReader(f))
+    for row in profiles:
+        if row.get("username") == username:
+            row["avatar"] = avatar
+            break
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+        writer.writeheader()
+        writer.writerows(profiles)
+
+
+def timed(label: str, ops: int, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    per_op_ms = elapsed * 1000 / ops if ops else 0.0
+    print(f"  {label:<28} {ops:>6} 次，总耗时 {elapsed:8.3f}s，平均 {per_op_ms:9.3f} ms/次")
+    return per_op_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户资料存储基准")
+    parser.add_argument("--users", type=int, default=100000, help="用户数")
+    parser.add_argument("--reads", type=int, default=2000, help="SQLite 随机读取次数")
+    parser.add_argument("--writes", type=int, default=500, help="SQLite 随机更新次数")
+    parser.add_argument("--csv-ops", type=int, default=20, help="CSV 读取/更新次数（整表操作很慢，次数不宜过多）")
+    parser.add_argument("--threads", type=int, default=8, help="并发写入线程数")
+    args = parser.parse_args()
+
+    random.seed(42)
+    workdir = tempfile.mkdtemp(prefix="profile_bench_")
+    csv_path = os.path.join(workdir, "profiles.csv")
+    db_path = os.path.join(workdir, "profiles.db")
+    print("=" * 60)
+    print(f"用户资料存储基准：{args.users:,} 个用户（临时目录 {workdir}）")
+    print("=" * 60)
+
+    try:
+        profiles = [make_profile(i) for i in range(args.users)]
+        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(profiles)
+        print(f"CSV 文件大小: {os.path.getsize(csv_path) / 1024 / 1024:.1f} MB")
+
+        print("\n[迁移]")
+        store = ProfileStore(db_path)
+        started = time.perf_counter()
+        imported = store.migrate_from_csv(csv_path)
+        print(f"  导入 {imported:,} 条，耗时 {time.perf_counter() - started:.2f}s，库中共 {store.count():,} 条")
+        sample = random.choice(profiles)
+        assert store.get(sample["username"]) == sample, "迁移后数据不一致"
+        assert store.migrate_from_csv(csv_path) == 0, "重复迁移应被跳过"
+        print("  ✅ 抽样校验一致，重复迁移已跳过")
+
+        names = [p["username"] for p in profiles]
+        print("\n[旧实现：profiles.csv]")
+        csv_read = timed("读取（线性扫描）", args.csv_ops,
+                         lambda: [csv_get(csv_path, random.choice(names)) for _ in range(args.csv_ops)])
+        csv_write = timed("更新头像（整表重写）", args.csv_ops,
+                          lambda: [csv_update_avatar(csv_path, random.choice(names), "new.png") for _ in range(args.csv_ops)])
+
+        print("\n[新实现：SQLite WAL]")
+        db_read = timed("读取（主键查询）", args.reads,
+                        lambda: [store.get(random.choice(names)) for _ in range(args.reads)])
+        db_write = timed("更新头像（单行 upsert）", args.writes,
+                         lambda: [store.update_fields(random.choice(names), avatar="new.png") for _ in range(args.writes)])
+        timed("整行保存资料", args.writes,
+              lambda: [store.upsert(dict(make_profile(random.randrange(args.users)), city="成都")) for _ in range(args.writes)])
+
+        # 并发写入：每个线程写自己的一批用户，结束后逐条校验没有丢失更新
+        print(f"\n[并发写入：{args.threads} 个线程]")
+        per_thread = max(args.writes // args.threads, 1)
+
+        def worker(tid: int):
+            for j in range(per_thread):
+                store.update_fields(f"user{tid * per_thread + j:06d}", city=f"城市{tid}")
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(args.threads)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        lost = sum(
+            1 for t in range(args.threads) for j in range(per_thread)
+            if store.get(f"user{t * per_thread + j:06d}")["city"] != f"城市{t}"
+        )
+        print(f"  {args.threads * per_thread} 次更新耗时 {elapsed:.3f}s，丢失更新: {lost}")
+
+        print("\n[结论]")
+        print(f"  读取提速约 {csv_read / max(db_read, 1e-6):,.0f} 倍，更新提速约 {csv_write / max(db_write, 1e-6):,.0f} 倍")
+        store.close()
+        return lost == 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+熔断器（circuit breaker）
+云数据库不可达时，每个请求借连接都要等 connect_timeout（10 秒）× 重试次数，线程被大量占住。
+熔断器在连续失败达到阈值后直接拒绝请求，只按固定间隔放行一次探测：
+- closed（正常）：请求正常放行，连续失败 failure_threshold 次后转为 open
+- open（熔断）：请求立即失败（CircuitOpenError），reset_timeout 秒后转为 half_open
+- half_open（探测）：只放行一个探测请求，成功则恢复 closed，失败则重新 open 并重新计时；
+  探测进行中的其他请求仍立即失败
+
+熔断器只负责状态机，成功/失败由调用方记录（见 db_config.get_db_cursor）。本模块只依赖标准库
+"""
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断中，请求被直接拒绝；retry_in 为距离下次探测的秒数"""
+
+    def __init__(self, name: str, retry_in: float, last_error: Optional[str] = None):
+        self.retry_in = retry_in
+        self.last_error = last_error
+        super().__init__(f"{name} 熔断中，{retry_in:.0f} 秒后重试（最近错误：{last_error or '未知'}）")
+
+
+class CircuitBreaker:
+    """
+    线程安全的熔断器
+
+    - failure_threshold: 连续失败多少次后熔断
+    - reset_timeout: 熔断后多少秒放行一次探测
+    - on_open(): 每次进入 open 状态后调用（在锁外），例如丢弃连接池中可能已失效的空闲连接
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 2, reset_timeout: float = 15.0,
+                 on_open: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.on_open = on_open
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_success_at: Optional[float] = None
+        self._last_failure_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._stats = {"rejected": 0, "opened": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> bool:
+        """
+        请求前调用：放行时返回是否为 half_open 探测请求，拒绝时抛出 CircuitOpenError
+
+        返回 True 的调用方必须在结束时调用 end_probe()（无论成功与否）
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._stats["probes"] += 1
+                return True
+            self._stats["rejected"] += 1
+            retry_in = max(self.reset_timeout - (now - self._opened_at), 0.0)
+            raise CircuitOpenError(self.name, retry_in, self._last_error)
+
+    def end_probe(self):
+        """探测请求结束；若既未记录成功也未记录失败（如连接池等待超时），释放探测名额给下一个请求"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._last_success_at = time.time()
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self._failures += 1
+            self._last_failure_at = time.time()
+            self._last_error = str(error)
+            opened = self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold)
+            if opened:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+        if opened:
+            print(f"⚠️ [circuit_breaker] {self.name} 已熔断，{self.reset_timeout:.0f} 秒后探测：{error}")
+            if self.on_open is not None:
+                try:
+                    self.on_open()
+                except Exception as e:
+                    print(f"⚠️ [circuit_breaker] 熔断回调失败：{e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0), 1)
+            return dict(self._stats, state=self._state, consecutive_failures=self._failures, retry_in=retry_in,
+                        last_success_at=self._last_success_at, last_failure_at=self._last_failure_at,
+                        last_error=self._last_error, failure_threshold=self.failure_threshold,
+                        reset_timeout=self.reset_timeout)
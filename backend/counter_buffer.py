@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+用户计数字段写回缓冲（write-behind）
+/api/resume/upload、/api/resume/delete、/api/user/addTask 每次都要借一个连接执行一条
+UPDATE users SET field = field ± 1。这里先在内存中按 (username, field) 合并增量，
+由后台线程按时间间隔或待写条目数阈值批量写回：
+- 写回函数一次收到全部合并后的增量（db_config 中用每个字段一条多行 UPDATE 完成，单个事务）
+- 写回失败时增量合并回缓冲区，下次重试，不会丢失
+- 服务停止时同步写回（close）
+- 读取时把尚未写回（含正在写回）的增量叠加到查询结果上，用户看到的计数始终准确
+
+读取一致性：写回函数执行完 UPDATE、即将 COMMIT 时调用 begin_commit()，generation 加一（奇数表示正在提交），
+提交完成、写回中的增量移出缓冲区时再加一。未提交的 UPDATE 对其他连接不可见，因此读取时记下 generation，
+查询结束后若 generation 仍是同一个偶数，查到的行与 "待写 + 写回中" 的增量不会重复也不会遗漏。
+读取不等待写回：多行 UPDATE 执行期间照常读取、叠加写回中的增量；只有查询恰好与 COMMIT 重叠时才重试
+
+本模块只依赖标准库
+"""
+import time
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+class CounterBuffer:
+    """
+    计数增量缓冲
+
+    - flush_fn(deltas, begin_commit): 把 {(username, field): delta} 写入数据库，在 COMMIT 之前调用 begin_commit()，
+      失败时抛出异常
+    - interval: 后台写回间隔（秒）
+    - max_pending: 待写条目数达到该值时立即唤醒后台线程写回
+    - on_flushed(usernames): 写回提交后、增量从缓冲区移除前调用（用于失效用户缓存）
+    """
+
+    def __init__(self, flush_fn: Callable[[Dict[Key, int], Callable[[], None]], None], interval: float = 2.0,
+                 max_pending: int = 500, on_flushed: Optional[Callable[[Iterable[str]], None]] = None):
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_pending = max_pending
+        self.on_flushed = on_flushed
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Key, int] = {}
+        self._inflight: Dict[Key, int] = {}
+        self._generation = 0
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"adds": 0, "flushes": 0, "rows_flushed": 0, "failures": 0}
+
+    def _ensure_thread(self):
+        """首次写入时启动后台写回线程（需持有 _cond）"""
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="counter-buffer-flush", daemon=True)
+            self._thread.start()
+
+    def add(self, username: str, field: str, delta: int):
+        """累加一个增量；关闭后调用直接同步写回，保证不丢"""
+        if not delta:
+            return
+        with self._cond:
+            key = (username, field)
+            merged = self._pending.get(key, 0) + delta
+            if merged:
+                self._pending[key] = merged
+            else:
+                self._pending.pop(key, None)
+            self._stats["adds"] += 1
+            closed = self._closed
+            if not closed:
+                self._ensure_thread()
+                if len(self._pending) >= self.max_pending:
+                    self._wakeup.set()
+        if closed:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ [counter_buffer] 计数写回失败，增量保留在缓冲区：{e}")
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._closed:
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ [counter_buffer] 计数写回失败，稍后重试：{e}")
+
+    def flush(self) -> int:
+        """把当前所有增量同步写回数据库，返回写回的条目数；失败时增量放回缓冲区并抛出异常"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+                deltas = dict(self._inflight)
+            try:
+                self.flush_fn(deltas, self._begin_commit)
+            except Exception:
+                with self._cond:
+                    for key, delta in self._inflight.items():
+                        merged = self._pending.get(key, 0) + delta
+                        if merged:
+                            self._pending[key] = merged
+                        else:
+                            self._pending.pop(key, None)
+                    self._inflight = {}
+                    self._end_commit()
+                    self._stats["failures"] += 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                if self.on_flushed is not None:
+                    try:
+                        self.on_flushed({username for username, _ in deltas})
+                    except Exception as e:
+                        print(f"⚠️ [counter_buffer] 写回后回调失败：{e}")
+                self._inflight = {}
+                self._end_commit()
+                self._stats["flushes"] += 1
+                self._stats["rows_flushed"] += len(deltas)
+                self._cond.notify_all()
+            return len(deltas)
+
+    def _begin_commit(self):
+        """写回函数在 COMMIT 前调用：此后查到的行可能已包含写回中的增量"""
+        with self._cond:
+            self._generation += 1   # 奇数：正在提交
+
+    def _end_commit(self):
+        """提交结束（成功或失败）且写回中的增量已处理，需持有 _cond；没有进入提交阶段时同样让 generation 前进"""
+        self._generation += 1 if self._generation % 2 else 2
+
+    def _snapshot(self, generation: int) -> Optional[Dict[Key, int]]:
+        """generation 是偶数且未变化时返回 "待写 + 写回中" 的增量快照，否则返回 None（需持有 _cond）"""
+        if generation % 2 or self._generation != generation:
+            return None
+        snapshot = dict(self._pending)
+        for key, delta in self._inflight.items():
+            snapshot[key] = snapshot.get(key, 0) + delta
+        return snapshot
+
+    def consistent_read(self, loader: Callable[[], object]) -> Tuple[object, Dict[Key, int]]:
+        """
+        执行 loader() 查询，并返回与查询结果一致的未写回增量快照 {(username, field): delta}
+
+        不等待正在执行的写回（包括缓存命中的读取）；查询与 COMMIT 重叠时重试一次，
+        仍然重叠时才等 COMMIT 结束后再读。调用方把快照中的增量叠加到结果上即可
+        """
+        for _ in range(2):
+            with self._cond:
+                generation = self._generation
+            result = loader()
+            with self._cond:
+                snapshot = self._snapshot(generation)
+            if snapshot is not None:
+                return result, snapshot
+        while True:
+            with self._cond:
+                while self._generation % 2:
+                    self._cond.wait()
+                generation = self._generation
+            result = loader()
+            with self._cond:
+                snapshot = self._snapshot(generation)
+            if snapshot is not None:
+                return result, snapshot
+
+    async def aconsistent_read(self, loader: Callable[[], Awaitable[object]]) -> Tuple[object, Dict[Key, int]]:
+        """consistent_read 的异步版本：COMMIT 期间让出事件循环轮询等待，不阻塞其他协程"""
+        while True:
+            with self._cond:
+                generation = self._generation
+            if generation % 2:
+                await asyncio.sleep(0.005)
+                continue
+            result = await loader()
+            with self._cond:
+                snapshot = self._snapshot(generation)
+            if snapshot is not None:
+                return result, snapshot
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending) + len(self._inflight)
+
+    def close(self, timeout: float = 10.0):
+        """停止后台线程并同步写回剩余增量（服务停止时调用）"""
+        with self._cond:
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None:
+            thread.join(timeout=timeout)
+        deadline = time.time() + timeout
+        while True:
+            try:
+                self.flush()
+                return
+            except Exception as e:
+                if time.time() >= deadline:
+                    print(f"❌ [counter_buffer] 停止时写回失败，{self.pending_count()} 条计数增量未保存：{e}")
+                    return
+                time.sleep(0.5)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending), inflight=len(self._inflight),
+                        interval=self.interval, max_pending=self.max_pending)
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+异步 MySQL 数据库操作（aiomysql）
+db_config.py 全部基于阻塞的 PyMySQL，async 接口里每次查库都要经过线程池。
+这里用 aiomysql 提供同名的异步函数（get_user_by_username、create_resume_history、
+get_resume_history_by_user_id……），参数、返回值和日志与 db_config 保持一致：
+- 连接配置与 db_config.get_db_config() 相同（DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME/DB_CHARSET/DB_SSL），
+  连接池大小沿用 DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_MAX_LIFETIME / DB_POOL_TIMEOUT
+- 与同步实现共用用户缓存、计数写回缓冲和 ai_analysis 压缩编码，两种实现可以在同一进程中混用
+- 连接池绑定创建它的事件循环，换了事件循环（如脚本中多次 asyncio.run）会自动重建
+
+通过 DB_BACKEND=async 选择（见 db_backend.py）；aiomysql 为可选依赖，未安装时调用会抛出 RuntimeError
+"""
+import ssl
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None  # 未安装时只有选择 async 后端才会报错
+
+try:
+    from .db_config import (
+        COUNTER_FIELDS, LOGIN_COLUMNS, RESUME_HISTORY_LIST_COLUMNS,
+        DatabaseUnavailableError, _apply_pending_counters, _env_int, build_session_init_sql, counter_buffer,
+        db_breaker, get_db_config, user_cache,
+    )
+    from .circuit_breaker import CircuitOpenError
+    from .history_codec import decode_ai_analysis, encode_ai_analysis
+except ImportError:
+    # 在 backend 目录下直接运行脚本时不是包导入
+    from db_config import (
+        COUNTER_FIELDS, LOGIN_COLUMNS, RESUME_HISTORY_LIST_COLUMNS,
+        DatabaseUnavailableError, _apply_pending_counters, _env_int, build_session_init_sql, counter_buffer,
+        db_breaker, get_db_config, user_cache,
+    )
+    from circuit_breaker import CircuitOpenError
+    from history_codec import decode_ai_analysis, encode_ai_analysis
+
+
+name = "async"  # db_backend 用于区分后端
+
+_pool = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+def _pool_kwargs() -> Dict:
+    """把 db_config.get_db_config() 转成 aiomysql 的连接参数"""
+    config = get_db_config()
+    kwargs = {
+        "host": config["host"],
+        "port": config["port"],
+        "user": config["user"],
+        "password": config["password"],
+        "db": config["database"],
+        "charset": config["charset"],
+        "connect_timeout": config["connect_timeout"],
+        # 每条语句自动提交：与同步实现 "执行后立即 commit" 的效果一致，读请求也不会停留在旧快照上
+        "autocommit": True,
+        # 与同步连接池相同的会话设置，每条物理连接建立时执行一次
+        "init_command": build_session_init_sql(),
+    }
+    if "ssl" in config:
+        # 与同步配置一致：启用加密但不校验证书
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        kwargs["ssl"] = context
+    return kwargs
+
+
+def _require_aiomysql():
+    if aiomysql is None:
+        raise RuntimeError("未安装 aiomysql，无法使用异步数据库后端：pip install aiomysql")
+
+
+async def _terminate_pool(pool):
+    """关闭属于旧事件循环的连接池：借出的连接已无法归还，全部直接断开，并等待关闭完成"""
+    try:
+        pool.terminate()
+        await pool.wait_closed()
+        print("🔄 [db_async] 事件循环已切换，旧连接池已关闭")
+    except Exception as e:
+        print(f"⚠️ [db_async] 关闭旧连接池失败：{e}")
+
+
+async def get_async_pool():
+    """获取当前事件循环的 aiomysql 连接池（首次调用时创建）"""
+    global _pool, _pool_loop, _pool_lock
+    _require_aiomysql()
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    if _pool_lock is None or _pool_loop is not loop:
+        stale, _pool = _pool, None
+        _pool_lock = asyncio.Lock()
+        _pool_loop = loop
+        if stale is not None:
+            await _terminate_pool(stale)
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                minsize=_env_int("DB_POOL_MIN_SIZE", 1),
+                maxsize=_env_int("DB_POOL_MAX_SIZE", 10),
+                pool_recycle=_env_int("DB_POOL_MAX_LIFETIME", 3600),
+                **_pool_kwargs(),
+            )
+            print(f"✅ [db_async] 异步连接池已创建（{_pool.minsize}~{_pool.maxsize} 个连接）")
+    return _pool
+
+
+async def close_async_pool():
+    """关闭异步连接池（服务停止时调用）"""
+    global _pool, _pool_loop, _pool_lock
+    pool, _pool = _pool, None
+    _pool_loop = None
+    _pool_lock = None
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+
+
+@asynccontextmanager
+async def db_cursor():
+    """
+    从异步连接池借用连接并创建 DictCursor，退出时归还
+
+    连接耗尽时最多等待 DB_POOL_TIMEOUT 秒（与同步连接池一致），超时抛出 asyncio.TimeoutError；
+    与同步实现共用数据库熔断器，熔断期间直接抛出 DatabaseUnavailableError
+    """
+    _require_aiomysql()
+    try:
+        probe = db_breaker.before_call()
+    except CircuitOpenError as e:
+        raise DatabaseUnavailableError(f"数据库暂时不可用：{e}")
+    pool = conn = None
+    try:
+        pool = await get_async_pool()
+        conn = await asyncio.wait_for(pool.acquire(), timeout=_env_int("DB_POOL_TIMEOUT", 10))
+        if probe:
+            # 熔断后的探测请求必须确认连接真的可用
+            await conn.ping(reconnect=False)
+    except (aiomysql.OperationalError, asyncio.TimeoutError, OSError) as e:
+        if conn is not None:
+            # 探测失败的连接已不可用，断开后再交还连接池（只做计数，不会再被复用）
+            conn.close()
+            pool.release(conn)
+        db_breaker.record_failure(e)
+        raise
+    except BaseException:
+        if conn is not None:
+            pool.release(conn)
+        raise
+    else:
+        # 与同步实现一致：每次成功借到连接都清零连续失败次数
+        db_breaker.record_success()
+    finally:
+        if probe:
+            db_breaker.end_probe()
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            yield conn, cursor
+    finally:
+        pool.release(conn)
+
+
+async def _read_user(loader) -> Optional[Dict]:
+    """经过用户缓存查询，并叠加尚未写回的计数增量（与 db_config._read_user 一致）"""
+    if counter_buffer is None:
+        return await loader()
+    user, pending = await counter_buffer.aconsistent_read(loader)
+    return _apply_pending_counters(user, pending)
+
+
+async def _fetch_user(where_sql: str, value) -> Optional[Dict]:
+    async with db_cursor() as (conn, cursor):
+        await cursor.execute(f"SELECT * FROM users WHERE {where_sql}", (value,))
+        result = await cursor.fetchone()
+        return result if result else None
+
+
+# ==========================================
+# 用户相关函数
+# ==========================================
+
+async def get_all_users() -> List[Dict]:
+    """查询 users 表所有用户数据（计数字段包含尚未写回的增量）"""
+    async def load():
+        async with db_cursor() as (conn, cursor):
+            await cursor.execute("SELECT * FROM users")
+            results = await cursor.fetchall()
+            return list(results) if results else []
+
+    try:
+        if counter_buffer is None:
+            return await load()
+        users, pending = await counter_buffer.aconsistent_read(load)
+        for user in users:
+            _apply_pending_counters(user, pending)
+        return users
+    except Exception as e:
+        print(f"❌ 查询所有用户失败：{e}")
+        return []
+
+
+async def get_user_by_username(username: str) -> Optional[Dict]:
+    """根据用户名精准查询单个用户（经过用户缓存），无用户返回 None"""
+    try:
+        return await _read_user(
+            lambda: user_cache.aget_by_username(username, lambda name: _fetch_user("username = %s", name))
+        )
+    except Exception as e:
+        print(f"❌ 查询用户失败：{e}")
+        return None
+
+
+async def get_user_by_id(user_id: int) -> Optional[Dict]:
+    """根据用户ID查询单个用户（与 get_user_by_username 共用缓存），无用户返回 None"""
+    try:
+        return await _read_user(lambda: user_cache.aget_by_id(user_id, lambda uid: _fetch_user("id = %s", uid)))
+    except Exception as e:
+        print(f"❌ 查询用户失败：{e}")
+        return None
+
+
+async def authenticate_user(username: str, password: str, strip_stored: bool = False) -> Tuple[bool, str, Optional[Dict]]:
+    """一次查询完成登录验证并返回用户资料（不经过用户缓存），返回值与 db_config.authenticate_user 相同"""
+    try:
+        async with db_cursor() as (conn, cursor):
+            try:
+                await cursor.execute(f"SELECT {', '.join(LOGIN_COLUMNS)} FROM users WHERE username = %s", (username,))
+            except aiomysql.MySQLError as e:
+                # 旧库缺少 city/avatar 等列
+                if not (e.args and e.args[0] == 1054):
+                    raise
+                await cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+            user = await cursor.fetchone()
+    except Exception as e:
+        print(f"❌ 登录验证失败：{e}")
+        return False, "数据库连接失败", None
+
+    if user is None:
+        return False, "用户名不存在", None
+
+    stored = user.get('password') or ''
+    if strip_stored:
+        stored = stored.strip()
+    profile = {col: user.get(col) if user.get(col) is not None else '' for col in LOGIN_COLUMNS if col != 'password'}
+    if stored == password:
+        return True, "登录成功", profile
+    return False, "密码错误", profile
+
+
+async def user_login(username: str, password: str) -> Tuple[bool, str]:
+    """用户登录核心验证，返回 (登录是否成功, 提示信息)"""
+    success, message, _ = await authenticate_user(username, password)
+    return success, message
+
+
+async def _execute_update(sql: str, params, label: str) -> bool:
+    """执行单条写语句，返回是否有行受影响"""
+    try:
+        async with db_cursor() as (conn, cursor):
+            await cursor.execute(sql, params)
+            return cursor.rowcount > 0
+    except Exception as e:
+        print(f"❌ {label}失败：{e}")
+        return False
+
+
+async def update_user_field(username: str, field: str, value) -> bool:
+    """更新用户指定字段，返回更新是否成功"""
+    success = await _execute_update(f"UPDATE users SET {field} = %s WHERE username = %s", (value, username), "更新用户字段")
+    user_cache.invalidate(username)
+    return success
+
+
+async def update_user_multiple_fields(username: str, fields: Dict) -> bool:
+    """更新用户多个字段，返回更新是否成功"""
+    set_clause = ", ".join([f"{k} = %s" for k in fields.keys()])
+    values = list(fields.values()) + [username]
+    success = await _execute_update(f"UPDATE users SET {set_clause} WHERE username = %s", values, "更新用户多个字段")
+    user_cache.invalidate(username)
+    return success
+
+
+async def create_user(username: str, password: str, grade: str, target_role: str) -> Tuple[bool, str]:
+    """创建新用户（注册），返回 (是否成功, 提示信息)"""
+    try:
+        async with db_cursor() as (conn, cursor):
+            await cursor.execute("SELECT username FROM users WHERE username = %s", (username,))
+            if await cursor.fetchone():
+                return False, "该用户名已被注册"
+            await cursor.execute(
+                """
+                INSERT INTO users (username, password, grade, target_role, createTaskNum, uploadedResumeNum)
+                VALUES (%s, %s, %s, %s, 0, 0)
+                """,
+                (username, password, grade, target_role),
+            )
+        # 清掉该用户名的负缓存
+        user_cache.invalidate(username)
+        return True, "注册成功"
+    except Exception as e:
+        print(f"❌ 创建用户失败：{e}")
+        return False, f"注册失败：{e}"
+
+
+async def increment_user_field(username: str, field: str, increment: int = 1) -> bool:
+    """递增用户指定字段的值；COUNTER_FIELDS 中的字段走计数写回缓冲（与同步实现共用）"""
+    if counter_buffer is not None and field in COUNTER_FIELDS:
+        if await get_user_by_username(username) is None:
+            return False
+        counter_buffer.add(username, field, increment)
+        return True
+    success = await _execute_update(
+        f"UPDATE users SET {field} = {field} + %s WHERE username = %s", (increment, username), "递增用户字段"
+    )
+    user_cache.invalidate(username)
+    return success
+
+
+async def decrement_user_field(username: str, field: str, decrement: int = 1) -> bool:
+    """递减用户指定字段的值（不低于 0）；COUNTER_FIELDS 中的字段走计数写回缓冲"""
+    if counter_buffer is not None and field in COUNTER_FIELDS:
+        if await get_user_by_username(username) is None:
+            return False
+        counter_buffer.add(username, field, -decrement)
+        return True
+    success = await _execute_update(
+        f"UPDATE users SET {field} = GREATEST({field} - %s, 0) WHERE username = %s", (decrement, username), "递减用户字段"
+    )
+    user_cache.invalidate(username)
+    return success
+
+
+# ==========================================
+#  简历历史记录相关函数
+# ==========================================
+
+def _format_created_at(value) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else ""
+
+
+async def create_resume_history(user_id: int, resume_type: str, resume_file_url: str, ai_analysis) -> Tuple[bool, Optional[int]]:
+    """创建简历历史记录，返回 (是否成功, 记录ID)；ai_analysis 的处理与同步实现一致（字典转 JSON、压缩存储）"""
+    if isinstance(ai_analysis, dict):
+        ai_analysis_str = json.dumps(ai_analysis, ensure_ascii=False)
+    else:
+        ai_analysis_str = str(ai_analysis) if ai_analysis else ""
+    ai_analysis_str = encode_ai_analysis(ai_analysis_str.encode('utf-8', errors='ignore').decode('utf-8'))
+    try:
+        async with db_cursor() as (conn, cursor):
+            await cursor.execute(
+                """
+                INSERT INTO resume_history (user_id, resume_type, resume_file_url, ai_analysis, created_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                """,
+                (user_id, resume_type, resume_file_url, ai_analysis_str),
+            )
+            history_id = cursor.lastrowid
+        print(f"✅ [create_resume_history] 历史记录创建成功，ID: {history_id}, 用户ID: {user_id}")
+        return True, history_id
+    except Exception as e:
+        print(f"❌ [create_resume_history] 创建历史记录失败: {e}")
+        return False, None
+
+
+async def list_resume_history(user_id: int, limit: Optional[int] = None,
+                              cursor: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+    """分页查询简历历史记录列表（不读取 ai_analysis），参数与返回值同 db_config.list_resume_history"""
+    where_sql = "user_id = %s"
+    params: list = [user_id]
+    if cursor is not None:
+        where_sql += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+        params += [cursor[0], cursor[0], cursor[1]]
+    select_sql = f"""
+        SELECT {RESUME_HISTORY_LIST_COLUMNS}
+        FROM resume_history
+        WHERE {where_sql}
+        ORDER BY created_at DESC, id DESC
+    """
+    if limit is not None:
+        select_sql += " LIMIT %s"
+        params.append(limit + 1)
+    try:
+        async with db_cursor() as (conn, cur):
+            await cur.execute(select_sql, params)
+            results = await cur.fetchall()
+    except Exception as e:
+        print(f"❌ [list_resume_history] 查询历史记录失败: {e}")
+        return [], None
+
+    history_list = [{
+        "id": row.get('id'),
+        "resume_type": row.get('resume_type'),
+        "resume_file_url": row.get('resume_file_url'),
+        "created_at": _format_created_at(row.get('created_at')),
+    } for row in results]
+    next_cursor = None
+    if limit is not None and len(history_list) > limit:
+        history_list = history_list[:limit]
+        next_cursor = (history_list[-1]["created_at"], history_list[-1]["id"])
+    print(f"✅ [list_resume_history] 查询到 {len(history_list)} 条历史记录，用户ID: {user_id}")
+    return history_list, next_cursor
+
+
+def _format_history(row: Dict) -> Dict:
+    return {
+        "id": row.get('id'),
+        "user_id": row.get('user_id'),
+        "resume_type": row.get('resume_type'),
+        "resume_file_url": row.get('resume_file_url'),
+        "ai_analysis": decode_ai_analysis(row.get('ai_analysis')),
+        "created_at": _format_created_at(row.get('created_at')),
+    }
+
+
+async def get_resume_history_by_user_id(user_id: int) -> List[Dict]:
+    """根据用户ID查询所有简历历史记录（按时间倒序，包含完整 ai_analysis）"""
+    try:
+        async with db_cursor() as (conn, cursor):
+            await cursor.execute(
+                """
+                SELECT id, user_id, resume_type, resume_file_url, ai_analysis, created_at
+                FROM resume_history
+                WHERE user_id = %s
+                ORDER BY created_at DESC
+                """,
+                (user_id,),
+            )
+            results = await cursor.fetchall()
+        history_list = [_format_history(row) for row in results]
+        print(f"✅ [get_resume_history_by_user_id] 查询到 {len(history_list)} 条历史记录，用户ID: {user_id}")
+        return history_list
+    except Exception as e:
+        print(f"❌ [get_resume_history_by_user_id] 查询历史记录失败: {e}")
+        return []
+
+
+async def get_resume_history_by_id(history_id: int, user_id: int) -> Optional[Dict]:
+    """根据历史记录ID和用户ID查询单条记录（确保用户只能查看自己的记录），不存在返回 None"""
+    try:
+        async with db_cursor() as (conn, cursor):
+            await cursor.execute(
+                """
+                SELECT id, user_id, resume_type, resume_file_url, ai_analysis, created_at
+                FROM resume_history
+                WHERE id = %s AND user_id = %s
+                """,
+                (history_id, user_id),
+            )
+            result = await cursor.fetchone()
+        if result:
+            print(f"✅ [get_resume_history_by_id] 查询历史记录成功，ID: {history_id}, 用户ID: {user_id}")
+            return _format_history(result)
+        print(f"⚠️ [get_resume_history_by_id] 历史记录不存在或不属于该用户，ID: {history_id}, 用户ID: {user_id}")
+        return None
+    except Exception as e:
+        print(f"❌ [get_resume_history_by_id] 查询历史记录失败: {e}")
+        return None
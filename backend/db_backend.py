@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+数据库后端选择
+async 接口统一通过 get_async_db() 访问数据库，函数名和参数与 db_config 相同，全部需要 await：
+- DB_BACKEND=sync（默认）：把 db_config 的同步函数放到线程池执行，行为与原来完全一样
+- DB_BACKEND=async：使用 db_async（aiomysql 连接池），不占用线程池，需要安装 aiomysql
+
+两种后端共用用户缓存和计数写回缓冲，切换只影响连接方式
+"""
+import os
+import asyncio
+import functools
+import threading
+
+DB_BACKENDS = ("sync", "async")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend_name() -> str:
+    """读取 DB_BACKEND 配置，非法取值时回退到 sync"""
+    name = os.getenv("DB_BACKEND", "sync").strip().lower()
+    if name not in DB_BACKENDS:
+        print(f"⚠️ [db_backend] 未知的 DB_BACKEND={name}，使用 sync")
+        return "sync"
+    return name
+
+
+class ThreadPoolBackend:
+    """把 db_config 的同步函数包装为协程函数（在默认线程池中执行）"""
+
+    name = "sync"
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, attr):
+        fn = getattr(self._module, attr)
+        if not callable(fn):
+            return fn
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+        setattr(self, attr, wrapper)  # 缓存包装结果，下次直接命中实例属性
+        return wrapper
+
+
+def _load_backend(name: str):
+    if name == "async":
+        try:
+            from . import db_async
+        except ImportError:
+            import db_async
+        if db_async.aiomysql is None:
+            raise RuntimeError("DB_BACKEND=async 需要安装 aiomysql：pip install aiomysql")
+        return db_async
+    try:
+        from . import db_config
+    except ImportError:
+        import db_config
+    return ThreadPoolBackend(db_config)
+
+
+def get_async_db(name: str = None):
+    """
+    获取异步数据库接口（首次调用时按 DB_BACKEND 选择）
+
+    传入 name 时直接返回对应后端（不缓存），供测试脚本对两种后端分别运行
+    """
+    global _backend
+    if name is not None:
+        return _load_backend(name)
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _load_backend(get_backend_name())
+                print(f"✅ [db_backend] 数据库后端: {_backend.name}")
+    return _backend
+
+
+async def close_db_backend():
+    """关闭异步后端的连接池（sync 后端的连接池由 db_config.close_db_pool 关闭）"""
+    if _backend is not None and _backend.name == "async":
+        await _backend.close_async_pool()
@@ -4,9 +4,15 @@
 包含数据库连接配置、连接函数和核心查询函数
 """
 import os
+import time
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
 import pymysql
 from pymysql import OperationalError
-from typing import List, Dict, Optional, Tuple
+from pymysql.converters import escape_string
+from typing import Callable, List, Dict, Optional, Tuple
 
 # 优先读取环境变量，其次读取 .env 文件
 try:
@@ -15,6 +21,18 @@ try:
 except ImportError:
     pass  # python-dotenv 未安装时跳过
 
+try:
+    from .history_codec import decode_ai_analysis, encode_ai_analysis
+    from .user_cache import UserCache
+    from .counter_buffer import CounterBuffer
+    from .circuit_breaker import CircuitBreaker, CircuitOpenError
+except ImportError:
+    # 在 backend 目录下直接运行脚本（debug_resume_history.py 等）时不是包导入
+    from history_codec import decode_ai_analysis, encode_ai_analysis
+    from user_cache import UserCache
+    from counter_buffer import CounterBuffer
+    from circuit_breaker import CircuitBreaker, CircuitOpenError
+
 # ==========================================
 # 数据库连接配置（从环境变量读取，兼容 .env）
 # ==========================================
@@ -114,19 +132,21 @@ def get_db_config():
 
 
 # ==========================================
-# 通用数据库连接和游标获取函数
+# 物理连接建立函数（供连接池调用）
 # ==========================================
-def get_db_cursor():
+def _open_raw_connection():
     """
-    获取数据库连接对象和游标对象（推荐使用）
+    建立一条新的物理数据库连接（TCP + 可选 TLS + 认证）
     
     功能：
     - 自动检查环境变量是否配置完整
-    - 自动处理数据库连接超时/断开的情况，重新建立连接
+    - 连接超时/网络错误时自动重试
     - 包含完整的异常捕获和错误信息输出
     
+    注意：业务代码不要直接调用，请使用 get_db_cursor() 或 db_cursor() 从连接池借用连接
+    
     Returns:
-        Tuple[pymysql.Connection, pymysql.cursors.DictCursor]: (连接对象, 游标对象)
+        pymysql.Connection: 新建立的物理连接
     
     Raises:
         ValueError: 环境变量配置不完整
@@ -158,16 +178,9 @@ def get_db_cursor():
             except AttributeError as e:
                 raise OperationalError(f"数据库连接对象无效：{e}")
             
-            # 创建游标
-            cursor = conn.cursor()
-            
-            if cursor is None:
-                conn.close()
-                raise OperationalError("conn.cursor() 返回 None，游标创建失败")
-            
             db_name = config.get("database", "unknown")
             print(f"✅ 成功连接到云端数据库 {db_name}！")
-            return conn, cursor
+            return conn
         except ValueError as e:
             # 环境变量配置错误
             print(f"❌ 数据库配置错误：{e}")
@@ -244,6 +257,439 @@ def get_db_cursor():
     raise OperationalError("数据库连接失败：重试次数已达上限")
 
 
+# ==========================================
+# 数据库连接池
+# ==========================================
+def _env_int(name: str, default: int) -> int:
+    """读取整数型环境变量，非法值回退到默认值"""
+    try:
+        return int(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+
+
+class PooledConnection:
+    """
+    从连接池借出的连接包装对象
+    
+    - 属性和方法全部透传给底层 pymysql 连接（cursor/commit/rollback 等用法不变）
+    - close() 不会断开物理连接，而是把连接归还给连接池
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    @property
+    def raw(self):
+        """底层的 pymysql 连接对象"""
+        return self._raw
+
+    def close(self):
+        """归还连接到连接池（重复调用是安全的）"""
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    有界、线程安全的数据库连接池
+    
+    功能：
+    - min_size / max_size：最少保持的空闲连接数和最多同时存在的物理连接数
+    - 借出时做存活检查：空闲超过 ping_interval 秒的连接先 ping，失效则丢弃重建
+    - 空闲回收：空闲超过 max_idle 秒、或存活超过 max_lifetime 秒的连接会被关闭
+    - 连接耗尽时最多等待 acquire_timeout 秒，超时抛出 OperationalError
+    - init_session(raw)：每条物理连接只执行一次的会话初始化（字符集、sql_mode、time_zone），
+      借出时只检查连接上的标记，未初始化（或上次初始化失败）才执行
+    """
+
+    def __init__(self, factory, min_size: int = 1, max_size: int = 10,
+                 max_idle: float = 300, max_lifetime: float = 3600,
+                 ping_interval: float = 30, acquire_timeout: float = 10,
+                 init_session=None):
+        if max_size < 1:
+            raise ValueError("连接池 max_size 必须大于 0")
+        self._factory = factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+        self.init_session = init_session
+        # 空闲连接：(raw, created_at, last_used)
+        self._idle = deque()
+        self._total = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+    # ---------- 内部工具 ----------
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, created_at: float, last_used: float, now: float) -> bool:
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - last_used > self.max_idle:
+            return True
+        return False
+
+    def _ensure_session(self, raw):
+        """会话初始化：连接上已有标记时直接返回（不产生数据库往返）"""
+        if self.init_session is None or getattr(raw, "_session_ready", False):
+            return
+        self.init_session(raw)
+        raw._session_ready = True
+
+    def _create(self):
+        """在锁外建立物理连接，失败时释放名额"""
+        try:
+            raw = self._factory()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        return raw, time.monotonic()
+
+    # ---------- 对外接口 ----------
+    def warm_up(self):
+        """预先建立 min_size 条连接（失败不抛出，首次借用时会再尝试）"""
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.min_size:
+                    return
+                self._total += 1
+            try:
+                raw, created_at = self._create()
+            except Exception as e:
+                print(f"⚠️ [db_pool] 预热连接失败：{e}")
+                return
+            with self._cond:
+                self._idle.append((raw, created_at, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None, validate: bool = False) -> PooledConnection:
+        """
+        借用一条连接
+        
+        Args:
+            timeout: 等待空闲连接的最长秒数，默认使用 acquire_timeout
+            validate: 为 True 时空闲连接借出前一定先 ping（不受 ping_interval 限制）
+        
+        Returns:
+            PooledConnection: 连接包装对象，用完调用 close() 归还
+        
+        Raises:
+            OperationalError: 连接池已关闭、等待超时或建立连接失败
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise OperationalError("数据库连接池已关闭")
+                    now = time.monotonic()
+                    if self._idle:
+                        raw, created_at, last_used = self._idle.pop()
+                        if self._is_expired(created_at, last_used, now):
+                            self._total -= 1
+                            self._close_raw(raw)
+                            continue
+                        candidate = (raw, created_at, last_used)
+                        break
+                    if self._total < self.max_size:
+                        self._total += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise OperationalError(
+                            f"数据库连接池已耗尽（max_size={self.max_size}），等待 {timeout} 秒后超时"
+                        )
+                    self._cond.wait(remaining)
+
+            if candidate is None:
+                raw, created_at = self._create()
+                try:
+                    self._ensure_session(raw)
+                except Exception as e:
+                    self._discard(raw)
+                    raise OperationalError(f"数据库会话初始化失败：{e}")
+                return PooledConnection(self, raw, created_at)
+
+            raw, created_at, last_used = candidate
+            if validate or (self.ping_interval is not None and time.monotonic() - last_used >= self.ping_interval):
+                try:
+                    raw.ping(reconnect=False)
+                except Exception as e:
+                    print(f"⚠️ [db_pool] 空闲连接已失效，丢弃并重新获取：{e}")
+                    self._discard(raw)
+                    continue
+            try:
+                self._ensure_session(raw)
+            except Exception as e:
+                print(f"⚠️ [db_pool] 空闲连接会话初始化失败，丢弃并重新获取：{e}")
+                self._discard(raw)
+                continue
+            return PooledConnection(self, raw, created_at)
+
+    def release(self, conn: PooledConnection):
+        """归还连接：结束未提交的事务后放回空闲队列，异常连接直接关闭"""
+        raw = conn.raw
+        healthy = bool(getattr(raw, "open", False))
+        if healthy:
+            try:
+                # 结束只读查询遗留的隐式事务，保证下一个借用者看到最新数据
+                raw.rollback()
+            except Exception:
+                healthy = False
+        now = time.monotonic()
+        with self._cond:
+            if healthy and not self._closed and not self._is_expired(conn._created_at, now, now):
+                self._idle.append((raw, conn._created_at, now))
+                self._cond.notify()
+                return
+            self._total -= 1
+            self._cond.notify()
+        self._close_raw(raw)
+
+    def _discard(self, raw):
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+        self._close_raw(raw)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """上下文管理器形式借用连接：with pool.connection() as conn: ..."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def clear_idle(self) -> int:
+        """关闭所有空闲连接（数据库故障后它们多半已失效），返回关闭的数量"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._close_raw(raw)
+        return len(idle)
+
+    def close_all(self):
+        """关闭连接池中所有空闲连接，已借出的连接归还时会被关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._close_raw(raw)
+
+    def stats(self) -> Dict:
+        """返回连接池当前状态，便于健康检查和排查"""
+        with self._cond:
+            return {
+                "total": self._total,
+                "idle": len(self._idle),
+                "in_use": self._total - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+
+def build_session_init_sql() -> str:
+    """
+    生成会话初始化语句（一条 SET 完成全部设置）
+    
+    - 字符集：等价于 SET NAMES，使用 DB_CHARSET（默认 utf8mb4）
+    - DB_SESSION_SQL_MODE / DB_SESSION_TIME_ZONE：设置后才加入，默认沿用服务器配置
+    """
+    charset = (os.getenv("DB_CHARSET") or "utf8mb4").strip() or "utf8mb4"
+    settings = [
+        ("character_set_client", charset),
+        ("character_set_connection", charset),
+        ("character_set_results", charset),
+    ]
+    for name, env in (("sql_mode", "DB_SESSION_SQL_MODE"), ("time_zone", "DB_SESSION_TIME_ZONE")):
+        value = os.getenv(env)
+        if value is not None and value.strip():
+            settings.append((name, value.strip()))
+    return "SET " + ", ".join(f"{name} = '{escape_string(value)}'" for name, value in settings)
+
+
+def _init_session(raw):
+    """连接池的会话初始化钩子：每条物理连接建立后执行一次"""
+    cursor = raw.cursor()
+    try:
+        cursor.execute(build_session_init_sql())
+    finally:
+        cursor.close()
+
+
+class DatabaseUnavailableError(OperationalError):
+    """数据库熔断中，未尝试连接直接失败"""
+
+
+def _drop_idle_connections():
+    pool = _db_pool
+    if pool is not None:
+        closed = pool.clear_idle()
+        if closed:
+            print(f"⚠️ [db_pool] 数据库熔断，已丢弃 {closed} 条空闲连接")
+
+
+# 数据库熔断器：建立物理连接连续失败 DB_BREAKER_FAILURES 次后熔断，
+# 熔断期间借连接立即失败，每 DB_BREAKER_RESET_TIMEOUT 秒放行一个请求探测
+db_breaker = CircuitBreaker(
+    "数据库",
+    failure_threshold=_env_int("DB_BREAKER_FAILURES", 2),
+    reset_timeout=_env_int("DB_BREAKER_RESET_TIMEOUT", 15),
+    on_open=_drop_idle_connections,
+)
+
+
+def _open_guarded_connection():
+    """连接池的连接工厂：建立物理连接，并把成功/失败记录到熔断器（配置错误不计入）"""
+    try:
+        raw = _open_raw_connection()
+    except OperationalError as e:
+        db_breaker.record_failure(e)
+        raise
+    db_breaker.record_success()
+    return raw
+
+
+_db_pool: Optional[ConnectionPool] = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> ConnectionPool:
+    """
+    获取全局连接池（首次调用时按环境变量创建）
+    
+    环境变量：
+    - DB_POOL_MIN_SIZE: 最少保持的连接数（默认1）
+    - DB_POOL_MAX_SIZE: 最多同时存在的连接数（默认10）
+    - DB_POOL_MAX_IDLE: 空闲多少秒后回收（默认300）
+    - DB_POOL_MAX_LIFETIME: 物理连接最长存活秒数（默认3600）
+    - DB_POOL_PING_INTERVAL: 空闲多少秒后借出前需要 ping（默认30）
+    - DB_POOL_TIMEOUT: 连接耗尽时的最长等待秒数（默认10）
+    - DB_SESSION_SQL_MODE / DB_SESSION_TIME_ZONE: 每条连接的会话 sql_mode / time_zone（默认不设置）
+    """
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                pool = ConnectionPool(
+                    _open_guarded_connection,
+                    min_size=_env_int("DB_POOL_MIN_SIZE", 1),
+                    max_size=_env_int("DB_POOL_MAX_SIZE", 10),
+                    max_idle=_env_int("DB_POOL_MAX_IDLE", 300),
+                    max_lifetime=_env_int("DB_POOL_MAX_LIFETIME", 3600),
+                    ping_interval=_env_int("DB_POOL_PING_INTERVAL", 30),
+                    acquire_timeout=_env_int("DB_POOL_TIMEOUT", 10),
+                    init_session=_init_session,
+                )
+                pool.warm_up()
+                _db_pool = pool
+    return _db_pool
+
+
+def close_db_pool():
+    """关闭全局连接池（服务停止时调用）"""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is not None:
+            _db_pool.close_all()
+            _db_pool = None
+
+
+# ==========================================
+# 通用数据库连接和游标获取函数
+# ==========================================
+def get_db_cursor(validate: bool = False):
+    """
+    从连接池借用连接并创建游标（推荐使用）
+    
+    返回的连接对象用法与 pymysql.Connection 一致，调用 conn.close() 即归还连接池，
+    因此现有 "finally: cursor.close(); conn.close()" 的写法无需修改。
+    数据库熔断期间不尝试连接，直接抛出 DatabaseUnavailableError。
+    
+    Args:
+        validate: 为 True 时空闲连接借出前先 ping，并把结果记录到熔断器（健康检查用）
+    
+    Returns:
+        Tuple[PooledConnection, pymysql.cursors.DictCursor]: (连接对象, 游标对象)
+    
+    Raises:
+        ValueError: 环境变量配置不完整
+        DatabaseUnavailableError: 数据库熔断中
+        OperationalError: 数据库连接失败或连接池耗尽
+    """
+    try:
+        probe = db_breaker.before_call()
+    except CircuitOpenError as e:
+        raise DatabaseUnavailableError(f"数据库暂时不可用：{e}")
+    try:
+        # 熔断后的探测请求必须确认连接真的可用
+        validate = validate or probe
+        conn = get_db_pool().acquire(validate=validate)
+        if validate:
+            db_breaker.record_success()
+    finally:
+        if probe:
+            db_breaker.end_probe()
+    try:
+        cursor = conn.cursor()
+    except Exception as e:
+        conn.close()
+        raise OperationalError(f"游标创建失败：{e}")
+    return conn, cursor
+
+
+@contextmanager
+def db_cursor():
+    """
+    上下文管理器形式的 get_db_cursor()，退出时自动关闭游标并归还连接
+    
+    用法：
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT 1")
+    """
+    conn, cursor = get_db_cursor()
+    try:
+        yield conn, cursor
+    finally:
+        try:
+            cursor.close()
+        finally:
+            conn.close()
+
+
 # ==========================================
 # 数据库连接函数（保留向后兼容）
 # ==========================================
@@ -275,19 +721,72 @@ def get_db_connection_with_error():
     try:
         conn, _ = get_db_cursor()
         return conn, None
-    except ValueError as e:
-        return None, str(e)
-    except OperationalError as e:
+    except Exception as e:
+        return None, _connection_error_reason(e)
+
+
+def _connection_error_reason(e: Exception) -> str:
+    """把连接异常转换为简短的错误原因（不包含密码等敏感信息）"""
+    if isinstance(e, ValueError):
+        return str(e)
+    if isinstance(e, OperationalError):
         error_msg = str(e)
         # 提取错误原因（去掉错误代码部分）
         if "(" in error_msg and "错误代码:" in error_msg:
-            reason = error_msg.split("(")[0].strip()
-        else:
-            reason = error_msg
-        return None, reason
+            return error_msg.split("(")[0].strip()
+        return error_msg
+    return f"连接失败：{type(e).__name__}"
+
+
+_health_lock = threading.Lock()
+_health_probe_lock = threading.Lock()
+_health_state: Dict = {"db_ok": None, "db_error": None, "checked_at": 0.0}
+
+
+def _probe_db_health():
+    """借一条连接并 ping，把结果写入健康状态缓存（调用方需持有 _health_probe_lock）"""
+    db_ok, db_error = True, None
+    try:
+        conn, cursor = get_db_cursor(validate=True)
+        cursor.close()
+        conn.close()
+    except DatabaseUnavailableError:
+        db_ok, db_error = False, "数据库熔断中"
     except Exception as e:
-        error_type = type(e).__name__
-        return None, f"连接失败：{error_type}"
+        db_ok, db_error = False, _connection_error_reason(e)
+    with _health_lock:
+        _health_state.update(db_ok=db_ok, db_error=db_error, checked_at=time.time())
+
+
+def check_db_health() -> Dict:
+    """
+    数据库健康状态（供 /health 使用），结果缓存 DB_HEALTH_CACHE_SECONDS 秒
+    
+    - 缓存过期后由一个请求借一条连接并 ping 探测，其他并发请求直接返回缓存结果
+    - 第一次探测完成前没有可用的缓存结果，并发请求等待这次探测，不会返回未初始化的状态
+    - 熔断期间探测不会连接数据库，立即返回熔断状态
+    
+    Returns:
+        Dict: {"db_ok", "db_error", "checked_at", "breaker"}
+    """
+    with _health_lock:
+        checked_at = _health_state["checked_at"]
+    due = time.time() - checked_at >= _env_int("DB_HEALTH_CACHE_SECONDS", 10)
+    if due and not checked_at:
+        with _health_probe_lock:
+            with _health_lock:
+                seeded = bool(_health_state["checked_at"])
+            if not seeded:
+                _probe_db_health()
+    elif due and _health_probe_lock.acquire(blocking=False):
+        try:
+            _probe_db_health()
+        finally:
+            _health_probe_lock.release()
+    with _health_lock:
+        result = dict(_health_state)
+    result["breaker"] = db_breaker.stats()
+    return result
 
 
 # ==========================================
@@ -296,11 +795,20 @@ def get_db_connection_with_error():
 
 def get_all_users() -> List[Dict]:
     """
-    查询 users 表所有用户数据
+    查询 users 表所有用户数据（计数字段包含尚未写回的增量）
     
     Returns:
         List[Dict]: 用户字典列表，无数据返回空列表
     """
+    if counter_buffer is None:
+        return _query_all_users()
+    users, pending = counter_buffer.consistent_read(_query_all_users)
+    for user in users:
+        _apply_pending_counters(user, pending)
+    return users
+
+
+def _query_all_users() -> List[Dict]:
     conn = None
     cursor = None
     try:
@@ -319,9 +827,129 @@ def get_all_users() -> List[Dict]:
             conn.close()
 
 
+# 用户信息读穿缓存（见 user_cache.py）：USER_CACHE_TTL=0 关闭
+user_cache = UserCache(
+    ttl=_env_int("USER_CACHE_TTL", 60),
+    negative_ttl=_env_int("USER_CACHE_NEGATIVE_TTL", 10),
+    max_entries=_env_int("USER_CACHE_MAX_ENTRIES", 10000),
+)
+
+
+def _fetch_user(where_sql: str, value) -> Optional[Dict]:
+    """查询单个用户（不走缓存），查询出错时抛出异常，以免错误结果被当成 "用户不存在" 缓存"""
+    conn = None
+    cursor = None
+    try:
+        conn, cursor = get_db_cursor()
+        sql = f"SELECT * FROM users WHERE {where_sql}"
+        cursor.execute(sql, (value,))
+        result = cursor.fetchone()
+        return result if result else None
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# 计数字段写回缓冲（见 counter_buffer.py）：只有这些字段走缓冲，USER_COUNTER_FLUSH_INTERVAL=0 关闭
+COUNTER_FIELDS = ("createTaskNum", "uploadedResumeNum")
+# 单条多行 UPDATE 最多包含的用户数
+_COUNTER_FLUSH_CHUNK = 500
+
+
+def _flush_counter_deltas(deltas: Dict[Tuple[str, str], int], begin_commit: Optional[Callable[[], None]] = None):
+    """
+    把合并后的增量写回 users 表：每个字段按用户分批生成一条多行 UPDATE，全部在一个事务中提交
+    
+    UPDATE users SET f = GREATEST(f + CASE username WHEN %s THEN %s ... END, 0) WHERE username IN (...)
+    begin_commit 在 COMMIT 之前调用（CounterBuffer 据此判断读取是否与提交重叠）
+    失败时回滚并抛出异常（由 CounterBuffer 放回缓冲区重试）
+    """
+    by_field: Dict[str, List[Tuple[str, int]]] = {}
+    for (username, field), delta in deltas.items():
+        if field in COUNTER_FIELDS and delta:
+            by_field.setdefault(field, []).append((username, delta))
+    if not by_field:
+        return
+    conn = None
+    cursor = None
+    try:
+        conn, cursor = get_db_cursor()
+        for field, items in by_field.items():
+            for start in range(0, len(items), _COUNTER_FLUSH_CHUNK):
+                chunk = items[start:start + _COUNTER_FLUSH_CHUNK]
+                cases = " ".join("WHEN %s THEN %s" for _ in chunk)
+                placeholders = ", ".join("%s" for _ in chunk)
+                sql = (f"UPDATE users SET {field} = GREATEST({field} + CASE username {cases} END, 0) "
+                       f"WHERE username IN ({placeholders})")
+                params = [v for item in chunk for v in item] + [username for username, _ in chunk]
+                cursor.execute(sql, params)
+        if begin_commit is not None:
+            begin_commit()
+        conn.commit()
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def _apply_pending_counters(user: Optional[Dict], pending: Dict[Tuple[str, str], int]) -> Optional[Dict]:
+    """把尚未写回的计数增量叠加到查询到的用户行上（与写回时一样不低于 0）"""
+    if user is None or not pending:
+        return user
+    for field in COUNTER_FIELDS:
+        delta = pending.get((user.get('username'), field))
+        if delta:
+            user[field] = max(int(user.get(field) or 0) + delta, 0)
+    return user
+
+
+def _invalidate_flushed_users(usernames):
+    """写回提交后用户缓存中的计数已过期"""
+    for username in usernames:
+        user_cache.invalidate(username)
+
+
+_counter_interval = _env_int("USER_COUNTER_FLUSH_INTERVAL", 2)
+counter_buffer: Optional[CounterBuffer] = CounterBuffer(
+    _flush_counter_deltas,
+    interval=_counter_interval,
+    max_pending=_env_int("USER_COUNTER_MAX_PENDING", 500),
+    on_flushed=_invalidate_flushed_users,
+) if _counter_interval > 0 else None
+
+
+def flush_user_counters() -> int:
+    """立即把缓冲的计数增量写回数据库，返回写回的条目数"""
+    return counter_buffer.flush() if counter_buffer is not None else 0
+
+
+def close_user_counters():
+    """停止后台写回并同步写回剩余增量（服务停止时调用，进程退出时也会自动调用）"""
+    if counter_buffer is not None:
+        counter_buffer.close()
+
+
+atexit.register(close_user_counters)
+
+
+def _read_user(loader) -> Optional[Dict]:
+    """经过用户缓存查询，并叠加尚未写回的计数增量"""
+    if counter_buffer is None:
+        return loader()
+    user, pending = counter_buffer.consistent_read(loader)
+    return _apply_pending_counters(user, pending)
+
+
 def get_user_by_username(username: str) -> Optional[Dict]:
     """
-    根据用户名精准查询单个用户
+    根据用户名精准查询单个用户（经过用户缓存，返回的是副本，可以随意修改）
     
     Args:
         username: 用户名字符串
@@ -329,27 +957,33 @@ def get_user_by_username(username: str) -> Optional[Dict]:
     Returns:
         Dict: 单个用户字典，无用户返回 None
     """
-    conn = None
-    cursor = None
     try:
-        conn, cursor = get_db_cursor()
-        sql = "SELECT * FROM users WHERE username = %s"
-        cursor.execute(sql, (username,))
-        result = cursor.fetchone()
-        return result if result else None
+        return _read_user(lambda: user_cache.get_by_username(username, lambda name: _fetch_user("username = %s", name)))
+    except Exception as e:
+        print(f"❌ 查询用户失败：{e}")
+        return None
+
+
+def get_user_by_id(user_id: int) -> Optional[Dict]:
+    """
+    根据用户ID查询单个用户（与 get_user_by_username 共用缓存）
+    
+    Args:
+        user_id: 用户ID
+    
+    Returns:
+        Dict: 单个用户字典，无用户返回 None
+    """
+    try:
+        return _read_user(lambda: user_cache.get_by_id(user_id, lambda uid: _fetch_user("id = %s", uid)))
     except Exception as e:
         print(f"❌ 查询用户失败：{e}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
 
 def user_login(username: str, password: str) -> Tuple[bool, str]:
     """
-    用户登录核心验证
+    用户登录核心验证（需要用户资料时请直接使用 authenticate_user）
     
     Args:
         username: 用户名字符串
@@ -358,31 +992,71 @@ def user_login(username: str, password: str) -> Tuple[bool, str]:
     Returns:
         Tuple[bool, str]: (登录是否成功, 提示信息)
     """
+    success, message, _ = authenticate_user(username, password)
+    return success, message
+
+
+# 登录/改密码只需要这些列；password 只用于进程内比对，不会出现在返回的资料中
+LOGIN_COLUMNS = ["id", "username", "password", "email", "phone", "city", "avatar"]
+# 旧库可能缺少 city/avatar 等列：投影查询报 "Unknown column"（1054）后改用 SELECT *，不再重试投影
+_login_projection_ok = True
+
+
+def _fetch_login_row(cursor, username: str) -> Optional[Dict]:
+    global _login_projection_ok
+    if _login_projection_ok:
+        try:
+            cursor.execute(f"SELECT {', '.join(LOGIN_COLUMNS)} FROM users WHERE username = %s", (username,))
+            return cursor.fetchone()
+        except pymysql.MySQLError as e:
+            if not (e.args and e.args[0] == 1054):
+                raise
+            print(f"⚠️ [authenticate_user] users 表缺少登录所需的列，改用 SELECT *：{e}")
+            _login_projection_ok = False
+    cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+    return cursor.fetchone()
+
+
+def authenticate_user(username: str, password: str, strip_stored: bool = False) -> Tuple[bool, str, Optional[Dict]]:
+    """
+    一次查询完成登录验证并返回用户资料（登录、修改密码共用）
+    
+    只查询 LOGIN_COLUMNS 中的列、只借用一次连接，密码在进程内比对；
+    不经过用户缓存，保证验证的始终是数据库中的最新密码
+    
+    Args:
+        username: 用户名字符串
+        password: 待验证的密码
+        strip_stored: 比对前去掉库中密码首尾空白（修改密码接口沿用的旧逻辑）
+    
+    Returns:
+        Tuple[bool, str, Optional[Dict]]: (是否通过, 提示信息, 用户资料)；
+        资料不含 password，缺失的列为空字符串，用户不存在或查询出错时为 None
+    """
     conn = None
     cursor = None
     try:
         conn, cursor = get_db_cursor()
-        # 查询用户是否存在
-        sql = "SELECT * FROM users WHERE username = %s"
-        cursor.execute(sql, (username,))
-        user = cursor.fetchone()
-        
-        if user is None:
-            return False, "用户名不存在"
-        
-        # 验证密码
-        if user.get('password') == password:
-            return True, "登录成功"
-        else:
-            return False, "密码错误"
+        user = _fetch_login_row(cursor, username)
     except Exception as e:
         print(f"❌ 登录验证失败：{e}")
-        return False, "数据库连接失败"
+        return False, "数据库连接失败", None
     finally:
         if cursor:
             cursor.close()
         if conn:
             conn.close()
+    
+    if user is None:
+        return False, "用户名不存在", None
+    
+    stored = user.get('password') or ''
+    if strip_stored:
+        stored = stored.strip()
+    profile = {col: user.get(col) if user.get(col) is not None else '' for col in LOGIN_COLUMNS if col != 'password'}
+    if stored == password:
+        return True, "登录成功", profile
+    return False, "密码错误", profile
 
 
 # ==========================================
@@ -409,6 +1083,7 @@ def update_user_field(username: str, field: str, value) -> bool:
         sql = f"UPDATE users SET {field} = %s WHERE username = %s"
         cursor.execute(sql, (value, username))
         conn.commit()
+        user_cache.invalidate(username)
         return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ 更新用户字段失败：{e}")
@@ -443,6 +1118,7 @@ def update_user_multiple_fields(username: str, fields: Dict) -> bool:
         values = list(fields.values()) + [username]
         cursor.execute(sql, values)
         conn.commit()
+        user_cache.invalidate(username)
         return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ 更新用户多个字段失败：{e}")
@@ -486,6 +1162,8 @@ def create_user(username: str, password: str, grade: str, target_role: str) -> T
         """
         cursor.execute(insert_sql, (username, password, grade, target_role))
         conn.commit()
+        # 清掉该用户名的负缓存
+        user_cache.invalidate(username)
         return True, "注册成功"
     except Exception as e:
         print(f"❌ 创建用户失败：{e}")
@@ -503,6 +1181,8 @@ def increment_user_field(username: str, field: str, increment: int = 1) -> bool:
     """
     递增用户指定字段的值（如 createTaskNum, uploadedResumeNum）
     
+    COUNTER_FIELDS 中的字段先记入写回缓冲，由后台批量写回；读取时已包含该增量
+    
     Args:
         username: 用户名
         field: 字段名
@@ -511,6 +1191,13 @@ def increment_user_field(username: str, field: str, increment: int = 1) -> bool:
     Returns:
         bool: 操作是否成功
     """
+    if counter_buffer is not None and field in COUNTER_FIELDS:
+        # 与直接 UPDATE 的 rowcount > 0 一致：用户不存在时返回 False
+        if get_user_by_username(username) is None:
+            return False
+        counter_buffer.add(username, field, increment)
+        return True
+    
     conn = None
     cursor = None
     try:
@@ -518,6 +1205,7 @@ def increment_user_field(username: str, field: str, increment: int = 1) -> bool:
         sql = f"UPDATE users SET {field} = {field} + %s WHERE username = %s"
         cursor.execute(sql, (increment, username))
         conn.commit()
+        user_cache.invalidate(username)
         return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ 递增用户字段失败：{e}")
@@ -533,7 +1221,9 @@ def increment_user_field(username: str, field: str, increment: int = 1) -> bool:
 
 def decrement_user_field(username: str, field: str, decrement: int = 1) -> bool:
     """
-    递减用户指定字段的值（如 uploadedResumeNum）
+    递减用户指定字段的值（如 uploadedResumeNum），结果不低于 0
+    
+    COUNTER_FIELDS 中的字段先记入写回缓冲，由后台批量写回；读取时已包含该增量
     
     Args:
         username: 用户名
@@ -543,6 +1233,12 @@ def decrement_user_field(username: str, field: str, decrement: int = 1) -> bool:
     Returns:
         bool: 操作是否成功
     """
+    if counter_buffer is not None and field in COUNTER_FIELDS:
+        if get_user_by_username(username) is None:
+            return False
+        counter_buffer.add(username, field, -decrement)
+        return True
+    
     conn = None
     cursor = None
     try:
@@ -550,6 +1246,7 @@ def decrement_user_field(username: str, field: str, decrement: int = 1) -> bool:
         sql = f"UPDATE users SET {field} = GREATEST({field} - %s, 0) WHERE username = %s"
         cursor.execute(sql, (decrement, username))
         conn.commit()
+        user_cache.invalidate(username)
         return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ 递减用户字段失败：{e}")
@@ -583,13 +1280,9 @@ def create_resume_history(user_id: int, resume_type: str, resume_file_url: str,
     conn = None
     cursor = None
     try:
+        # 字符集（utf8mb4）由连接池在每条物理连接建立时设置一次，见 build_session_init_sql()
         conn, cursor = get_db_cursor()
         
-        # 关键修复点：确保数据库连接使用 utf8mb4 字符集
-        cursor.execute("SET NAMES utf8mb4")
-        cursor.execute("SET CHARACTER SET utf8mb4")
-        cursor.execute("SET character_set_connection=utf8mb4")
-        
         # 将 ai_analysis 转换为字符串（如果是字典，转为JSON）
         if isinstance(ai_analysis, dict):
             import json
@@ -605,6 +1298,9 @@ def create_resume_history(user_id: int, resume_type: str, resume_file_url: str,
             # 如果包含无法编码的字符，使用 'ignore' 策略移除
             ai_analysis_str = ai_analysis_str.encode('utf-8', errors='ignore').decode('utf-8')
         
+        # 压缩存储（带版本前缀的 ASCII 文本，读取时由 decode_ai_analysis 透明还原）
+        ai_analysis_str = encode_ai_analysis(ai_analysis_str)
+        
         insert_sql = """
             INSERT INTO resume_history (user_id, resume_type, resume_file_url, ai_analysis, created_at)
             VALUES (%s, %s, %s, %s, NOW())
@@ -638,7 +1334,9 @@ def create_resume_history(user_id: int, resume_type: str, resume_file_url: str,
 
 def get_resume_history_by_user_id(user_id: int) -> List[Dict]:
     """
-    根据用户ID查询所有简历历史记录（按时间倒序）
+    根据用户ID查询所有简历历史记录（按时间倒序，包含完整 ai_analysis）
+    
+    列表展示请使用 list_resume_history，只读取列表需要的列并支持分页
     
     Args:
         user_id: 用户ID
@@ -668,7 +1366,7 @@ def get_resume_history_by_user_id(user_id: int) -> List[Dict]:
                 "user_id": row.get('user_id'),
                 "resume_type": row.get('resume_type'),
                 "resume_file_url": row.get('resume_file_url'),
-                "ai_analysis": row.get('ai_analysis'),
+                "ai_analysis": decode_ai_analysis(row.get('ai_analysis')),
                 "created_at": row.get('created_at').strftime("%Y-%m-%d %H:%M:%S") if row.get('created_at') else ""
             })
         
@@ -684,6 +1382,77 @@ def get_resume_history_by_user_id(user_id: int) -> List[Dict]:
             conn.close()
 
 
+# 列表查询只取这些列，ai_analysis（大 JSON 文本）只在详情接口中读取
+RESUME_HISTORY_LIST_COLUMNS = "id, resume_type, resume_file_url, created_at"
+
+
+def list_resume_history(user_id: int, limit: Optional[int] = None,
+                        cursor: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+    """
+    分页查询用户的简历历史记录列表（按 created_at、id 倒序，不读取 ai_analysis）
+    
+    使用 (created_at, id) 键集分页：下一页从上一页最后一条之后继续，
+    配合 (user_id, created_at) 复合索引（见 resume_history_indexes.sql）翻到任意一页都只扫描本页的行
+    
+    Args:
+        user_id: 用户ID
+        limit: 每页条数，None 表示不分页返回全部
+        cursor: 上一页返回的游标 (created_at, id)，None 表示从最新一条开始
+    
+    Returns:
+        Tuple[List[Dict], Optional[Tuple[str, int]]]: (本页记录, 下一页游标)，没有下一页时游标为 None
+    """
+    conn = None
+    cursor_obj = None
+    try:
+        conn, cursor_obj = get_db_cursor()
+        
+        where_sql = "user_id = %s"
+        params: list = [user_id]
+        if cursor is not None:
+            # 展开写法而不是行构造器 (created_at, id) < (%s, %s)，后者在部分 MySQL 版本中用不上索引范围扫描
+            where_sql += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+            params += [cursor[0], cursor[0], cursor[1]]
+        select_sql = f"""
+            SELECT {RESUME_HISTORY_LIST_COLUMNS}
+            FROM resume_history
+            WHERE {where_sql}
+            ORDER BY created_at DESC, id DESC
+        """
+        if limit is not None:
+            # 多取一条用于判断是否还有下一页
+            select_sql += " LIMIT %s"
+            params.append(limit + 1)
+        cursor_obj.execute(select_sql, params)
+        results = cursor_obj.fetchall()
+        
+        history_list = []
+        for row in results:
+            history_list.append({
+                "id": row.get('id'),
+                "resume_type": row.get('resume_type'),
+                "resume_file_url": row.get('resume_file_url'),
+                "created_at": row.get('created_at').strftime("%Y-%m-%d %H:%M:%S") if row.get('created_at') else ""
+            })
+        
+        next_cursor = None
+        if limit is not None and len(history_list) > limit:
+            history_list = history_list[:limit]
+            last = history_list[-1]
+            next_cursor = (last["created_at"], last["id"])
+        
+        print(f"✅ [list_resume_history] 查询到 {len(history_list)} 条历史记录，用户ID: {user_id}")
+        return history_list, next_cursor
+    except Exception as e:
+        print(f"❌ [list_resume_history] 查询历史记录失败: {e}")
+        return [], None
+    finally:
+        if cursor_obj:
+            cursor_obj.close()
+        if conn:
+            conn.close()
+
+
 def get_resume_history_by_id(history_id: int, user_id: int) -> Optional[Dict]:
     """
     根据历史记录ID和用户ID查询单条记录（确保用户只能查看自己的记录）
@@ -714,7 +1483,7 @@ def get_resume_history_by_id(history_id: int, user_id: int) -> Optional[Dict]:
                 "user_id": result.get('user_id'),
                 "resume_type": result.get('resume_type'),
                 "resume_file_url": result.get('resume_file_url'),
-                "ai_analysis": result.get('ai_analysis'),
+                "ai_analysis": decode_ai_analysis(result.get('ai_analysis')),
                 "created_at": result.get('created_at').strftime("%Y-%m-%d %H:%M:%S") if result.get('created_at') else ""
             }
             print(f"✅ [get_resume_history_by_id] 查询历史记录成功，ID: {history_id}, 用户ID: {user_id}")
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+简历文本提取缓存
+同一份 PDF 会被反复上传（诊断、换目标岗位后再诊断、简历医生页面），解析结果按
+「文件内容 SHA-256 + 解析器版本/上限」做内容寻址保存在磁盘上，重复上传直接跳过解析：
+- 每个条目一个 UTF-8 文本文件，文件 mtime 作为最近访问时间
+- 总大小超过上限时按最近访问时间淘汰（LRU）
+- 多个 worker 进程可以共用同一个目录，写入使用临时文件 + 原子替换
+
+本模块不依赖 FastAPI
+"""
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: str, chunk_size: int = 64 * 1024) -> str:
+    """分块计算文件的 SHA-256，不把整个文件读进内存"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """磁盘 LRU 缓存：key -> 提取出的文本"""
+
+    SUFFIX = ".txt"
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _path(self, key: str) -> str:
+        # key 只包含十六进制摘要和版本号，这里再做一次过滤，防止路径穿越
+        safe = "".join(ch for ch in key if ch.isalnum() or ch in "-_.")
+        return os.path.join(self.directory, safe + self.SUFFIX)
+
+    def _scan(self):
+        """返回 [(路径, 大小, 最近访问时间)]"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            now = time.time()
+            os.utime(path, (now, now))  # 刷新最近访问时间
+        except (FileNotFoundError, UnicodeDecodeError, OSError):
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return text
+
+    def set(self, key: str, text: str):
+        data = text.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ [extraction_cache] 写入失败：{e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._total_bytes += len(data) - previous
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小回到上限的 90%"""
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self._evictions += 1
+            self._total_bytes = total
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._scan():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "directory": self.directory,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+简历文本提取服务
+PDF/DOCX 解析是纯 Python 的 CPU 密集操作，在请求线程里执行会长时间占用 GIL，
+一个 30 页的 PDF 就能拖慢同一 worker 上的所有请求。这里把解析放到独立的进程池中：
+- 进程数、单个任务超时、最大页数/字符数均可通过环境变量配置
+- 任务超时视为 worker 卡死：强制结束进程池中的所有进程并重建
+- 异步接口通过 await extract() 等待，不阻塞事件循环；同步调用方（如 Streamlit）使用 extract_sync()
+- 解析结果按文件内容哈希缓存在磁盘上（见 extraction_cache），重复上传的文件不再解析
+
+本模块不依赖 FastAPI，子进程和 Streamlit 都可以直接导入
+"""
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from .extraction_cache import ExtractionCache, sha256_bytes, sha256_file
+
+# 解析逻辑变化（换解析库、调整清洗规则）时递增，旧缓存自动失效
+PARSER_VERSION = "2"
+
+
+class ExtractionError(Exception):
+    """解析失败；status_code 沿用接口层的语义（400 为文件问题，500 为服务端问题）"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message, status_code)
+        self.message = message
+        self.status_code = status_code
+
+    def __str__(self):
+        return self.message
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def _pdf_reader(data: bytes):
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise ExtractionError(f"服务器缺少文件解析依赖，请安装 PyPDF2 和 python-docx: {e}")
+    return PdfReader(BytesIO(data))
+
+
+def _extract_pdf(data: bytes, max_pages: int, max_chars: int) -> Dict:
+    reader = _pdf_reader(data)
+    total_pages = len(reader.pages)
+    parts = []
+    chars = 0
+    pages = 0
+    truncated = False
+    for page in reader.pages:
+        if max_pages and pages >= max_pages:
+            truncated = True
+            break
+        pages += 1
+        page_text = page.extract_text()
+        if page_text:
+            parts.append(page_text)
+            chars += len(page_text) + 1
+        if max_chars and chars >= max_chars:
+            truncated = pages < total_pages
+            break
+    # 页与页之间用换页符分隔，prompt_packer 据此识别跨页重复的页眉页脚
+    return {"text": "\f".join(parts), "pages": pages, "total_pages": total_pages, "truncated": truncated}
+
+
+def _extract_docx(data: bytes, max_chars: int) -> Dict:
+    try:
+        from docx import Document
+    except ImportError as e:
+        raise ExtractionError(f"服务器缺少文件解析依赖，请安装 PyPDF2 和 python-docx: {e}")
+    doc = Document(BytesIO(data))
+    parts = []
+    chars = 0
+    truncated = False
+    for para in doc.paragraphs:
+        if not para.text.strip():
+            continue
+        parts.append(para.text)
+        chars += len(para.text) + 1
+        if max_chars and chars >= max_chars:
+            truncated = True
+            break
+    return {"text": "\n".join(parts), "pages": None, "total_pages": None, "truncated": truncated}
+
+
+def _extract_txt(data: bytes) -> Dict:
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("gbk")  # 兼容中文编码
+    return {"text": text, "pages": None, "total_pages": None, "truncated": False}
+
+
+def extract_document(data: bytes, file_name: str, max_pages: int = 0, max_chars: int = 0) -> Dict:
+    """
+    在当前进程中解析文档（进程池 worker 执行的就是这个函数）
+
+    返回 {"text", "pages", "total_pages", "truncated"}；不支持的格式或空内容抛出 ExtractionError(400)
+    """
+    name = (file_name or "").lower()
+    try:
+        if name.endswith(".pdf"):
+            result = _extract_pdf(data, max_pages, max_chars)
+        elif name.endswith(".docx"):
+            result = _extract_docx(data, max_chars)
+        elif name.endswith(".txt"):
+            result = _extract_txt(data)
+        else:
+            raise ExtractionError("不支持的文件格式，请上传 PDF/DOCX/TXT 文件。", 400)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        raise ExtractionError(f"文件解析失败: {str(e)}")
+
+    text = (result["text"] or "").strip()
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars]
+        result["truncated"] = True
+    if not text:
+        raise ExtractionError("文件内容为空，或无法从文件中提取有效文本。", 400)
+    result["text"] = text
+    return result
+
+
+def extract_document_file(path: str, file_name: str, max_pages: int = 0, max_chars: int = 0) -> Dict:
+    """从已落盘的文件解析：由 worker 自己读文件，主进程不需要把文件内容读进内存再传给子进程"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise ExtractionError(f"读取上传文件失败: {str(e)}")
+    return extract_document(data, file_name, max_pages, max_chars)
+
+
+class ExtractionService:
+    """
+    基于 ProcessPoolExecutor 的解析服务
+
+    - max_workers: 进程数；为 0 时退化为在线程中解析（无法强制结束卡死的任务）
+    - timeout: 单个任务的超时（秒），超时后重建进程池
+    - max_pages / max_chars: 解析上限，超出部分直接丢弃并在结果中标记 truncated
+    - cache: 可选的磁盘缓存，命中时完全跳过解析
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 30, max_pages: int = 30,
+                 max_chars: int = 100000, cache: Optional[ExtractionCache] = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.cache = cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"jobs": 0, "failures": 0, "timeouts": 0, "restarts": 0, "truncated": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _get_executor(self) -> Tuple[ProcessPoolExecutor, int]:
+        with self._lock:
+            if self._executor is None:
+                # spawn：避免在多线程的 uvicorn 进程中 fork 导致子进程继承被持有的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor, self._generation
+
+    def _restart(self, generation: int, reason: str):
+        """强制结束当前进程池的所有 worker 并在下次提交时重建；同一代只重建一次"""
+        with self._lock:
+            if generation != self._generation or self._executor is None:
+                return
+            executor = self._executor
+            self._executor = None
+            self._generation += 1
+            self._stats["restarts"] += 1
+        print(f"⚠️ [extraction] {reason}，重建解析进程池")
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                process.kill()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def cache_key(self, digest: str, file_name: str) -> str:
+        """缓存键：内容哈希 + 解析器版本 + 文件类型 + 解析上限（上限不同，提取结果也不同）"""
+        ext = os.path.splitext((file_name or "").lower())[1].lstrip(".") or "bin"
+        return f"{digest}-v{PARSER_VERSION}-{ext}-p{self.max_pages}c{self.max_chars}"
+
+    def _finish(self, result: Dict, key: Optional[str] = None) -> str:
+        if result.get("truncated"):
+            self._count("truncated")
+            print(f"⚠️ [extraction] 文档超出解析上限，仅保留前 {result.get('pages') or '-'} 页 / {len(result['text'])} 字符")
+        if key is not None and self.cache is not None:
+            self.cache.set(key, result["text"])
+        return result["text"]
+
+    def _cached(self, data: bytes, file_name: str, digest: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (缓存键, 命中的文本)；未启用缓存时两者均为 None"""
+        if self.cache is None:
+            return None, None
+        key = self.cache_key(digest or sha256_bytes(data), file_name)
+        return key, self.cache.get(key)
+
+    async def extract(self, data: bytes, file_name: str, digest: Optional[str] = None) -> str:
+        """
+        异步解析，返回提取到的文本；失败抛出 ExtractionError
+        
+        digest 为调用方已算好的文件 SHA-256（例如上传时边读边算），不传则在这里计算
+        """
+        self._count("jobs")
+        if (file_name or "").lower().endswith(".txt"):
+            return self._finish(extract_document(data, file_name, self.max_pages, self.max_chars))
+        key, text = self._cached(data, file_name, digest)
+        if text is not None:
+            return text
+        return await self._run_async(extract_document, data, file_name, key)
+
+    async def extract_file(self, path: str, file_name: str, digest: Optional[str] = None) -> str:
+        """
+        解析已落盘的上传文件（见 upload_pipeline.spool_upload）
+
+        缓存命中时完全不读文件；未命中时由解析进程自己读取，文件内容不经过当前进程
+        """
+        self._count("jobs")
+        if (file_name or "").lower().endswith(".txt"):
+            return self._finish(await asyncio.to_thread(
+                extract_document_file, path, file_name, self.max_pages, self.max_chars))
+        key, text = None, None
+        if self.cache is not None:
+            key = self.cache_key(digest or await asyncio.to_thread(sha256_file, path), file_name)
+            text = self.cache.get(key)
+        if text is not None:
+            return text
+        return await self._run_async(extract_document_file, path, file_name, key)
+
+    async def _run_async(self, func, source, file_name: str, key: Optional[str]) -> str:
+        """在进程池中执行 func(source, file_name, ...)；超时重建进程池，进程池损坏时重试一次"""
+        if self.max_workers <= 0:
+            return self._finish(await asyncio.to_thread(
+                func, source, file_name, self.max_pages, self.max_chars), key)
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor, generation = self._get_executor()
+            try:
+                future = loop.run_in_executor(
+                    executor, func, source, file_name, self.max_pages, self.max_chars)
+                return self._finish(await asyncio.wait_for(future, self.timeout), key)
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+                self._restart(generation, f"解析任务超时（{self.timeout}s）")
+                raise ExtractionError(f"文件解析超时（超过 {self.timeout} 秒），请检查文件是否过大或已损坏")
+            except BrokenProcessPool:
+                # 进程池被其他超时任务重建，或 worker 异常退出：换新进程池重试一次
+                self._restart(generation, "解析进程异常退出")
+                if attempt == 0:
+                    continue
+                self._count("failures")
+                raise ExtractionError("文件解析进程异常退出，请稍后重试")
+            except ExtractionError:
+                self._count("failures")
+                raise
+
+    def extract_sync(self, data: bytes, file_name: str, digest: Optional[str] = None) -> str:
+        """同步解析（在调用线程中阻塞等待，供 Streamlit 等同步代码使用）"""
+        self._count("jobs")
+        if (file_name or "").lower().endswith(".txt"):
+            return self._finish(extract_document(data, file_name, self.max_pages, self.max_chars))
+        key, text = self._cached(data, file_name, digest)
+        if text is not None:
+            return text
+        if self.max_workers <= 0:
+            return self._finish(extract_document(data, file_name, self.max_pages, self.max_chars), key)
+
+        for attempt in range(2):
+            executor, generation = self._get_executor()
+            try:
+                future = executor.submit(extract_document, data, file_name, self.max_pages, self.max_chars)
+                return self._finish(future.result(timeout=self.timeout), key)
+            except FutureTimeoutError:
+                self._count("timeouts")
+                self._restart(generation, f"解析任务超时（{self.timeout}s）")
+                raise ExtractionError(f"文件解析超时（超过 {self.timeout} 秒），请检查文件是否过大或已损坏")
+            except BrokenProcessPool:
+                self._restart(generation, "解析进程异常退出")
+                if attempt == 0:
+                    continue
+                self._count("failures")
+                raise ExtractionError("文件解析进程异常退出，请稍后重试")
+            except ExtractionError:
+                self._count("failures")
+                raise
+
+    def shutdown(self):
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "workers": self.max_workers,
+                "timeout": self.timeout,
+                "max_pages": self.max_pages,
+                "max_chars": self.max_chars,
+                "pool_alive": self._executor is not None,
+                "cache": self.cache.stats() if self.cache is not None else None,
+            }
+
+
+_service: Optional[ExtractionService] = None
+_service_lock = threading.Lock()
+
+
+def get_extraction_service() -> ExtractionService:
+    """
+    获取全局解析服务（首次调用时按环境变量创建）
+
+    - EXTRACT_WORKERS: 解析进程数（默认2，0 表示在线程中解析）
+    - EXTRACT_TIMEOUT: 单个文件的解析超时（秒，默认30）
+    - EXTRACT_MAX_PAGES: 最多解析的 PDF 页数（默认30，0 表示不限制）
+    - EXTRACT_MAX_CHARS: 最多保留的字符数（默认100000，0 表示不限制）
+    - EXTRACT_CACHE_DIR: 解析结果缓存目录（默认 uploads/.extract_cache，设为空字符串则不缓存）
+    - EXTRACT_CACHE_MAX_BYTES: 缓存目录总大小上限（默认256MB）
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                cache = None
+                cache_dir = os.getenv("EXTRACT_CACHE_DIR", os.path.join("uploads", ".extract_cache")).strip()
+                if cache_dir:
+                    try:
+                        cache = ExtractionCache(cache_dir, max_bytes=_env_int("EXTRACT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+                    except OSError as e:
+                        print(f"⚠️ [extraction] 解析缓存目录不可用，不启用缓存：{e}")
+                _service = ExtractionService(
+                    max_workers=_env_int("EXTRACT_WORKERS", 2),
+                    timeout=_env_int("EXTRACT_TIMEOUT", 30),
+                    max_pages=_env_int("EXTRACT_MAX_PAGES", 30),
+                    max_chars=_env_int("EXTRACT_MAX_CHARS", 100000),
+                    cache=cache,
+                )
+    return _service
+
+
+def shutdown_extraction_service():
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.shutdown()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+并发扇出工具
+把多个互不依赖的异步调用（如多个 DeepSeek 请求）同时发出，总耗时取决于最慢的分支：
+- 每个分支可以单独设置超时
+- 分支失败不会抛出，而是记录在 BranchResult 中，由调用方决定如何降级
+- required 分支失败时可立即取消其余分支（fail_fast）
+"""
+import time
+import asyncio
+import inspect
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+Branch = Union[Awaitable, Callable[[], Awaitable]]
+
+
+@dataclass
+class BranchResult:
+    """单个分支的执行结果"""
+    name: str
+    ok: bool
+    value: Any = None
+    error: Optional[BaseException] = None
+    timed_out: bool = False
+    cancelled: bool = False
+    elapsed_ms: float = 0.0
+
+    def unwrap(self):
+        """成功时返回结果，失败时重新抛出原始异常"""
+        if self.ok:
+            return self.value
+        if self.error is not None:
+            raise self.error
+        if self.timed_out:
+            raise asyncio.TimeoutError(f"分支 {self.name} 超时")
+        raise asyncio.CancelledError(f"分支 {self.name} 已取消")
+
+
+async def _run_branch(name: str, branch: Branch, timeout: Optional[float]) -> BranchResult:
+    started = time.perf_counter()
+    try:
+        awaitable = branch() if callable(branch) and not inspect.isawaitable(branch) else branch
+        if timeout:
+            value = await asyncio.wait_for(awaitable, timeout)
+        else:
+            value = await awaitable
+        return BranchResult(name, True, value=value, elapsed_ms=(time.perf_counter() - started) * 1000)
+    except asyncio.TimeoutError as e:
+        return BranchResult(name, False, error=e, timed_out=True,
+                            elapsed_ms=(time.perf_counter() - started) * 1000)
+    except Exception as e:
+        return BranchResult(name, False, error=e, elapsed_ms=(time.perf_counter() - started) * 1000)
+
+
+async def fan_out(branches: Dict[str, Branch], timeout: Optional[float] = None,
+                  timeouts: Optional[Dict[str, float]] = None,
+                  required: Iterable[str] = (), fail_fast: bool = True) -> Dict[str, BranchResult]:
+    """
+    并发执行多个分支
+
+    Args:
+        branches: {分支名: 协程对象 或 返回协程的无参函数}
+        timeout: 所有分支的默认超时（秒），None 表示不限制
+        timeouts: 按分支名单独指定的超时，优先于 timeout
+        required: 必需分支；fail_fast=True 时任一必需分支失败会取消其余未完成分支
+        fail_fast: 是否在必需分支失败时立即取消其他分支
+
+    Returns:
+        Dict[str, BranchResult]: 与 branches 同序的结果字典，不会抛出分支内的异常
+    """
+    timeouts = timeouts or {}
+    required = set(required)
+    tasks = {
+        asyncio.ensure_future(_run_branch(name, branch, timeouts.get(name, timeout))): name
+        for name, branch in branches.items()
+    }
+    results: Dict[str, BranchResult] = {}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            failed_required = False
+            for task in done:
+                result = task.result()
+                results[result.name] = result
+                if not result.ok and result.name in required:
+                    failed_required = True
+            if failed_required and fail_fast and pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                for task in pending:
+                    name = tasks[task]
+                    results[name] = BranchResult(name, False, cancelled=True)
+                pending = set()
+    finally:
+        # 调用方自身被取消时，不留下悬空的分支任务
+        for task in pending:
+            task.cancel()
+    return {name: results[name] for name in branches}
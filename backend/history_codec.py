@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+resume_history.ai_analysis 存储编码
+ai_analysis 保存的是 {"diagnosis_report", "optimized_resume", "fallback"} 的 JSON，
+其中优化后的简历 Markdown 让每行达到几十 KB，是增长最快的表。这里在写入前压缩、读取时透明解码：
+- 编码后的值带版本前缀，如 "z1:" + base64(zlib 压缩后的 UTF-8 字节)，以后换算法只需新增前缀
+- 结果是纯 ASCII，可以直接存进现有的 TEXT 列，不需要改表结构，也不受连接字符集影响
+- 没有前缀的旧数据按原文返回，新旧数据可以共存，迁移脚本（migrate_history_codec.py）可随时分批执行
+- 内容太短、压缩后反而更大时保持原文
+
+本模块只依赖标准库
+"""
+import zlib
+import base64
+from typing import Callable, Dict, Tuple
+
+# 当前写入使用的编码版本
+CURRENT_CODEC = "z1"
+# 短于该长度（字符）的内容不压缩，前缀和 base64 的开销抵不过压缩收益
+MIN_COMPRESS_CHARS = 512
+# zlib 压缩级别：6 为默认值，9 只多省 1%~2% 但明显更慢
+ZLIB_LEVEL = 6
+
+
+def _zlib_encode(raw: bytes) -> bytes:
+    return zlib.compress(raw, ZLIB_LEVEL)
+
+
+def _zlib_decode(data: bytes) -> bytes:
+    return zlib.decompress(data)
+
+
+# 版本前缀 -> (压缩函数, 解压函数)，作用于 UTF-8 字节
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "z1": (_zlib_encode, _zlib_decode),
+}
+
+
+class HistoryCodecError(ValueError):
+    """编码后的数据无法解码（版本未知或内容损坏）"""
+
+
+def _split_prefix(stored: str):
+    head, sep, body = stored.partition(":")
+    if sep and head in CODECS:
+        return head, body
+    return None, stored
+
+
+def is_encoded(stored) -> bool:
+    """判断存储值是否已经是压缩格式"""
+    return isinstance(stored, str) and _split_prefix(stored)[0] is not None
+
+
+def encode_ai_analysis(text: str, codec: str = CURRENT_CODEC) -> str:
+    """把 ai_analysis 原文编码为存储格式；短内容或压缩无收益时返回原文"""
+    if not text or len(text) < MIN_COMPRESS_CHARS or is_encoded(text):
+        return text
+    compress, _ = CODECS[codec]
+    encoded = f"{codec}:" + base64.b64encode(compress(text.encode("utf-8"))).decode("ascii")
+    return encoded if len(encoded) < len(text.encode("utf-8")) else text
+
+
+def decode_ai_analysis(stored) -> str:
+    """把存储值还原为 ai_analysis 原文；没有版本前缀的旧数据原样返回"""
+    if stored is None:
+        return ""
+    if isinstance(stored, (bytes, bytearray)):
+        stored = bytes(stored).decode("utf-8")
+    codec, body = _split_prefix(stored)
+    if codec is None:
+        return stored
+    _, decompress = CODECS[codec]
+    try:
+        return decompress(base64.b64decode(body)).decode("utf-8")
+    except (ValueError, zlib.error) as e:
+        raise HistoryCodecError(f"ai_analysis 解码失败（{codec}）：{e}") from e
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+DeepSeek 响应缓存
+按 (model, temperature, system_prompt, user_prompt, response_format) 的哈希做内容寻址：
+- 进程内 LRU 层：按条目数和总字节数淘汰，支持 TTL
+- 可选 SQLite 层：服务重启后仍可命中，按总字节数淘汰最久未访问的条目
+- 按业务命名空间（cache_ns）开关缓存并配置 TTL
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# 各业务命名空间的默认 TTL（秒）；未列出的命名空间不缓存
+DEFAULT_CACHE_POLICY = {
+    "roadmap": 24 * 3600,           # /api/generate_roadmap：年级 + 方向组合有限
+    "career_questions": 24 * 3600,  # /api/virtual-career/questions：热门职业重复度高
+    "job_test": 12 * 3600,          # /api/generate-job-test：脚本 + 题目
+    "quantize": 7 * 24 * 3600,      # _quantize_scores_batch 按单个取值缓存：如 "省二"、"六级" 等短文本
+    "resume_diagnosis": 24 * 3600,  # /api/analyze_resume 诊断报告：同一份简历文本重复上传
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def make_cache_key(model: str, temperature: float, system_prompt: str, user_prompt: str,
+                   response_format: Optional[Dict] = None) -> str:
+    """对请求参数做规范化 JSON 序列化后取 SHA-256，作为缓存键"""
+    payload = json.dumps(
+        [model, round(float(temperature), 4), system_prompt, user_prompt, response_format or None],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目：除内容外还记录原始调用耗时和 token 数，用于统计节省量"""
+    content: str
+    expires_at: float
+    latency_ms: float = 0.0
+    tokens: int = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.content.encode("utf-8"))
+
+
+class MemoryLRU:
+    """线程安全的进程内 LRU，按条目数和总字节数双重限制"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = entry
+            self._bytes += entry.size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+
+    def _pop(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes}
+
+
+class SQLiteTier:
+    """SQLite 持久化层：服务重启后仍可命中，超过 max_bytes 时淘汰最久未访问的条目"""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " latency_ms REAL NOT NULL DEFAULT 0,"
+            " tokens INTEGER NOT NULL DEFAULT 0,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, expires_at, latency_ms, tokens FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return CacheEntry(content=row[0], expires_at=row[1], latency_ms=row[2], tokens=row[3])
+
+    def set(self, key: str, entry: CacheEntry):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, content, expires_at, latency_ms, tokens, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.content, entry.expires_at, entry.latency_ms, entry.tokens, entry.size, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        overflow = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= overflow:
+                break
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {"entries": count, "bytes": size, "path": self.path}
+
+
+class LLMResponseCache:
+    """
+    两级响应缓存：先查内存 LRU，再查 SQLite；SQLite 命中会回填内存
+
+    policy 为 {命名空间: TTL 秒}，只有出现在 policy 中且未被禁用的命名空间才会缓存
+    """
+
+    def __init__(self, memory: MemoryLRU, disk: Optional[SQLiteTier] = None,
+                 policy: Optional[Dict[str, int]] = None, disabled: Optional[set] = None):
+        self.memory = memory
+        self.disk = disk
+        self.policy = dict(DEFAULT_CACHE_POLICY if policy is None else policy)
+        self.disabled = set(disabled or ())
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+        self._saved_ms = 0.0
+        self._saved_tokens = 0
+
+    def enabled_for(self, namespace: Optional[str]) -> bool:
+        if not namespace or "all" in self.disabled or namespace in self.disabled:
+            return False
+        return namespace in self.policy
+
+    def ttl_for(self, namespace: str) -> int:
+        return self.policy.get(namespace, 0)
+
+    def get(self, key: str) -> Tuple[Optional[CacheEntry], Optional[str]]:
+        """返回 (条目, 命中层级)，未命中返回 (None, None)"""
+        entry = self.memory.get(key)
+        tier = "memory" if entry is not None else None
+        if entry is None and self.disk is not None:
+            try:
+                entry = self.disk.get(key)
+            except Exception as e:
+                print(f"⚠️ [llm_cache] SQLite 读取失败：{e}")
+                entry = None
+            if entry is not None:
+                tier = "disk"
+                self.memory.set(key, entry)
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits[tier] += 1
+                self._saved_ms += entry.latency_ms
+                self._saved_tokens += entry.tokens
+        return entry, tier
+
+    def set(self, key: str, namespace: str, content: str, latency_ms: float = 0.0, tokens: int = 0):
+        ttl = self.ttl_for(namespace)
+        if ttl <= 0:
+            return
+        entry = CacheEntry(content=content, expires_at=time.time() + ttl, latency_ms=latency_ms, tokens=tokens)
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, entry)
+            except Exception as e:
+                print(f"⚠️ [llm_cache] SQLite 写入失败：{e}")
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = dict(self._hits)
+            result = {
+                "hits": hits,
+                "misses": self._misses,
+                "saved_ms": round(self._saved_ms, 1),
+                "saved_tokens": self._saved_tokens,
+            }
+        total = sum(hits.values()) + result["misses"]
+        result["hit_rate"] = round(sum(hits.values()) / total, 4) if total else 0.0
+        result["memory"] = self.memory.stats()
+        result["disk"] = self.disk.stats() if self.disk is not None else None
+        result["policy"] = {ns: ttl for ns, ttl in self.policy.items() if self.enabled_for(ns)}
+        return result
+
+
+def build_cache_from_env() -> LLMResponseCache:
+    """
+    按环境变量创建缓存
+
+    - LLM_CACHE_MAX_ENTRIES: 内存层最大条目数（默认1000）
+    - LLM_CACHE_MAX_BYTES: 内存层最大字节数（默认64MB）
+    - LLM_CACHE_DB: SQLite 文件路径，设置后启用持久化层（默认不启用）
+    - LLM_CACHE_DB_MAX_BYTES: SQLite 层最大字节数（默认256MB）
+    - LLM_CACHE_DISABLED: 逗号分隔的禁用命名空间，"all" 表示全部禁用
+    """
+    memory = MemoryLRU(
+        max_entries=_env_int("LLM_CACHE_MAX_ENTRIES", 1000),
+        max_bytes=_env_int("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    )
+    disk = None
+    db_path = os.getenv("LLM_CACHE_DB", "").strip()
+    if db_path:
+        try:
+            disk = SQLiteTier(db_path, max_bytes=_env_int("LLM_CACHE_DB_MAX_BYTES", 256 * 1024 * 1024))
+        except Exception as e:
+            print(f"⚠️ [llm_cache] SQLite 缓存初始化失败，仅使用内存缓存：{e}")
+    disabled = {ns.strip() for ns in os.getenv("LLM_CACHE_DISABLED", "").split(",") if ns.strip()}
+    return LLMResponseCache(memory, disk, disabled=disabled)
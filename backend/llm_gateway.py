@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+DeepSeek 异步调用网关
+基于 AsyncOpenAI + 共享的 httpx 连接池，AI 接口 await 调用时不会占用 Starlette 线程池
+同时为同步调用方保留 chat_sync()，两条路径共用同一份响应缓存
+stream() 以 stream=True 逐段返回内容，供 SSE 接口边生成边推送
+并发的相同请求通过 SingleFlight 合并为一次上游调用
+"""
+import os
+import json
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from .llm_cache import LLMResponseCache, make_cache_key
+from .singleflight import SingleFlight
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_MODEL = "deepseek-chat"
+
+# 当前请求内的 LLM 调用记录（由 LLMMetaMiddleware 为每个 /api 请求初始化）
+_llm_calls: ContextVar[Optional[List[Dict]]] = ContextVar("llm_calls", default=None)
+
+
+def _env_number(name: str, default: float) -> float:
+    """读取数字型环境变量，非法值回退到默认值"""
+    try:
+        return float(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def begin_llm_meta() -> List[Dict]:
+    """为当前请求开启一份新的调用记录"""
+    calls: List[Dict] = []
+    _llm_calls.set(calls)
+    return calls
+
+
+class LLMMetaMiddleware:
+    """
+    纯 ASGI 中间件：只为 path_prefix 下的 HTTP 请求开启新的 LLM 调用记录
+
+    不经过 BaseHTTPMiddleware，静态文件和 SSE 流式响应没有额外的包装开销
+    """
+
+    def __init__(self, app, path_prefix: str = "/api"):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope.get("path", "").startswith(self.path_prefix):
+            begin_llm_meta()
+        await self.app(scope, receive, send)
+
+
+def record_llm_call(namespace: Optional[str], cache_tier: Optional[str], latency_ms: float,
+                    tokens: int = 0, saved_ms: float = 0.0):
+    calls = _llm_calls.get()
+    if calls is not None:
+        calls.append({
+            "namespace": namespace,
+            "cache": cache_tier,
+            "latency_ms": round(latency_ms, 1),
+            "tokens": tokens,
+            "saved_ms": round(saved_ms, 1),
+        })
+
+
+def collect_llm_meta() -> Dict:
+    """汇总当前请求的 LLM 调用情况，放进接口返回的 llm_meta 字段"""
+    calls = _llm_calls.get() or []
+    hits = [c for c in calls if c["cache"]]
+    return {
+        "calls": len(calls),
+        "cache_hits": len(hits),
+        "saved_ms": round(sum(c["saved_ms"] for c in hits), 1),
+        "saved_tokens": sum(c["tokens"] for c in hits),
+    }
+
+
+def _strip(content: str) -> str:
+    return (content or "").strip()
+
+
+def _parse_json(content: str) -> dict:
+    return json.loads(content or "{}")
+
+
+class LLMGateway:
+    """
+    DeepSeek 客户端封装
+
+    - 异步调用共享同一个 httpx.AsyncClient（连接复用 + 并发上限）
+    - 客户端在首次调用时才创建，保证绑定到 uvicorn 的事件循环
+    - 传入 cache_ns 时按命名空间策略读写响应缓存；只有解析成功的内容才会写入缓存
+    - 缓存未命中时，指纹相同的并发请求（同步/异步均可）只发起一次上游调用，其余等待方共享结果；
+      流式调用不参与合并
+    - 只负责调用与解析，不处理 HTTP 错误语义（由调用方转换为 HTTPException）
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEEPSEEK_BASE_URL, model: str = DEEPSEEK_MODEL,
+                 max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+                 timeout: Optional[float] = None, sync_client=None,
+                 cache: Optional[LLMResponseCache] = None, singleflight: Optional[SingleFlight] = None,
+                 coalesce_timeout: Optional[float] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_connections = max_connections or int(_env_number("DEEPSEEK_MAX_CONNECTIONS", 100))
+        self.max_keepalive = max_keepalive or int(_env_number("DEEPSEEK_MAX_KEEPALIVE", 20))
+        self.timeout = timeout or _env_number("DEEPSEEK_TIMEOUT", 120)
+        self.sync_client = sync_client
+        self.cache = cache
+        self.singleflight = singleflight if singleflight is not None else SingleFlight()
+        # 合并等待方的独立超时，默认与上游超时一致
+        self.coalesce_timeout = coalesce_timeout or _env_number("DEEPSEEK_COALESCE_TIMEOUT", self.timeout)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self) -> AsyncOpenAI:
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    self._http_client = httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                        ),
+                        timeout=httpx.Timeout(self.timeout, connect=10.0),
+                    )
+                    self._client = AsyncOpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        http_client=self._http_client,
+                    )
+        return self._client
+
+    def _request_kwargs(self, system_prompt: str, user_prompt: str, temperature: float,
+                        response_format: Optional[Dict]) -> Dict:
+        kwargs = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": temperature,
+        }
+        if response_format:
+            kwargs["response_format"] = response_format
+        return kwargs
+
+    def _cache_key(self, system_prompt: str, user_prompt: str, temperature: float,
+                   response_format: Optional[Dict], cache_ns: Optional[str]) -> Optional[str]:
+        if self.cache is None or not self.cache.enabled_for(cache_ns):
+            return None
+        return make_cache_key(self.model, temperature, system_prompt, user_prompt, response_format)
+
+    def _flight_key(self, system_prompt: str, user_prompt: str, temperature: float,
+                    response_format: Optional[Dict], cache_key: Optional[str]) -> str:
+        """请求指纹：与缓存键的算法相同，已算出缓存键时直接复用"""
+        return cache_key or make_cache_key(self.model, temperature, system_prompt, user_prompt, response_format)
+
+    @staticmethod
+    def _usage_tokens(resp) -> int:
+        usage = getattr(resp, "usage", None)
+        return int(getattr(usage, "total_tokens", 0) or 0) if usage else 0
+
+    # ---------- 异步路径 ----------
+    async def chat(self, system_prompt: str, user_prompt: str, temperature: float,
+                   response_format: Optional[Dict] = None, cache_ns: Optional[str] = None,
+                   parse: Callable = _strip):
+        """发起一次对话补全，返回 parse(原始文本) 的结果"""
+        key = self._cache_key(system_prompt, user_prompt, temperature, response_format, cache_ns)
+        if key is not None:
+            entry, tier = await asyncio.to_thread(self.cache.get, key) if self.cache.disk else self.cache.get(key)
+            if entry is not None:
+                record_llm_call(cache_ns, tier, 0.0, entry.tokens, entry.latency_ms)
+                return parse(entry.content)
+
+        async def call_upstream():
+            client = await self._get_client()
+            started = time.perf_counter()
+            resp = await client.chat.completions.create(
+                **self._request_kwargs(system_prompt, user_prompt, temperature, response_format)
+            )
+            latency_ms = (time.perf_counter() - started) * 1000
+            return resp.choices[0].message.content or "", latency_ms, self._usage_tokens(resp)
+
+        waited = time.perf_counter()
+        (content, latency_ms, tokens), shared = await self.singleflight.do_async(
+            self._flight_key(system_prompt, user_prompt, temperature, response_format, key),
+            call_upstream, timeout=self.coalesce_timeout,
+        )
+        result = parse(content)
+        if shared:
+            # 合并到他人的调用：不重复写缓存，记为一次 "coalesced" 命中
+            record_llm_call(cache_ns, "coalesced", (time.perf_counter() - waited) * 1000, tokens)
+            return result
+        record_llm_call(cache_ns, None, latency_ms, tokens)
+        if key is not None:
+            if self.cache.disk:
+                await asyncio.to_thread(self.cache.set, key, cache_ns, content, latency_ms, tokens)
+            else:
+                self.cache.set(key, cache_ns, content, latency_ms, tokens)
+        return result
+
+    async def markdown(self, system_prompt: str, user_prompt: str, temperature: float = 0.4,
+                       cache_ns: Optional[str] = None) -> str:
+        """返回 Markdown 文本"""
+        return await self.chat(system_prompt, user_prompt, temperature, cache_ns=cache_ns)
+
+    async def json(self, system_prompt: str, user_prompt: str, temperature: float = 0.3,
+                   cache_ns: Optional[str] = None) -> dict:
+        """要求模型返回严格 JSON 对象并解析"""
+        return await self.chat(
+            system_prompt, user_prompt, temperature,
+            response_format={"type": "json_object"}, cache_ns=cache_ns, parse=_parse_json,
+        )
+
+    async def stream(self, system_prompt: str, user_prompt: str, temperature: float = 0.4,
+                     cache_ns: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        流式对话补全，逐段产出增量文本
+
+        缓存命中时一次性产出完整内容；流结束后按完整文本记录调用并写入缓存
+        """
+        key = self._cache_key(system_prompt, user_prompt, temperature, None, cache_ns)
+        if key is not None:
+            entry, tier = await asyncio.to_thread(self.cache.get, key) if self.cache.disk else self.cache.get(key)
+            if entry is not None:
+                record_llm_call(cache_ns, tier, 0.0, entry.tokens, entry.latency_ms)
+                yield entry.content
+                return
+
+        client = await self._get_client()
+        started = time.perf_counter()
+        resp = await client.chat.completions.create(
+            **self._request_kwargs(system_prompt, user_prompt, temperature, None),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        parts: List[str] = []
+        tokens = 0
+        async for chunk in resp:
+            if getattr(chunk, "usage", None):
+                tokens = self._usage_tokens(chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                parts.append(delta)
+                yield delta
+        latency_ms = (time.perf_counter() - started) * 1000
+        content = "".join(parts)
+        record_llm_call(cache_ns, None, latency_ms, tokens)
+        if key is not None and content.strip():
+            if self.cache.disk:
+                await asyncio.to_thread(self.cache.set, key, cache_ns, content, latency_ms, tokens)
+            else:
+                self.cache.set(key, cache_ns, content, latency_ms, tokens)
+
+    # ---------- 同步路径（供仍为 def 的接口在线程池中调用） ----------
+    def chat_sync(self, system_prompt: str, user_prompt: str, temperature: float,
+                  response_format: Optional[Dict] = None, cache_ns: Optional[str] = None,
+                  parse: Callable = _strip):
+        if self.sync_client is None:
+            raise RuntimeError("LLMGateway 未配置同步客户端")
+        key = self._cache_key(system_prompt, user_prompt, temperature, response_format, cache_ns)
+        if key is not None:
+            entry, tier = self.cache.get(key)
+            if entry is not None:
+                record_llm_call(cache_ns, tier, 0.0, entry.tokens, entry.latency_ms)
+                return parse(entry.content)
+
+        def call_upstream():
+            started = time.perf_counter()
+            resp = self.sync_client.chat.completions.create(
+                **self._request_kwargs(system_prompt, user_prompt, temperature, response_format)
+            )
+            latency_ms = (time.perf_counter() - started) * 1000
+            return resp.choices[0].message.content or "", latency_ms, self._usage_tokens(resp)
+
+        waited = time.perf_counter()
+        (content, latency_ms, tokens), shared = self.singleflight.do(
+            self._flight_key(system_prompt, user_prompt, temperature, response_format, key),
+            call_upstream, timeout=self.coalesce_timeout,
+        )
+        result = parse(content)
+        if shared:
+            record_llm_call(cache_ns, "coalesced", (time.perf_counter() - waited) * 1000, tokens)
+            return result
+        record_llm_call(cache_ns, None, latency_ms, tokens)
+        if key is not None:
+            self.cache.set(key, cache_ns, content, latency_ms, tokens)
+        return result
+
+    def markdown_sync(self, system_prompt: str, user_prompt: str, temperature: float = 0.4,
+                      cache_ns: Optional[str] = None) -> str:
+        return self.chat_sync(system_prompt, user_prompt, temperature, cache_ns=cache_ns)
+
+    def json_sync(self, system_prompt: str, user_prompt: str, temperature: float = 0.3,
+                  cache_ns: Optional[str] = None) -> dict:
+        return self.chat_sync(
+            system_prompt, user_prompt, temperature,
+            response_format={"type": "json_object"}, cache_ns=cache_ns, parse=_parse_json,
+        )
+
+    async def aclose(self):
+        """关闭共享连接池（服务停止时调用）"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._client = None
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+本地规则量化引擎
+把 "GPA 3.8/4.0"、"排名前10%"、"六级560"、"雅思7"、"省一"、"字节实习3个月" 这类常见写法
+直接换算为 0-100 分数，置信度足够时不再调用 DeepSeek：
+- 规则与词表放在 data/score_rules.json，新增写法只需要改数据文件
+- 规则在加载时预编译，每次量化只做正则匹配和插值
+- 每个结果都带置信度，低于阈值的输入仍交给 LLM 兜底
+"""
+import os
+import re
+import json
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "score_rules.json")
+
+# 常见的中文数量词，例如 "两个项目"、"三段实习"、"六个月"
+_CN_DIGITS = {"一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+_CN_COUNT_RE = re.compile(r"(十[一二三四五六七八九]?|[一二两三四五六七八九]十?)(?=\s*(?:个|段|项|次|年|份))")
+_NOISE_RE = re.compile(r"[\s,，。、;；:：/()（）\-—+~～!！?？]+")
+# 自然语言描述按分句计算覆盖率（分句内通常只描述一件事）
+_CLAUSE_RE = re.compile(r"[,，。;；!！?？\n]+")
+
+
+def _cn_to_int(token: str) -> int:
+    if token.startswith("十"):
+        return 10 + _CN_DIGITS.get(token[1:], 0)
+    if token.endswith("十"):
+        return _CN_DIGITS[token[0]] * 10
+    return _CN_DIGITS[token]
+
+
+def normalize_text(text: str) -> str:
+    """统一大小写、全角符号，并把中文数量词换成阿拉伯数字"""
+    text = (text or "").strip().lower()
+    text = text.replace("％", "%").replace("／", "/").replace("．", ".").replace("半年", "6个月")
+    return _CN_COUNT_RE.sub(lambda m: str(_cn_to_int(m.group(1))), text)
+
+
+def _interpolate(points: List[List[float]], x: float) -> float:
+    """分段线性插值，超出两端时取端点分数"""
+    if x <= points[0][0]:
+        return points[0][1]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if x <= x1:
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    return points[-1][1]
+
+
+@dataclass
+class LocalScore:
+    """本地量化结果"""
+    score: int
+    confidence: float
+    rules: List[str]
+    specificity: float = 0.0  # 命中规则自身置信度的最大值（未按覆盖率折算）
+
+
+class _Rule:
+    """预编译后的单条规则：fixed（词表）、ratio（a/b 换算）、interp（分段插值）"""
+
+    def __init__(self, spec: Dict):
+        self.name = spec.get("name") or spec["pattern"]
+        self.type = spec.get("type", "fixed")
+        self.regex = re.compile(spec["pattern"], re.IGNORECASE)
+        self.confidence = float(spec.get("confidence", 0.8))
+        self.fixed_score = spec.get("score")
+        self.points = sorted(spec.get("points") or [])
+        self.percent_of = bool(spec.get("percent_of"))
+        self.exclusive = bool(spec.get("exclusive"))  # 命中时忽略同维度的其他命中（如 "没有英语证书"）
+        if self.type == "fixed" and self.fixed_score is None:
+            raise ValueError(f"规则 {self.name} 缺少 score")
+        if self.type == "interp" and len(self.points) < 2:
+            raise ValueError(f"规则 {self.name} 至少需要两个插值点")
+
+    def evaluate(self, match) -> Optional[float]:
+        if self.type == "fixed":
+            return float(self.fixed_score)
+        value = float(match.group(1))
+        if self.type == "ratio":
+            total = float(match.group(2))
+            return value / total * 100 if total > 0 and value <= total else None
+        if self.percent_of:
+            total = float(match.group(2))
+            if total <= 0 or value > total:
+                return None
+            value = value / total * 100
+        return _interpolate(self.points, value)
+
+
+class LocalScorer:
+    """
+    按维度量化文本
+
+    - score(value, dimension)：单个维度的简短输入（竞争力分析表单），置信度会按匹配覆盖率折算
+    - score_text(text)：一段包含多个维度的自然语言描述，返回能识别出的维度
+    - lookup(value, dimension)：只返回置信度达标的结果，并记录命中统计
+    - can_override(result)：命中了高特异性规则（override_confidence 以上）的结果才可以覆盖 LLM 的分数
+    """
+
+    def __init__(self, rules: Optional[Dict] = None, min_confidence: Optional[float] = None):
+        rules = rules or {}
+        self.version = rules.get("version", 0)
+        self.min_confidence = float(
+            min_confidence if min_confidence is not None else rules.get("min_confidence", 0.7)
+        )
+        self.override_confidence = float(rules.get("override_confidence", 0.85))
+        self.dimensions: Dict[str, Dict] = {}
+        self._aliases: Dict[str, str] = {}
+        for dim, spec in (rules.get("dimensions") or {}).items():
+            self.dimensions[dim] = {
+                "combine": spec.get("combine", "max"),
+                "rules": [_Rule(r) for r in spec.get("rules", [])],
+            }
+            for alias in [dim] + list(spec.get("aliases", [])):
+                self._aliases[alias.lower()] = dim
+        self._rule_confidence = {
+            dim: {rule.name: rule.confidence for rule in spec["rules"]} for dim, spec in self.dimensions.items()
+        }
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_PATH, min_confidence: Optional[float] = None) -> "LocalScorer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), min_confidence=min_confidence)
+
+    def resolve_dimension(self, name: str) -> Optional[str]:
+        """把字段名/中文维度名（如 project_experience、项目实战经验）映射到规则维度"""
+        return self._aliases.get((name or "").strip().lower())
+
+    def _match(self, text: str, dimension: str):
+        """收集所有命中；重叠的命中只保留置信度更高的一条"""
+        candidates = []
+        for rule in self.dimensions[dimension]["rules"]:
+            for m in rule.regex.finditer(text):
+                score = rule.evaluate(m)
+                if score is not None:
+                    candidates.append((rule.confidence, m.start(), m.end(), score, rule.name, rule.exclusive))
+        candidates.sort(key=lambda c: (-c[0], c[1]))
+        accepted = []
+        for cand in candidates:
+            if all(cand[2] <= a[1] or cand[1] >= a[2] for a in accepted):
+                accepted.append(cand)
+        exclusive = [a for a in accepted if a[5]]
+        return exclusive or accepted
+
+    @staticmethod
+    def _coverage_factor(text: str, accepted) -> float:
+        """输入中被命中覆盖的比例折算为置信度系数（全部覆盖为 1.0，几乎未覆盖接近 0.7）"""
+        meaningful = len(_NOISE_RE.sub("", text))
+        covered = sum(len(_NOISE_RE.sub("", text[a[1]:a[2]])) for a in accepted)
+        coverage = min(1.0, covered / meaningful) if meaningful else 1.0
+        return 0.7 + 0.3 * coverage
+
+    def _combine(self, dimension: str, accepted) -> LocalScore:
+        if self.dimensions[dimension]["combine"] == "mean":
+            score = sum(a[3] for a in accepted) / len(accepted)
+            confidence = sum(a[0] for a in accepted) / len(accepted)
+        else:
+            best = max(accepted, key=lambda a: (a[3], a[0]))
+            score, confidence = best[3], best[0]
+        return LocalScore(
+            score=max(0, min(100, int(round(score)))),
+            confidence=round(confidence, 3),
+            rules=[a[4] for a in accepted],
+            specificity=max(a[0] for a in accepted),
+        )
+
+    def score(self, value: str, dimension: str) -> Optional[LocalScore]:
+        """量化单个维度的输入；输入中未被规则覆盖的部分越多，置信度越低"""
+        dim = self.resolve_dimension(dimension)
+        text = normalize_text(value)
+        if dim is None or not text:
+            return None
+        accepted = self._match(text, dim)
+        if not accepted:
+            return None
+        result = self._combine(dim, accepted)
+        result.confidence = round(result.confidence * self._coverage_factor(text, accepted), 3)
+        return result
+
+    def score_text(self, text: str) -> Dict[str, LocalScore]:
+        """
+        从自然语言描述中识别各维度，只返回有命中的维度
+
+        与 score() 一样按覆盖率折算置信度，只是以命中所在的分句为单位：
+        "参与过字节实习" 里的 "参与" 只覆盖了分句的一小部分，不会被当作高置信度的领导力证据
+        """
+        text = normalize_text(text)
+        results = {}
+        if not text:
+            return results
+        clauses = [c for c in _CLAUSE_RE.split(text) if c.strip()]
+        for dim in self.dimensions:
+            accepted = []
+            for clause in clauses:
+                hits = self._match(clause, dim)
+                if hits:
+                    factor = self._coverage_factor(clause, hits)
+                    accepted.extend((a[0] * factor,) + a[1:] for a in hits)
+            if any(a[5] for a in accepted):
+                accepted = [a for a in accepted if a[5]]
+            if accepted:
+                result = self._combine(dim, accepted)
+                # specificity 取规则自身的置信度，不受覆盖率折算影响
+                result.specificity = max(self._rule_confidence[dim][name] for name in result.rules)
+                results[dim] = result
+        return results
+
+    def is_confident(self, result: Optional[LocalScore]) -> bool:
+        return result is not None and result.confidence >= self.min_confidence
+
+    def can_override(self, result: Optional[LocalScore]) -> bool:
+        """置信度达标且命中了高特异性规则（如 "六级560"、"GPA 3.8/4.0"），才优先于 LLM 的结果"""
+        return self.is_confident(result) and result.specificity >= self.override_confidence
+
+    def lookup(self, value: str, dimension: str) -> Optional[LocalScore]:
+        """置信度达标时返回本地结果，否则返回 None（调用方应回退到 LLM）"""
+        result = self.score(value, dimension)
+        dim = self.resolve_dimension(dimension) or dimension
+        self.record(dim, self.is_confident(result))
+        return result if self.is_confident(result) else None
+
+    def record(self, dimension: str, hit: bool):
+        with self._lock:
+            counter = self._hits if hit else self._misses
+            counter[dimension] = counter.get(dimension, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            return {
+                "rules_version": self.version,
+                "min_confidence": self.min_confidence,
+                "local_hits": hits,
+                "llm_fallbacks": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "by_dimension": {
+                    dim: {"hits": self._hits.get(dim, 0), "fallbacks": self._misses.get(dim, 0)}
+                    for dim in sorted(set(self._hits) | set(self._misses))
+                },
+            }
+
+
+def load_local_scorer() -> LocalScorer:
+    """
+    按环境变量加载规则
+
+    - LOCAL_SCORER_RULES: 规则文件路径（默认 backend/data/score_rules.json）
+    - LOCAL_SCORER_MIN_CONFIDENCE: 覆盖规则文件中的置信度阈值
+    - LOCAL_SCORER_DISABLED: 设为 1/true 时不加载任何规则，全部交给 LLM
+    """
+    if os.getenv("LOCAL_SCORER_DISABLED", "").strip().lower() in ("1", "true", "yes"):
+        print("⚠️ [local_scorer] 本地量化已禁用")
+        return LocalScorer()
+    min_confidence = None
+    raw = os.getenv("LOCAL_SCORER_MIN_CONFIDENCE", "").strip()
+    if raw:
+        try:
+            min_confidence = float(raw)
+        except ValueError:
+            print(f"⚠️ [local_scorer] LOCAL_SCORER_MIN_CONFIDENCE 非法：{raw}，使用规则文件中的阈值")
+    path = os.getenv("LOCAL_SCORER_RULES", "").strip() or DEFAULT_RULES_PATH
+    try:
+        scorer = LocalScorer.from_file(path, min_confidence=min_confidence)
+        print(f"✅ [local_scorer] 已加载量化规则：{path}（{len(scorer.dimensions)} 个维度）")
+        return scorer
+    except Exception as e:
+        print(f"❌ [local_scorer] 量化规则加载失败，全部交给 LLM：{e}")
+        return LocalScorer()
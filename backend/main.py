@@ -1,9 +1,10 @@
 import time
 import random
+import asyncio
 import csv
 import os
 import datetime
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
@@ -17,6 +18,7 @@ from openai import OpenAI
 from io import BytesIO
 import io
 import traceback
+import tempfile
 
 # 文件解析库（按需导入，避免依赖问题）
 try:
@@ -41,18 +43,47 @@ from .db_config import (
     get_all_users,
     get_user_by_username,
     user_login,
+    authenticate_user,
     update_user_field,
     update_user_multiple_fields,
     create_user,
     increment_user_field,
     decrement_user_field,
-    create_resume_history,  # 关键修复点：新增简历历史记录创建函数
-    get_resume_history_by_user_id,  # 关键修复点：新增查询用户历史记录函数
+    list_resume_history,
+    user_cache,
     get_resume_history_by_id,  # 关键修复点：新增查询单条历史记录函数
+    close_db_pool,
+    close_user_counters,
+    counter_buffer,
+    check_db_health,
 )
+from .db_backend import close_db_backend, get_async_db
+from .llm_cache import build_cache_from_env, make_cache_key
+from .llm_gateway import LLMGateway, LLMMetaMiddleware, collect_llm_meta, record_llm_call
+from .fanout import fan_out
+from .local_scorer import load_local_scorer
+from .sse_stream import StreamResultStore, sse_response
+from .prompt_packer import DEFAULT_TOKEN_BUDGET, pack_resume
+from .profile_store import close_profile_store, get_profile_store
+from .upload_log import META_FIELDS, close_upload_log, get_upload_log
+from .upload_pipeline import UploadError, SpooledUpload, check_extension, spool_upload
+from .extraction_service import ExtractionError, get_extraction_service, shutdown_extraction_service
 
 app = FastAPI()
 
+
+@app.on_event("shutdown")
+def _shutdown_db_pool():
+    """服务停止时先同步写回缓冲的计数增量，再关闭数据库连接池"""
+    close_user_counters()
+    close_db_pool()
+
+
+@app.on_event("shutdown")
+async def _shutdown_db_backend():
+    """服务停止时关闭异步数据库连接池（DB_BACKEND=async 时）"""
+    await close_db_backend()
+
 os.makedirs("static/avatars", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -76,6 +107,8 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+# 每个 /api 请求开启新的 LLM 调用记录，接口可通过 collect_llm_meta() 汇总缓存命中情况
+app.add_middleware(LLMMetaMiddleware, path_prefix="/api")
 
 # ==========================================
 #  DeepSeek 客户端 (新增：虚拟实验 & 生涯规划整合)
@@ -85,152 +118,126 @@ deepseek_client = OpenAI(
     api_key=DEEPSEEK_API_KEY,
     base_url="https://api.deepseek.com"
 )
+# 响应缓存：相同 prompt 的确定性请求直接复用结果（按命名空间开关，见 llm_cache.DEFAULT_CACHE_POLICY）
+llm_response_cache = build_cache_from_env()
+# 异步网关：耗时的 AI 接口使用 await 调用，不占用线程池；同步接口复用同一份缓存
+deepseek_gateway = LLMGateway(
+    api_key=DEEPSEEK_API_KEY,
+    base_url="https://api.deepseek.com",
+    sync_client=deepseek_client,
+    cache=llm_response_cache,
+)
+# 本地规则量化："省一"、"六级560" 等常见写法直接打分，置信度不足时才调用 DeepSeek
+local_scorer = load_local_scorer()
+
+
+@app.on_event("shutdown")
+async def _shutdown_deepseek_gateway():
+    """服务停止时关闭 DeepSeek 共享连接池"""
+    await deepseek_gateway.aclose()
 
-def _deepseek_markdown(system_prompt: str, user_prompt: str) -> str:
-    """调用 DeepSeek，返回 Markdown 文本"""
+
+@app.on_event("shutdown")
+def _shutdown_extraction_service():
+    """服务停止时关闭简历解析进程池"""
+    shutdown_extraction_service()
+
+
+@app.on_event("startup")
+def _init_profile_store():
+    """启动时打开用户资料存储，首次启动会从 data/profiles.csv 一次性迁移"""
     try:
-        resp = deepseek_client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.4,
-        )
-        return (resp.choices[0].message.content or "").strip()
+        get_profile_store()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"DeepSeek 调用失败: {e}")
+        print(f"❌ [profile_store] 用户资料存储初始化失败: {e}")
+
 
-def _deepseek_json(system_prompt: str, user_prompt: str) -> dict:
-    """调用 DeepSeek，要求其返回严格 JSON 对象"""
+@app.on_event("startup")
+def _init_upload_log():
+    """启动时重放上传记录日志、重建内存索引，首次启动会从 data/uploaded_resumes.csv 一次性导入"""
     try:
-        resp = deepseek_client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.3,
-            response_format={"type": "json_object"},
-        )
-        content = resp.choices[0].message.content or "{}"
-        return json.loads(content)
+        get_upload_log()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"DeepSeek(JSON) 调用失败: {e}")
+        print(f"❌ [upload_log] 上传记录日志初始化失败: {e}")
 
 
-def extract_text_from_file(upload_file: UploadFile) -> str:
-    """
-    从上传的文件中提取文本内容，支持 PDF / DOCX / TXT。
-    解析失败时抛出带有明确信息的 HTTPException，避免静默返回空内容。
-    """
-    try:
-        from PyPDF2 import PdfReader
-        from docx import Document
-    except ImportError as e:
-        # 依赖缺失时直接给出明确提示，方便在 Render 等环境排查
-        raise HTTPException(status_code=500, detail=f"服务器缺少文件解析依赖，请安装 PyPDF2 和 python-docx: {e}")
+@app.on_event("shutdown")
+def _shutdown_profile_store():
+    """服务停止时关闭用户资料存储"""
+    close_profile_store()
 
-    try:
-        file_content = upload_file.file.read()
-        file_name = (upload_file.filename or "").lower()
 
-        # 基本类型检查
-        if file_name.endswith(".pdf"):
-            try:
-                reader = PdfReader(BytesIO(file_content))
-                text_parts = []
-                for page in reader.pages:
-                    page_text = page.extract_text() or ""
-                    text_parts.append(page_text)
-                text = "\n".join(text_parts)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"PDF 解析失败: {str(e)}")
+@app.on_event("shutdown")
+def _shutdown_upload_log():
+    """服务停止时等待后台压缩结束并关闭上传记录日志"""
+    close_upload_log()
 
-        elif file_name.endswith(".docx"):
-            try:
-                doc = Document(BytesIO(file_content))
-                text = "\n".join([para.text for para in doc.paragraphs])
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"DOCX 解析失败: {str(e)}")
 
-        elif file_name.endswith(".txt"):
-            try:
-                text = file_content.decode("utf-8")
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"TXT 解码失败: {str(e)}")
+def _deepseek_markdown(system_prompt: str, user_prompt: str, cache_ns: Optional[str] = None) -> str:
+    """调用 DeepSeek，返回 Markdown 文本（传入 cache_ns 时走响应缓存）"""
+    try:
+        return deepseek_gateway.markdown_sync(system_prompt, user_prompt, temperature=0.4, cache_ns=cache_ns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DeepSeek 调用失败: {e}")
 
-        else:
-            raise HTTPException(status_code=400, detail="不支持的文件格式，请上传 PDF/DOCX/TXT 文件。")
+def _deepseek_json(system_prompt: str, user_prompt: str, cache_ns: Optional[str] = None) -> dict:
+    """调用 DeepSeek，要求其返回严格 JSON 对象（传入 cache_ns 时走响应缓存）"""
+    try:
+        return deepseek_gateway.json_sync(system_prompt, user_prompt, temperature=0.3, cache_ns=cache_ns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DeepSeek(JSON) 调用失败: {e}")
 
-        if not text or not text.strip():
-            raise HTTPException(status_code=400, detail="文件内容为空，请检查文件。")
+async def _adeepseek_markdown(system_prompt: str, user_prompt: str, cache_ns: Optional[str] = None) -> str:
+    """异步调用 DeepSeek，返回 Markdown 文本"""
+    try:
+        return await deepseek_gateway.markdown(system_prompt, user_prompt, temperature=0.4, cache_ns=cache_ns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DeepSeek 调用失败: {e}")
 
-        return text
-    except HTTPException:
-        # 保持 HTTPException 语义，直接向上抛给接口处理
-        raise
+async def _adeepseek_json(system_prompt: str, user_prompt: str, cache_ns: Optional[str] = None) -> dict:
+    """异步调用 DeepSeek，要求其返回严格 JSON 对象"""
+    try:
+        return await deepseek_gateway.json(system_prompt, user_prompt, temperature=0.3, cache_ns=cache_ns)
     except Exception as e:
-        # 兜底异常处理，确保不会静默失败
-        raise HTTPException(status_code=500, detail=f"文件解析失败: {str(e)}")
-    finally:
-        # 重置文件指针，避免影响后续操作
+        raise HTTPException(status_code=500, detail=f"DeepSeek(JSON) 调用失败: {e}")
+
+# 流式接口生成完成的文档暂存 10 分钟，客户端断线后可按 stream_id 取回
+stream_result_store = StreamResultStore(ttl=600)
+
+def _markdown_stream_producer(system_prompt: str, user_prompt: str, tag: str,
+                              fallback: Optional[str] = None, extra: Optional[dict] = None):
+    """
+    生成 SSE 任务：逐段推送 delta 事件，结束时 done 事件携带完整 Markdown
+    
+    done 的数据与对应非流式接口的返回结构一致；传入 fallback 时 AI 失败会用降级内容收尾，否则推送 error 事件
+    """
+    async def producer(emit):
+        parts = []
         try:
-            upload_file.file.seek(0)
-        except Exception:
-            pass
+            async for delta in deepseek_gateway.stream(system_prompt, user_prompt, temperature=0.4):
+                parts.append(delta)
+                emit("delta", {"text": delta})
+        except Exception as e:
+            if fallback is None:
+                raise HTTPException(status_code=500, detail=f"DeepSeek 调用失败: {e}")
+            print(f"❌ [{tag}] 流式生成失败，启用降级内容: {e}")
+            return {"success": True, "markdown": fallback, **(extra or {}), "fallback": True}
+        markdown = "".join(parts).strip()
+        print(f"✅ [{tag}] 流式生成完成，长度: {len(markdown)} 字符")
+        return {"success": True, "markdown": markdown, **(extra or {}), "fallback": False}
+    return producer
+
 
 # ==========================================
 #  简历文件解析函数
 # ==========================================
-def extract_text_from_file(upload_file: UploadFile) -> str:
-    """从上传的文件中提取文本内容"""
-    import PyPDF2
-    from docx import Document
-    from io import BytesIO
-
-    try:
-        # 读取文件内容
-        file_content = upload_file.file.read()
-        file_name = upload_file.filename.lower() if upload_file.filename else ""
-
-        # 根据文件类型解析内容
-        if file_name.endswith(".pdf"):
-            reader = PyPDF2.PdfReader(BytesIO(file_content))
-            text_parts = []
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
-            text = "\n".join(text_parts)
-        elif file_name.endswith(".docx"):
-            doc = Document(BytesIO(file_content))
-            text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
-        elif file_name.endswith(".txt"):
-            try:
-                text = file_content.decode("utf-8")
-            except UnicodeDecodeError:
-                text = file_content.decode("gbk")  # 兼容中文编码
-        else:
-            raise HTTPException(status_code=400, detail="不支持的文件格式，请上传 PDF/DOCX/TXT 文件。")
+def _extraction_http_error(e: ExtractionError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.message)
 
-        # 检查解析后的内容是否为空
-        if not text or not text.strip():
-            raise HTTPException(status_code=400, detail="文件内容为空，或无法从文件中提取有效文本。")
 
-        return text.strip()
+def _upload_http_error(e: UploadError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.message)
 
-    except HTTPException:
-        # 直接向上抛出，让 /api/analyze_resume 返回对应的 400 提示
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"文件解析失败: {str(e)}")
-    finally:
-        # 重置文件指针，以便后续操作
-        try:
-            upload_file.file.seek(0)
-        except Exception:
-            pass
 
 # ==========================================
 #  模型定义 (整合了所有功能的数据结构)
@@ -304,6 +311,7 @@ class GenerateJobTestRequest(BaseModel):
 class GenerateInterviewReportRequest(BaseModel):
     chat_history: list  # 完整的对话历史记录
     target_role: str = ""  # 目标岗位
+    meta: dict | None = None  # 前端已提取的元信息：身份/方向/时长/生成时间
 
 class AnalyzeCompetitivenessRequest(BaseModel):
     """竞争力分析请求体"""
@@ -448,13 +456,12 @@ def update_admin_profile(item: AdminProfileModel):
 def change_admin_password(req: AdminChangePasswordRequest):
     print(f"🔐 [DEBUG] 收到密码修改请求: 用户={req.username}")
     
-    # 1. 验证旧密码（使用数据库）
-    user = get_user_by_username(req.username)
-    if not user:
-        return {"success": False, "message": "用户不存在"}
+    # 1. 验证旧密码（使用数据库，一次查询完成）
+    ok, message, user = authenticate_user(req.username, req.old_password, strip_stored=True)
+    if user is None:
+        return {"success": False, "message": "用户不存在" if message == "用户名不存在" else message}
     
-    # 验证旧密码
-    if user.get("password", "").strip() != req.old_password:
+    if not ok:
         print(f"❌ [DEBUG] 旧密码不正确")
         return {"success": False, "message": "旧密码不正确，请重新输入"}
     
@@ -496,12 +503,32 @@ def get_history(username: str):
 #  简历历史记录接口
 # ==========================================
 
+# 简历历史列表单页上限
+RESUME_HISTORY_MAX_LIMIT = 100
+
+
+def _encode_history_cursor(cursor) -> Optional[str]:
+    """(created_at, id) 游标编码为 "2026-01-01 10:00:00|123" 形式的字符串"""
+    return f"{cursor[0]}|{cursor[1]}" if cursor else None
+
+
+def _decode_history_cursor(cursor: str):
+    created_at, sep, history_id = cursor.rpartition("|")
+    try:
+        datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
+        return created_at, int(history_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
 @app.get("/api/resume/history")
-def get_resume_history(username: str):
+def get_resume_history(username: str, limit: Optional[int] = None, cursor: Optional[str] = None):
     """
     获取用户的简历历史记录列表
     
     关键修复点：仅返回当前用户的历史记录，按时间倒序排列
+    只查询列表需要的列（不读取 ai_analysis），详情通过 /api/resume/history/{history_id} 获取；
+    传入 limit 时按 (created_at, id) 键集分页，下一页把返回的 next_cursor 作为 cursor 传回
     """
     try:
         # 1. 验证用户是否存在
@@ -514,21 +541,14 @@ def get_resume_history(username: str):
         if not user_id:
             raise HTTPException(status_code=404, detail="用户ID不存在")
         
-        # 3. 查询历史记录
-        history_list = get_resume_history_by_user_id(user_id)
-        
-        # 4. 格式化返回（不包含完整的 ai_analysis，只返回摘要）
-        result = []
-        for history in history_list:
-            result.append({
-                "id": history.get("id"),
-                "resume_type": history.get("resume_type"),
-                "resume_file_url": history.get("resume_file_url"),
-                "created_at": history.get("created_at")
-            })
+        # 3. 查询历史记录（不传 limit 时返回全部，兼容旧前端）
+        if limit is not None:
+            limit = min(max(limit, 1), RESUME_HISTORY_MAX_LIMIT)
+        page_cursor = _decode_history_cursor(cursor) if cursor else None
+        result, next_cursor = list_resume_history(user_id, limit=limit, cursor=page_cursor)
         
         print(f"✅ [get_resume_history] 查询到 {len(result)} 条历史记录，用户: {username}")
-        return {"code": 200, "msg": "查询成功", "data": result}
+        return {"code": 200, "msg": "查询成功", "data": result, "next_cursor": _encode_history_cursor(next_cursor)}
     except HTTPException:
         raise
     except Exception as e:
@@ -598,20 +618,17 @@ def root():
 
 @app.get("/health")
 def health():
-    """健康检查接口"""
+    """健康检查接口：数据库状态来自缓存的探测结果和熔断器状态，不会每次请求都连接数据库"""
     result = {"ok": True}
-    
-    # 可选的数据库连接检查
     try:
-        from .db_config import get_db_connection_with_error
-        conn, db_error = get_db_connection_with_error()
-        if conn:
-            conn.close()
-            result["db_ok"] = True
-        else:
-            result["db_ok"] = False
-            if db_error:
-                result["db_error"] = db_error
+        db_health = check_db_health()
+        result["db_ok"] = bool(db_health["db_ok"])
+        if db_health["db_error"]:
+            result["db_error"] = db_health["db_error"]
+        result["db_checked_at"] = db_health["checked_at"]
+        result["db_breaker"] = {
+            k: db_health["breaker"][k] for k in ("state", "consecutive_failures", "retry_in")
+        }
     except Exception as e:
         result["db_ok"] = False
         # 确保错误信息不包含敏感信息（如密码）
@@ -624,6 +641,33 @@ def health():
     
     return result
 
+@app.get("/api/admin/llm-cache/stats")
+def llm_cache_stats():
+    """DeepSeek 响应缓存统计：命中率、节省的耗时和 token 数，以及本地量化与请求合并的计数"""
+    return {
+        "success": True,
+        "data": llm_response_cache.stats(),
+        "local_scorer": local_scorer.stats(),
+        "singleflight": deepseek_gateway.singleflight.stats(),
+    }
+
+@app.get("/api/admin/user-cache/stats")
+def user_cache_stats():
+    """用户信息缓存统计：命中/负缓存命中/未命中次数、命中率、淘汰与失效次数，以及计数写回缓冲的状态"""
+    return {
+        "success": True,
+        "data": user_cache.stats(),
+        "counter_buffer": counter_buffer.stats() if counter_buffer is not None else None,
+    }
+
+@app.get("/api/stream-result/{stream_id}")
+def get_stream_result(stream_id: str):
+    """取回流式接口（/stream）生成完成的完整结果，用于客户端断线后补拉"""
+    result = stream_result_store.get(stream_id)
+    if result is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "结果不存在或已过期，请重新生成"})
+    return result
+
 # 简历医生服务地址配置
 RESUME_DOCTOR_URL = os.getenv(
     "RESUME_DOCTOR_URL",
@@ -640,43 +684,18 @@ def login(request: LoginRequest):
     """
     登录接口
     
-    验证用户名密码后，查询用户所有字段（id、username、email、phone、city、avatar）
+    验证用户名密码的同一次查询中取回用户字段（id、username、email、phone、city、avatar），
     返回完整用户信息，供前端渲染
     """
-    # 使用数据库验证登录
-    success, message = user_login(request.username, request.password)
+    # 使用数据库验证登录：一次查询同时取回密码和资料列，在进程内比对
+    success, message, user_info = authenticate_user(request.username, request.password)
     if success:
-        # 登录成功，获取用户完整信息（包括新增的字段）
-        user = get_user_by_username(request.username)
-        if user:
-            # 构建完整的用户信息对象（兼容字典和对象格式）
-            if isinstance(user, dict):
-                user_info = {
-                    "id": user.get('id', ''),
-                    "username": user.get('username', request.username),
-                    "email": user.get('email', ''),
-                    "phone": user.get('phone', ''),
-                    "city": user.get('city', ''),
-                    "avatar": user.get('avatar', '')
-                }
-            else:
-                user_info = {
-                    "id": getattr(user, 'id', ''),
-                    "username": getattr(user, 'username', request.username),
-                    "email": getattr(user, 'email', '') or '',
-                    "phone": getattr(user, 'phone', '') or '',
-                    "city": getattr(user, 'city', '') or '',
-                    "avatar": getattr(user, 'avatar', '') or ''
-                }
-            
-            return {
-                "success": True, 
-                "message": "登录成功", 
-                "user": user_info,
-                "code": 200  # 兼容字段
-            }
-        else:
-            return {"success": False, "message": "获取用户信息失败", "code": 500}
+        return {
+            "success": True, 
+            "message": "登录成功", 
+            "user": user_info,
+            "code": 200  # 兼容字段
+        }
     else:
         return {"success": False, "message": message, "code": 401}
 
@@ -717,7 +736,7 @@ def chat(request: ChatRequest):
 # ==========================================
 #  核心功能 D: 生涯规划 (雷达图 + 时间轴)
 # ==========================================
-def _generate_roadmap_with_ai(current_grade: str, target_role: str) -> dict:
+async def _generate_roadmap_with_ai(current_grade: str, target_role: str) -> dict:
     """
     使用 Deepseek API 生成生涯路径规划
     返回结构化的规划数据，包含从大一到大四的详细时间规划表
@@ -802,7 +821,7 @@ def _generate_roadmap_with_ai(current_grade: str, target_role: str) -> dict:
 
     try:
         # 调用 Deepseek API 生成规划内容
-        ai_response = _deepseek_json(system_prompt, user_prompt)
+        ai_response = await _adeepseek_json(system_prompt, user_prompt, cache_ns="roadmap")
         
         # 解析 AI 返回的数据
         stages_data = ai_response.get("stages", [])
@@ -893,7 +912,7 @@ def _generate_roadmap_with_ai(current_grade: str, target_role: str) -> dict:
         raise HTTPException(status_code=500, detail=f"AI 生成生涯规划失败: {str(e)}")
 
 @app.post("/api/generate_roadmap")
-def generate_roadmap(req: RoadmapRequest):
+async def generate_roadmap(req: RoadmapRequest):
     """
     AI 驱动的生涯路径规划生成
     使用 Deepseek API 基于用户输入的年级和意向方向，生成个性化的关键里程碑规划
@@ -911,7 +930,7 @@ def generate_roadmap(req: RoadmapRequest):
     # 使用 AI 生成关键里程碑规划（替换原有固定模板）
     # ==========================================
     try:
-        ai_result = _generate_roadmap_with_ai(req.current_grade, req.target_role)
+        ai_result = await _generate_roadmap_with_ai(req.current_grade, req.target_role)
         stages = ai_result["stages"]
         ai_comment = ai_result["ai_comment"]
     except Exception as e:
@@ -1007,7 +1026,8 @@ def generate_roadmap(req: RoadmapRequest):
     return {
         "radar_chart": {"indicators": radar_indicators, "values": current_scores},
         "ai_comment": ai_comment,
-        "roadmap": stages
+        "roadmap": stages,
+        "llm_meta": collect_llm_meta(),
     }
 
 # ==========================================
@@ -1075,41 +1095,36 @@ def get_profile(username: str):
                 "auto_save": True
             }
             
-            # 2. 如果CSV中有额外字段，合并（CSV作为补充，用于存储偏好设置）
-            file_path = "data/profiles.csv"
-            if os.path.exists(file_path):
-                with open(file_path, "r", encoding="utf-8-sig") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if row.get('username') == username:
-                            # 合并CSV中的字段（如果数据库中没有）
-                            if row.get('style'):
-                                profile_data['style'] = row.get('style', '专业正式')
-                            if row.get('file_format'):
-                                profile_data['file_format'] = row.get('file_format', 'PDF')
-                            if row.get('notify'):
-                                profile_data['notify'] = row.get('notify') == 'True'
-                            if row.get('auto_save'):
-                                profile_data['auto_save'] = row.get('auto_save') == 'True'
-                            break
+            # 2. 如果资料存储中有额外字段，合并（资料存储作为补充，用于存储偏好设置）
+            row = get_profile_store().get(username)
+            if row:
+                # 合并资料存储中的字段（如果数据库中没有）
+                if row.get('style'):
+                    profile_data['style'] = row.get('style', '专业正式')
+                if row.get('file_format'):
+                    profile_data['file_format'] = row.get('file_format', 'PDF')
+                if row.get('notify'):
+                    profile_data['notify'] = row.get('notify') == 'True'
+                if row.get('auto_save'):
+                    profile_data['auto_save'] = row.get('auto_save') == 'True'
             
             return {"success": True, "data": profile_data}
     except Exception as e:
         print(f"⚠️ [get_profile] 从数据库加载失败: {e}")
         print(f"⚠️ [get_profile] 错误堆栈: {traceback.format_exc()}")
-        # 继续尝试从CSV加载
-    
-    # 3. 如果数据库没有，从CSV加载（兼容旧数据）
-    file_path = "data/profiles.csv"
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get('username') == username:
-                    # 转换布尔值 (CSV里存的是字符串)
-                    row['notify'] = row.get('notify') == 'True'
-                    row['auto_save'] = row.get('auto_save') == 'True'
-                    return {"success": True, "data": row}
+        # 继续尝试从资料存储加载
+    
+    # 3. 如果数据库没有，从资料存储加载（兼容旧数据，首次启动时已从 data/profiles.csv 迁移）
+    try:
+        row = get_profile_store().get(username)
+    except Exception as e:
+        print(f"⚠️ [get_profile] 资料存储读取失败: {e}")
+        row = None
+    if row:
+        # 转换布尔值 (存储的是字符串)
+        row['notify'] = row.get('notify') == 'True'
+        row['auto_save'] = row.get('auto_save') == 'True'
+        return {"success": True, "data": row}
     
     # 4. 都没找到，返回默认值
     return {"success": True, "data": {"username": username, "email": "", "phone": "", "city": "", "avatar": "", "style": "专业正式", "file_format": "PDF", "notify": True, "auto_save": True}}
@@ -1117,44 +1132,12 @@ def get_profile(username: str):
 # --- 3. 更新用户资料接口 ---
 @app.post("/api/user/profile")
 def update_profile(profile: UserProfile):
-    file_path = "data/profiles.csv"
-    os.makedirs("data", exist_ok=True)
-    
-    # 读取所有现存资料
-    profiles = []
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            profiles = list(reader)
-    
-    # 查找并更新，或者新增
-    updated = False
-    for row in profiles:
-        if row.get('username') == profile.username:
-            row.update(profile.dict()) # 更新字段 (这里会自动包含 avatar)
-            # 把布尔值转回字符串存CSV
-            row['notify'] = str(profile.notify)
-            row['auto_save'] = str(profile.auto_save)
-            updated = True
-            break
-    
-    if not updated:
-        # 新增一条
-        new_row = profile.dict()
-        new_row['notify'] = str(profile.notify)
-        new_row['auto_save'] = str(profile.auto_save)
-        profiles.append(new_row)
-    
-    # 写回 CSV 文件
+    # 1. 更新资料存储（按用户名整行写入，存在则覆盖，不存在则新增；字段会自动包含 avatar）
     try:
-        with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
-            fieldnames = ["username", "avatar", "email", "phone", "city", "style", "file_format", "notify", "auto_save"]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(profiles)
-        print(f"✅ [update_profile] CSV 文件更新成功")
+        get_profile_store().upsert(profile.dict())
+        print(f"✅ [update_profile] 资料存储更新成功")
     except Exception as e:
-        print(f"⚠️ [update_profile] CSV 文件更新失败: {e}")
+        print(f"⚠️ [update_profile] 资料存储更新失败: {e}")
     
     # 2. 更新数据库（优先保存到数据库，确保持久化）
     # 关键修复点：确保数据库操作有完整的错误处理和日志记录
@@ -1234,12 +1217,12 @@ class ChangePwdRequest(BaseModel):
 
 @app.post("/api/user/change_password")
 def change_password(req: ChangePwdRequest):
-    # 1. 验证旧密码（使用数据库）
-    user = get_user_by_username(req.username)
-    if not user:
-        return {"success": False, "message": "用户不存在"}
+    # 1. 验证旧密码（使用数据库，一次查询完成）
+    ok, message, user = authenticate_user(req.username, req.old_password, strip_stored=True)
+    if user is None:
+        return {"success": False, "message": "用户不存在" if message == "用户名不存在" else message}
     
-    if user.get('password', '').strip() != req.old_password:
+    if not ok:
         return {"success": False, "message": "旧密码不正确"}
     
     # 2. 更新数据库密码
@@ -1250,6 +1233,33 @@ def change_password(req: ChangePwdRequest):
         return {"success": False, "message": "密码更新失败"}
 
 # --- 5. 上传头像接口 ---
+AVATAR_MAX_BYTES = 10 * 1024 * 1024
+AVATAR_ALLOWED_EXTS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+
+
+async def _spool_avatar(upload_file: UploadFile, username: str, tag: str) -> str:
+    """
+    校验头像格式并按块写入 static/avatars/，返回保存后的文件名
+    
+    落盘时检查大小（限制 10MB），超出时中止并删除已写入的部分
+    """
+    import uuid
+    from datetime import datetime
+
+    try:
+        file_ext = check_extension(upload_file.filename if upload_file else None, AVATAR_ALLOWED_EXTS)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        unique_id = str(uuid.uuid4())[:8]
+        safe_filename = f"{username}_{timestamp}_{unique_id}{file_ext}"
+        saved = await spool_upload(upload_file, os.path.join("static", "avatars"), safe_filename,
+                                   max_bytes=AVATAR_MAX_BYTES)
+    except UploadError as e:
+        print(f"❌ [{tag}] 头像接收失败: {e}")
+        raise _upload_http_error(e)
+    print(f"✅ [{tag}] 文件保存成功: {saved.path}（{saved.size / (1024 * 1024):.2f} MB）")
+    return saved.file_name
+
+
 @app.post("/api/user/avatar")
 async def upload_avatar(
     avatar: UploadFile = File(...),  # 关键修复点：使用 avatar 作为参数名，与前端 FormData 字段名匹配
@@ -1266,50 +1276,17 @@ async def upload_avatar(
     - username: 用户名（必需）
     """
     import traceback
-    import uuid
-    from datetime import datetime
     
     print(f"✅ [upload_avatar] 收到头像上传请求，用户: {username}, 文件名: {avatar.filename if avatar else 'None'}")
     
     # 1. 验证用户是否存在
-    user = get_user_by_username(username)
+    db = get_async_db()
+    user = await db.get_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     
-    # 2. 验证文件类型
-    if not avatar or not avatar.filename:
-        raise HTTPException(status_code=400, detail="文件名不能为空")
-    
-    file_ext = os.path.splitext(avatar.filename)[1].lower()
-    allowed_exts = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    if file_ext not in allowed_exts:
-        raise HTTPException(status_code=400, detail=f"不支持的文件格式，仅支持: {', '.join(allowed_exts)}")
-    
-    # 3. 验证文件大小（限制 10MB）
-    file_content = await avatar.read()
-    file_size_mb = len(file_content) / (1024 * 1024)
-    print(f"📊 [upload_avatar] 文件大小: {file_size_mb:.2f} MB")
-    
-    if len(file_content) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail=f"文件大小不能超过 10MB，当前文件大小: {file_size_mb:.2f} MB")
-    
-    # 4. 生成唯一文件名（避免冲突）
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    safe_filename = f"{username}_{timestamp}_{unique_id}{file_ext}"
-    file_path = os.path.join("static", "avatars", safe_filename)
-    
-    # 确保目录存在
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    # 5. 保存文件
-    try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-        print(f"✅ [upload_avatar] 文件保存成功: {file_path}")
-    except Exception as e:
-        print(f"❌ [upload_avatar] 文件保存失败: {e}")
-        raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
+    # 2-5. 验证文件类型，按块写入 static/avatars/（边接收边检查 10MB 上限）
+    safe_filename = await _spool_avatar(avatar, username, "upload_avatar")
     
     # 6. 生成可访问的 URL（使用相对路径，前端会拼接 API_BASE）
     # 注意：使用相对路径，前端会根据 API_BASE 自动拼接完整 URL
@@ -1321,7 +1298,7 @@ async def upload_avatar(
         base_url = os.getenv("BASE_URL", "https://ai-career-helper-backend-u1s0.onrender.com")
         full_avatar_url = f"{base_url}{avatar_url}"
         
-        success = update_user_field(username, "avatar", full_avatar_url)
+        success = await db.update_user_field(username, "avatar", full_avatar_url)
         if success:
             print(f"✅ [upload_avatar] 数据库 avatar 字段更新成功: {full_avatar_url}")
         else:
@@ -1332,52 +1309,16 @@ async def upload_avatar(
         print(f"⚠️ [upload_avatar] 错误堆栈: {traceback.format_exc()}")
         # 数据库更新失败不影响文件上传，继续返回成功（文件已保存到服务器）
     
-    # 8. 更新 CSV 文件中的 avatar 字段（保持兼容）
+    # 8. 更新资料存储中的 avatar 字段（保持兼容；用户资料不存在时按默认值新建）
     try:
-        csv_path = "data/profiles.csv"
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)  # 确保目录存在
-        
-        # 生成完整 URL 用于 CSV 存储
         base_url = os.getenv("BASE_URL", "https://ai-career-helper-backend-u1s0.onrender.com")
         full_avatar_url = f"{base_url}{avatar_url}"
-        
-        profiles = []
-        if os.path.exists(csv_path):
-            with open(csv_path, "r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                profiles = list(reader)
-        
-        updated = False
-        for row in profiles:
-            if row.get('username') == username:
-                row['avatar'] = full_avatar_url
-                updated = True
-                break
-        
-        if not updated:
-            # 如果用户资料不存在，创建新记录
-            profiles.append({
-                'username': username,
-                'avatar': full_avatar_url,
-                'email': '',
-                'phone': '',
-                'city': '',
-                'style': '专业正式',
-                'file_format': 'PDF',
-                'notify': 'True',
-                'auto_save': 'True'
-            })
-        
-        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
-            fieldnames = ["username", "avatar", "email", "phone", "city", "style", "file_format", "notify", "auto_save"]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(profiles)
-        print(f"✅ [upload_avatar] CSV 文件 avatar 字段更新成功: {full_avatar_url}")
+        get_profile_store().update_fields(username, avatar=full_avatar_url)
+        print(f"✅ [upload_avatar] 资料存储 avatar 字段更新成功: {full_avatar_url}")
     except Exception as e:
-        print(f"⚠️ [upload_avatar] CSV 文件更新异常: {e}")
-        print(f"⚠️ [upload_avatar] CSV 错误堆栈: {traceback.format_exc()}")
-        # CSV 更新失败不影响主流程
+        print(f"⚠️ [upload_avatar] 资料存储更新异常: {e}")
+        print(f"⚠️ [upload_avatar] 资料存储错误堆栈: {traceback.format_exc()}")
+        # 资料存储更新失败不影响主流程
     
     # 9. 返回结果（返回完整 URL，前端可以直接使用）
     base_url = os.getenv("BASE_URL", "https://ai-career-helper-backend-u1s0.onrender.com")
@@ -1412,50 +1353,17 @@ async def upload_avatar_alias(
     
     # 调用主接口逻辑（复用代码）
     import traceback
-    import uuid
-    from datetime import datetime
     
     print(f"✅ [upload_avatar_alias] 收到头像上传请求，用户: {username}, 文件名: {file.filename}")
     
     # 验证用户是否存在
-    user = get_user_by_username(username)
+    db = get_async_db()
+    user = await db.get_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     
-    # 验证文件类型
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="文件名不能为空")
-    
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    allowed_exts = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    if file_ext not in allowed_exts:
-        raise HTTPException(status_code=400, detail=f"不支持的文件格式，仅支持: {', '.join(allowed_exts)}")
-    
-    # 验证文件大小（限制 10MB）
-    file_content = await file.read()
-    file_size_mb = len(file_content) / (1024 * 1024)
-    print(f"📊 [upload_avatar_alias] 文件大小: {file_size_mb:.2f} MB")
-    
-    if len(file_content) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail=f"文件大小不能超过 10MB，当前文件大小: {file_size_mb:.2f} MB")
-    
-    # 生成唯一文件名
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    safe_filename = f"{username}_{timestamp}_{unique_id}{file_ext}"
-    file_path = os.path.join("static", "avatars", safe_filename)
-    
-    # 确保目录存在
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    # 保存文件
-    try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-        print(f"✅ [upload_avatar_alias] 文件保存成功: {file_path}")
-    except Exception as e:
-        print(f"❌ [upload_avatar_alias] 文件保存失败: {e}")
-        raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
+    # 验证文件类型，按块写入 static/avatars/（边接收边检查 10MB 上限）
+    safe_filename = await _spool_avatar(file, username, "upload_avatar_alias")
     
     # 生成可访问的 URL
     base_url = os.getenv("BASE_URL", "https://ai-career-helper-backend-u1s0.onrender.com")
@@ -1464,7 +1372,7 @@ async def upload_avatar_alias(
     
     # 更新数据库中的 avatar 字段
     try:
-        success = update_user_field(username, "avatar", full_avatar_url)
+        success = await db.update_user_field(username, "avatar", full_avatar_url)
         if success:
             print(f"✅ [upload_avatar_alias] 数据库 avatar 字段更新成功: {full_avatar_url}")
         else:
@@ -1473,44 +1381,12 @@ async def upload_avatar_alias(
         print(f"⚠️ [upload_avatar_alias] 数据库更新异常: {e}")
         print(f"⚠️ [upload_avatar_alias] 错误堆栈: {traceback.format_exc()}")
     
-    # 更新 CSV 文件
+    # 更新资料存储
     try:
-        csv_path = "data/profiles.csv"
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-        profiles = []
-        if os.path.exists(csv_path):
-            with open(csv_path, "r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                profiles = list(reader)
-        
-        updated = False
-        for row in profiles:
-            if row.get('username') == username:
-                row['avatar'] = full_avatar_url
-                updated = True
-                break
-        
-        if not updated:
-            profiles.append({
-                'username': username,
-                'avatar': full_avatar_url,
-                'email': '',
-                'phone': '',
-                'city': '',
-                'style': '专业正式',
-                'file_format': 'PDF',
-                'notify': 'True',
-                'auto_save': 'True'
-            })
-        
-        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
-            fieldnames = ["username", "avatar", "email", "phone", "city", "style", "file_format", "notify", "auto_save"]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(profiles)
-        print(f"✅ [upload_avatar_alias] CSV 文件 avatar 字段更新成功")
+        get_profile_store().update_fields(username, avatar=full_avatar_url)
+        print(f"✅ [upload_avatar_alias] 资料存储 avatar 字段更新成功")
     except Exception as e:
-        print(f"⚠️ [upload_avatar_alias] CSV 文件更新异常: {e}")
+        print(f"⚠️ [upload_avatar_alias] 资料存储更新异常: {e}")
     
     # 返回结果（前端期望 url 字段）
     return {
@@ -1584,35 +1460,27 @@ class ResumeUploadRequest(BaseModel):
 
 @app.post('/api/resume/upload')
 def upload_resume(item: ResumeUploadRequest):
-    """接收前端上传的简历报告，持久化到 data/uploaded_resumes.csv 并更新数据库的 uploadedResumeNum 字段"""
-    os.makedirs('data', exist_ok=True)
-    uploaded_file = 'data/uploaded_resumes.csv'
-    users_file = 'data/users.csv'
-
+    """接收前端上传的简历报告，追加写入上传记录日志（见 upload_log）并更新数据库的 uploadedResumeNum 字段"""
     # 填充默认日期
     if not item.date:
         item.date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-    # 1. 写入 uploaded_resumes.csv
-    fieldnames = ['task_id', 'username', 'filename', 'report', 'score', 'date']
-    exists = os.path.exists(uploaded_file)
+    # 1. 追加写入上传记录（只写当前段末尾，不重写已有数据）
     try:
-        with open(uploaded_file, 'a', encoding='utf-8-sig', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            if not exists:
-                writer.writeheader()
-            writer.writerow({
-                'task_id': item.task_id,
-                'username': item.username,
-                'filename': item.filename,
-                'report': item.report,
-                'score': item.score,
-                'date': item.date,
-            })
+        created = get_upload_log().put({
+            'task_id': item.task_id,
+            'username': item.username,
+            'filename': item.filename,
+            'report': item.report,
+            'score': item.score,
+            'date': item.date,
+        })
     except Exception as e:
         return {'success': False, 'message': f'写入上传记录失败: {e}'}
 
-    # 2. 更新数据库的 uploadedResumeNum 字段
+    # 2. 更新数据库的 uploadedResumeNum 字段（同一任务重复上传只覆盖报告，不重复计数；删除时也只减一次）
+    if not created:
+        return {'success': True, 'message': '上传成功（已覆盖该任务的旧报告）'}
     try:
         success = increment_user_field(item.username, "uploadedResumeNum", 1)
         if not success:
@@ -1625,61 +1493,100 @@ def upload_resume(item: ResumeUploadRequest):
     return {'success': True, 'message': '上传成功'}
 
 
-@app.get('/api/resume/getUploadedList')
-def get_uploaded_list():
-    """返回所有已上传的简历上传记录（若无则生成 3 条模拟数据）"""
-    os.makedirs('data', exist_ok=True)
-    uploaded_file = 'data/uploaded_resumes.csv'
-
-    # 如果文件不存在，生成三条默认模拟数据
-    if not os.path.exists(uploaded_file):
-        mock = [
-            {'task_id': 'T-MOCK-01', 'username': 'alice', 'filename': 'alice_resume.pdf', 'report': '# 模拟报告\n- 分数：88\n- 建议：突出项目', 'score': 88, 'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},
-            {'task_id': 'T-MOCK-02', 'username': 'bob', 'filename': 'bob_resume.pdf', 'report': '# 模拟报告\n- 分数：76\n- 建议：补充实习', 'score': 76, 'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},
-            {'task_id': 'T-MOCK-03', 'username': 'carol', 'filename': 'carol_resume.pdf', 'report': '# 模拟报告\n- 分数：92\n- 建议：保持精炼', 'score': 92, 'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},
-        ]
-        with open(uploaded_file, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['task_id','username','filename','report','score','date'])
-            writer.writeheader()
-            writer.writerows(mock)
+def _seed_mock_uploads(upload_log):
+    """上传记录从未写入过时生成 3 条模拟数据（与旧版 CSV 不存在时的行为一致）"""
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    upload_log.put_many([
+        {'task_id': 'T-MOCK-01', 'username': 'alice', 'filename': 'alice_resume.pdf', 'report': '# 模拟报告\n- 分数：88\n- 建议：突出项目', 'score': 88, 'date': now},
+        {'task_id': 'T-MOCK-02', 'username': 'bob', 'filename': 'bob_resume.pdf', 'report': '# 模拟报告\n- 分数：76\n- 建议：补充实习', 'score': 76, 'date': now},
+        {'task_id': 'T-MOCK-03', 'username': 'carol', 'filename': 'carol_resume.pdf', 'report': '# 模拟报告\n- 分数：92\n- 建议：保持精炼', 'score': 92, 'date': now},
+    ])
 
-    # 读取并返回
-    records = []
-    with open(uploaded_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # convert numeric
-            row['score'] = float(row.get('score') or 0)
-            records.append(row)
-    # 返回按时间倒序（最新在前）
-    records.reverse()
-    return {'success': True, 'data': records}
 
+def _score_to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
 
-@app.post('/api/resume/delete')
-def delete_upload(username: str, task_id: str):
-    """删除上传记录并同步数据库的统计字段"""
-    uploaded_file = 'data/uploaded_resumes.csv'
 
-    if not os.path.exists(uploaded_file):
-        return {'success': False, 'message': '没有上传记录文件'}
+# 上传记录列表分页：默认每页条数与单页上限
+UPLOADED_LIST_DEFAULT_LIMIT = 50
+UPLOADED_LIST_MAX_LIMIT = 500
+UPLOADED_LIST_FIELDS = META_FIELDS + ['report']
 
-    rows = []
-    removed = False
-    with open(uploaded_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('username') == username and row.get('task_id') == task_id:
-                removed = True
-                continue
-            rows.append(row)
 
-    if removed:
-        with open(uploaded_file, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['task_id','username','filename','report','score','date'])
-            writer.writeheader()
-            writer.writerows(rows)
+def _parse_uploaded_fields(fields: Optional[str], include_report: bool):
+    """解析 fields=task_id,score,... 投影参数；未指定时返回全部元数据字段（不含报告正文）"""
+    if not fields:
+        selected = list(META_FIELDS)
+    else:
+        selected = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in selected if f not in UPLOADED_LIST_FIELDS]
+        if unknown:
+            return None, f"不支持的字段: {', '.join(unknown)}（可选：{', '.join(UPLOADED_LIST_FIELDS)}）"
+    if include_report and 'report' not in selected:
+        selected.append('report')
+    return selected, None
+
 
+@app.get('/api/resume/getUploadedList')
+def get_uploaded_list(cursor: Optional[int] = None, limit: int = UPLOADED_LIST_DEFAULT_LIMIT,
+                      username: Optional[str] = None, date_from: Optional[str] = None,
+                      date_to: Optional[str] = None, fields: Optional[str] = None,
+                      include_report: bool = False):
+    """
+    分页返回简历上传记录（按时间倒序，若从未上传过则生成 3 条模拟数据）
+    
+    - cursor: 上一页返回的 next_cursor，为空时从最新一条开始；翻页走有序索引，不扫描前面的页
+    - username / date_from / date_to: 按用户、日期范围过滤（日期如 2026-01-01，date_to 包含当天）
+    - fields: 逗号分隔的返回字段，默认全部元数据字段；报告正文需显式指定 report 或 include_report=true，
+      否则通过 /api/resume/uploadedReport 按需加载
+    """
+    selected, error = _parse_uploaded_fields(fields, include_report)
+    if error:
+        return {'success': False, 'message': error}
+    limit = min(max(limit, 1), UPLOADED_LIST_MAX_LIMIT)
+
+    upload_log = get_upload_log()
+    if upload_log.is_fresh():
+        _seed_mock_uploads(upload_log)
+
+    page, next_cursor = upload_log.query(cursor=cursor, limit=limit, username=username,
+                                         date_from=date_from, date_to=date_to)
+    records = []
+    for row in page:
+        row['score'] = _score_to_float(row.get('score'))
+        if 'report' in selected:
+            row['report'] = upload_log.load_report(row['username'], row['task_id']) or ''
+        records.append({field: row.get(field) for field in selected})
+    return {'success': True, 'data': records, 'next_cursor': next_cursor, 'has_more': next_cursor is not None}
+
+
+@app.get('/api/resume/getUploadedCount')
+def get_uploaded_count(username: Optional[str] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None):
+    """统计上传记录数（不返回记录本身）；不按日期过滤时直接读取索引大小"""
+    upload_log = get_upload_log()
+    if upload_log.is_fresh():
+        _seed_mock_uploads(upload_log)
+    count = upload_log.count(username=username, date_from=date_from, date_to=date_to)
+    return {'success': True, 'data': {'count': count}}
+
+
+@app.get('/api/resume/uploadedReport')
+def get_uploaded_report(username: str, task_id: str):
+    """按 (username, task_id) 读取单条上传记录的报告正文"""
+    report = get_upload_log().load_report(username, task_id)
+    if report is None:
+        return {'success': False, 'message': '未找到对应上传记录'}
+    return {'success': True, 'data': {'username': username, 'task_id': task_id, 'report': report}}
+
+
+@app.post('/api/resume/delete')
+def delete_upload(username: str, task_id: str):
+    """删除上传记录（追加墓碑记录，旧数据由后台压缩清理）并同步数据库的统计字段"""
+    if get_upload_log().delete(username, task_id):
         # 同步数据库 uploadedResumeNum 减一
         try:
             decrement_user_field(username, "uploadedResumeNum", 1)
@@ -1807,7 +1714,7 @@ def virtual_career_questions(req: VirtualCareerQuestionsRequest):
         "然后基于你的理解设计题目。"
     )
 
-    data = _deepseek_json(system_prompt, user_prompt)
+    data = _deepseek_json(system_prompt, user_prompt, cache_ns="career_questions")
     questions = data.get("questions") or []
     if not isinstance(questions, list) or len(questions) == 0:
         raise HTTPException(status_code=500, detail="AI 生成题目失败，请稍后重试")
@@ -1819,14 +1726,20 @@ def virtual_career_questions(req: VirtualCareerQuestionsRequest):
     return {
         "career": data.get("career", req.career),
         "questions": questions[:15],
+        "llm_meta": collect_llm_meta(),
     }
 
+# /api/generate-job-test 各并发分支的超时（秒）
+JOB_TEST_BRANCH_TIMEOUTS = {"script": 90, "questions": 90}
+
+
 @app.post("/api/generate-job-test")
-def generate_job_test(req: GenerateJobTestRequest):
+async def generate_job_test(req: GenerateJobTestRequest):
     """
     根据用户输入的职业名称：
     1. 调用 DeepSeek 生成该职业的虚拟体验脚本（包含职业定义、典型场景、3~5 个互动选择及结果）
-    2. 再调用 DeepSeek 生成 15 道职业相关测试题（单选题，每题 4 个选项）
+    2. 同时调用 DeepSeek 生成 15 道职业相关测试题（单选题，每题 4 个选项）
+    两次生成互不依赖，并发执行；脚本生成失败或超时时使用降级脚本，题目生成失败则整体返回 500
 
     返回格式（与原有接口 /api/virtual-career/questions 完全一致）：
     {
@@ -1859,8 +1772,7 @@ def generate_job_test(req: GenerateJobTestRequest):
         return JSONResponse(status_code=400, content={"code": 400, "msg": "请输入职业名"})
 
     try:
-        print(f"🔄 [generate-job-test] 开始生成职业体验脚本: {job_name}")
-        # 第一步：生成职业体验脚本（文本即可，可包含 Markdown）
+        # 职业体验脚本 prompt（文本即可，可包含 Markdown）
         script_system_prompt = (
             "你是一名职业体验设计师，负责为用户设计沉浸式「虚拟职业体验」脚本。\n"
             "目标：针对指定职业，生成一段完整的体验脚本，帮助用户在几分钟内沉浸式感受该职业的真实工作场景。\n"
@@ -1880,11 +1792,8 @@ def generate_job_test(req: GenerateJobTestRequest):
             f"目标职业名称：{job_name}\n\n"
             "请基于你对该职业的理解，按照上述结构输出完整的职业体验脚本。"
         )
-        script_text = _deepseek_markdown(script_system_prompt, script_user_prompt)
-        print(f"✅ [generate-job-test] 职业体验脚本生成完成，长度: {len(script_text)} 字符")
 
-        print(f"🔄 [generate-job-test] 开始生成 15 道测试题: {job_name}")
-        # 第二步：生成 15 道职业测试题（JSON）
+        # 15 道职业测试题 prompt（JSON）
         # 返回格式必须与原有接口 /api/virtual-career/questions 完全一致
         questions_system_prompt = (
             "你是一名职业规划评估题目设计专家。\n"
@@ -1914,7 +1823,31 @@ def generate_job_test(req: GenerateJobTestRequest):
             "然后基于你的理解设计题目。"
         )
 
-        questions_data = _deepseek_json(questions_system_prompt, questions_user_prompt)
+        print(f"🔄 [generate-job-test] 并发生成职业体验脚本和 15 道测试题: {job_name}")
+        branches = await fan_out(
+            {
+                "script": lambda: _adeepseek_markdown(script_system_prompt, script_user_prompt, cache_ns="job_test"),
+                "questions": lambda: _adeepseek_json(questions_system_prompt, questions_user_prompt, cache_ns="job_test"),
+            },
+            timeouts=JOB_TEST_BRANCH_TIMEOUTS,
+            required=["questions"],
+        )
+
+        # 题目是必需分支：失败时直接抛出，走统一的 500 返回
+        questions_data = branches["questions"].unwrap()
+
+        script_branch = branches["script"]
+        if script_branch.ok:
+            script_text = script_branch.value
+            print(f"✅ [generate-job-test] 职业体验脚本生成完成，长度: {len(script_text)} 字符，耗时 {script_branch.elapsed_ms:.0f}ms")
+        else:
+            reason = "超时" if script_branch.timed_out else script_branch.error
+            print(f"⚠️ [generate-job-test] 职业体验脚本生成失败（{reason}），使用降级脚本")
+            script_text = (
+                f"# {job_name} 虚拟职业体验\n\n"
+                "职业体验脚本暂时生成失败，请先完成下方的 15 道匹配度测试题，稍后可重新生成体验脚本。"
+            )
+
         raw_questions = questions_data.get("questions") or []
         print(f"✅ [generate-job-test] AI 返回原始题目数量: {len(raw_questions)}")
 
@@ -1983,6 +1916,8 @@ def generate_job_test(req: GenerateJobTestRequest):
         result = {
             "jobScript": script_text,
             "questions": normalized_questions,
+            "scriptFallback": not script_branch.ok,
+            "llm_meta": collect_llm_meta(),
         }
         print(f"✅ [generate-job-test] 成功生成 {len(normalized_questions)} 道题目，准备返回结果")
         return result
@@ -1994,267 +1929,371 @@ def generate_job_test(req: GenerateJobTestRequest):
         return JSONResponse(status_code=500, content={"code": 500, "msg": "AI生成失败，请稍后重试"})
 
 
-@app.post("/api/analyze_resume")
-async def analyze_resume(
-    resume_file: Optional[UploadFile] = File(None),  # 关键修复点：改为可选，支持文本输入
-    resume_text: Optional[str] = Form(None),
-    username: Optional[str] = Form(None),  # 关键修复点：新增用户名参数，用于关联历史记录
-    resume_type: Optional[str] = Form("normal"),  # 关键修复点：新增简历类型参数（normal/vip）
-):
+# /api/analyze_resume 各并发分支的超时（秒）
+ANALYZE_RESUME_BRANCH_TIMEOUTS = {"diagnosis": 90, "optimize": 120}
+
+# 简历上传大小上限（默认10MB），边接收边检查，超出立即中止
+RESUME_UPLOAD_MAX_BYTES = int(os.getenv("RESUME_UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+RESUME_ALLOWED_EXTS = ['.pdf', '.docx', '.txt']
+# 未登录（不保存历史记录）时简历只临时落盘用于解析，解析完即删除
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "ai_career_uploads")
+
+
+def _resume_save_dir(resume_type: str) -> str:
+    """根据简历类型选择保存目录"""
+    return "uploads/resumes/normal" if resume_type == "normal" else "uploads/resumes/vip"
+
+
+async def _save_resume_history(username: str, resume_type: str, diagnosis_report: dict, optimized_resume: str,
+                         fallback_used: bool, saved_file: Optional[SpooledUpload] = None,
+                         is_text_input: bool = False):
     """
-    简历诊断与优化接口
-    
-    支持两种输入方式：
-    1. 文件上传：resume_file（支持 PDF/DOCX/TXT）
-    2. 文本输入：resume_text（直接传入简历文本）
+    后台任务：插入简历历史记录
     
-    返回格式：
-    {
-      "success": true,
-      "diagnosis_report": {
-        "score": 85,
-        "summary": "AI生成的综合评价",
-        "score_details": ["评分依据1", "评分依据2"],
-        "highlights": ["亮点1", "亮点2"],
-        "weaknesses": ["不足1", "不足2"]
-      },
-      "optimized_resume": "AI生成的Markdown格式优化简历",
-      "fallback": false
-    }
+    由 /api/analyze_resume 在返回响应后执行，数据库读写通过 get_async_db()（按 DB_BACKEND 选择后端），
+    简历文件在接收上传时已经写到最终位置（saved_file），这里只生成 URL 并写库；
+    任何异常只记录日志，不影响已经返回的分析结果
     """
-    import traceback
-    
-    print(f"✅ [analyze_resume] 收到简历分析请求")
-    resume_file_name = resume_file.filename if resume_file and hasattr(resume_file, 'filename') else None
-    print(f"✅ [analyze_resume] 参数: resume_file={resume_file_name}, resume_text={'已提供' if resume_text else None}, username={username}, resume_type={resume_type}")
-    
-    # 关键调试信息：记录是否提供了用户名
-    if not username:
-        print(f"⚠️ [analyze_resume] 警告：未提供 username 参数，历史记录将不会保存！")
-        print(f"⚠️ [analyze_resume] 前端必须通过 FormData 传递 username 和 resume_type 参数")
-    
-    # 1. 提取简历文本内容
-    resume_content = ""
+    from datetime import datetime
+
     try:
-        if resume_file:
-            print(f"🔄 [analyze_resume] 开始解析文件: {resume_file.filename}")
-            resume_content = extract_text_from_file(resume_file)
-        elif resume_text:
-            print(f"🔄 [analyze_resume] 使用文本输入，长度: {len(resume_text)} 字符")
-            resume_content = resume_text.strip()
+        db = get_async_db()
+
+        # 1. 获取用户ID
+        user = await db.get_user_by_username(username)
+        if not user:
+            print(f"❌ [analyze_resume] 用户 {username} 不存在，跳过历史记录插入")
+            if saved_file is not None:
+                saved_file.remove()
+            return
+        user_id = user.get('id') if isinstance(user, dict) else getattr(user, 'id', None)
+        if not user_id:
+            print(f"❌ [analyze_resume] 用户 {username} 的ID不存在，跳过历史记录插入")
+            if saved_file is not None:
+                saved_file.remove()
+            return
+        print(f"✅ [analyze_resume] 获取到用户ID: {user_id}")
+
+        # 2. 生成简历文件URL（如果有文件上传）
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if saved_file is not None:
+            base_url = os.getenv("BASE_URL", "https://ai-career-helper-backend-u1s0.onrender.com")
+            resume_file_url = f"{base_url}/uploads/resumes/{resume_type}/{saved_file.file_name}"
+            print(f"✅ [analyze_resume] 简历文件已保存: {resume_file_url}（{saved_file.size} 字节）")
+        elif is_text_input:
+            # 如果是文本输入，生成一个标识URL（用于历史记录）
+            resume_file_url = f"text_input_{username}_{timestamp}"
+            print(f"✅ [analyze_resume] 文本输入模式，生成标识URL: {resume_file_url}")
         else:
-            return JSONResponse(
-                status_code=400,
-                content={"success": False, "error": "请提供简历文件（resume_file）或简历文本（resume_text）"}
-            )
-        
-        if not resume_content:
-            return JSONResponse(
-                status_code=400,
-                content={"success": False, "error": "简历内容为空，请检查文件或文本内容"}
-            )
-        
-        print(f"✅ [analyze_resume] 简历内容提取成功，长度: {len(resume_content)} 字符")
-    
-    except HTTPException:
-        raise
+            resume_file_url = f"unknown_{username}_{timestamp}"
+            print(f"⚠️ [analyze_resume] 无文件无文本，使用默认URL: {resume_file_url}")
+
+        # 3. 构建AI分析结果（JSON格式），降级模式也要保存
+        ai_analysis_str = json.dumps({
+            "diagnosis_report": diagnosis_report,
+            "optimized_resume": optimized_resume,
+            "fallback": fallback_used
+        }, ensure_ascii=False)
+        print(f"✅ [analyze_resume] AI分析结果已构建，长度: {len(ai_analysis_str)} 字符，降级模式: {fallback_used}")
+
+        # 4. 插入历史记录
+        success, history_id = await db.create_resume_history(
+            user_id=user_id,
+            resume_type=resume_type,
+            resume_file_url=resume_file_url,
+            ai_analysis=ai_analysis_str
+        )
+        if success:
+            print(f"✅ [analyze_resume] 历史记录插入成功！记录ID: {history_id}, 用户ID: {user_id}, 简历类型: {resume_type}")
+        else:
+            print(f"❌ [analyze_resume] 历史记录插入失败！用户ID: {user_id}, 简历类型: {resume_type}")
+            print(f"❌ [analyze_resume] 请检查数据库表 resume_history 是否存在，以及数据库连接是否正常")
     except Exception as e:
-        print(f"❌ [analyze_resume] 文件解析异常: {e}")
+        print(f"❌ [analyze_resume] 插入历史记录异常: {e}")
         print(f"❌ [analyze_resume] 错误堆栈: {traceback.format_exc()}")
-        return JSONResponse(
-            status_code=500,
-            content={"success": False, "error": f"文件解析失败: {str(e)}"}
-        )
-    
-    # 2. 调用 DeepSeek 生成诊断报告和优化简历
-    fallback_used = False
-    diagnosis_report = None
-    optimized_resume = None
-    
-    try:
-        print(f"🔄 [analyze_resume] 开始调用 DeepSeek API 生成诊断报告")
-        
-        # 2.1 生成诊断报告
-        diagnosis_system_prompt = (
-            "你是资深简历优化专家，分析以下简历内容，严格按以下JSON结构输出诊断报告，不要任何多余话术：\n"
-            "{\n"
-            '  "score": 数字（0-100）,\n'
-            '  "summary": "综合评价一句话",\n'
-            '  "score_details": ["评分依据1", "评分依据2"],\n'
-            '  "highlights": ["亮点1", "亮点2"],\n'
-            '  "weaknesses": ["不足1", "不足2"]\n'
-            "}"
-        )
-        diagnosis_user_prompt = f"简历内容：\n{resume_content}"
-        
-        diagnosis_data = _deepseek_json(diagnosis_system_prompt, diagnosis_user_prompt)
-        
-        # 归一化诊断报告结构
-        diagnosis_report = {
-            "score": int(diagnosis_data.get("score", 0)) if isinstance(diagnosis_data.get("score"), (int, float)) else 0,
-            "summary": diagnosis_data.get("summary", "AI 暂未生成综合评价"),
-            "score_details": diagnosis_data.get("score_details", []) if isinstance(diagnosis_data.get("score_details"), list) else [],
-            "highlights": diagnosis_data.get("highlights", []) if isinstance(diagnosis_data.get("highlights"), list) else [],
-            "weaknesses": diagnosis_data.get("weaknesses", []) if isinstance(diagnosis_data.get("weaknesses"), list) else [],
-        }
-        
-        print(f"✅ [analyze_resume] 诊断报告生成成功，评分: {diagnosis_report['score']}")
-        
-        # 2.2 生成优化简历
-        print(f"🔄 [analyze_resume] 开始调用 DeepSeek API 生成优化简历")
-        
-        optimize_system_prompt = (
-            "基于以下简历内容，优化为更专业的版本，严格按以下Markdown结构输出，不要任何多余话术：\n"
-            "# 你的姓名 (意向岗位: 全栈开发工程师)\n"
-            "电话: 138-xxxx-xxxx | 邮箱: email@example.com\n\n"
-            "## 💡 AI优化摘要\n"
-            "优化重点: ...\n\n"
-            "## 🎓 教育背景\n"
-            "北京邮电大学 | 人工智能学院 | 本科 | 2024-2028\n"
-            "- 主修课程: ...\n"
-            "- 核心优势: ...\n\n"
-            "## 💻 项目经历 (精修版)\n"
-            "### AI简历全科医生平台 | 全栈负责人 | FastAPI, Vue3, Docker, Redis\n"
-            "- **背景(S)**: ...\n"
-            "- **任务(T)**: ...\n"
-            "- **行动(A)**: ...\n"
-            "- **结果(R)**: ...\n\n"
-            "## 🛠️ 技能清单\n"
-            "- 核心技术: ...\n"
-            "- 工具: ...\n\n"
-            "## 📄 自我评价\n"
-            "- ..."
-        )
-        optimize_user_prompt = f"简历内容：\n{resume_content}"
+
+
+# 简历原文进入提示词前的 token 预算（本地估算），超出时按分节重要程度截断
+RESUME_PROMPT_TOKEN_BUDGET = int(os.getenv("RESUME_PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def _pack_resume_for_prompt(resume_content: str) -> str:
+    """清洗简历原文（去页眉页脚、合并空白）并压缩到 token 预算之内"""
+    packed = pack_resume(resume_content, budget=RESUME_PROMPT_TOKEN_BUDGET)
+    if packed.truncated:
+        print(f"⚠️ [prompt_packer] 简历超出预算，约 {packed.original_tokens} → {packed.tokens} tokens，"
+              f"截断: {packed.truncated_sections}，省略: {packed.dropped_sections}")
+    else:
+        print(f"✅ [prompt_packer] 简历约 {packed.original_tokens} → {packed.tokens} tokens")
+    return packed.text
+
+
+def _resume_prompts(resume_content: str):
+    """简历诊断（JSON）与简历优化（Markdown）的提示词：(诊断 system, 诊断 user, 优化 system, 优化 user)"""
+    resume_content = _pack_resume_for_prompt(resume_content)
+    diagnosis_system_prompt = (
+        "你是资深简历优化专家，分析以下简历内容，严格按以下JSON结构输出诊断报告，不要任何多余话术：\n"
+        "{\n"
+        '  "score": 数字（0-100）,\n'
+        '  "summary": "综合评价一句话",\n'
+        '  "score_details": ["评分依据1", "评分依据2"],\n'
+        '  "highlights": ["亮点1", "亮点2"],\n'
+        '  "weaknesses": ["不足1", "不足2"]\n'
+        "}"
+    )
+    diagnosis_user_prompt = f"简历内容：\n{resume_content}"
+    optimize_system_prompt = (
+        "基于以下简历内容，优化为更专业的版本，严格按以下Markdown结构输出，不要任何多余话术：\n"
+        "# 你的姓名 (意向岗位: 全栈开发工程师)\n"
+        "电话: 138-xxxx-xxxx | 邮箱: email@example.com\n\n"
+        "## 💡 AI优化摘要\n"
+        "优化重点: ...\n\n"
+        "## 🎓 教育背景\n"
+        "北京邮电大学 | 人工智能学院 | 本科 | 2024-2028\n"
+        "- 主修课程: ...\n"
+        "- 核心优势: ...\n\n"
+        "## 💻 项目经历 (精修版)\n"
+        "### AI简历全科医生平台 | 全栈负责人 | FastAPI, Vue3, Docker, Redis\n"
+        "- **背景(S)**: ...\n"
+        "- **任务(T)**: ...\n"
+        "- **行动(A)**: ...\n"
+        "- **结果(R)**: ...\n\n"
+        "## 🛠️ 技能清单\n"
+        "- 核心技术: ...\n"
+        "- 工具: ...\n\n"
+        "## 📄 自我评价\n"
+        "- ..."
+    )
+    optimize_user_prompt = f"简历内容：\n{resume_content}"
+    return diagnosis_system_prompt, diagnosis_user_prompt, optimize_system_prompt, optimize_user_prompt
+
+
+def _normalize_diagnosis_report(diagnosis_data: dict) -> dict:
+    """归一化 AI 返回的诊断报告结构"""
+    return {
+        "score": int(diagnosis_data.get("score", 0)) if isinstance(diagnosis_data.get("score"), (int, float)) else 0,
+        "summary": diagnosis_data.get("summary", "AI 暂未生成综合评价"),
+        "score_details": diagnosis_data.get("score_details", []) if isinstance(diagnosis_data.get("score_details"), list) else [],
+        "highlights": diagnosis_data.get("highlights", []) if isinstance(diagnosis_data.get("highlights"), list) else [],
+        "weaknesses": diagnosis_data.get("weaknesses", []) if isinstance(diagnosis_data.get("weaknesses"), list) else [],
+    }
+
+
+def _fallback_diagnosis_report() -> dict:
+    """诊断报告生成失败时的预设内容（每次返回新对象，避免被调用方修改）"""
+    return {
+        "score": 82,
+        "summary": "简历结构清晰，技术栈覆盖全面，但「量化成果」有待提升。",
+        "score_details": [
+            "✅ 基础分70。因项目使用了STAR法则+5分，技术栈匹配+10分；❌ 但缺少GitHub链接-3分。"
+        ],
+        "highlights": [
+            "教育背景优秀",
+            "两段相关实习",
+            "技术栈命中率高"
+        ],
+        "weaknesses": [
+            "缺乏具体性能数据",
+            "自我评价泛泛",
+            "无开源贡献"
+        ]
+    }
+
+
+FALLBACK_OPTIMIZED_RESUME = (
+    "# 优化简历（降级模式）\n\n"
+    "## 💡 AI优化摘要\n"
+    "优化重点: 基于原始简历内容进行结构化优化，突出技术能力和项目成果。\n\n"
+    "## 🎓 教育背景\n"
+    "（请根据实际简历内容填写）\n\n"
+    "## 💻 项目经历 (精修版)\n"
+    "（请使用STAR法则重构项目描述）\n\n"
+    "## 🛠️ 技能清单\n"
+    "（请列出核心技术栈和工具）\n\n"
+    "## 📄 自我评价\n"
+    "（请补充具体的能力描述和职业目标）\n"
+)
+
+
+async def _spool_resume(resume_file: UploadFile, username: Optional[str], resume_type: str) -> SpooledUpload:
+    """
+    把上传的简历按块写到最终位置（只读一遍，同时计算 SHA-256 并检查大小上限）
+
+    提供了用户名时直接写入 uploads/resumes/ 作为历史记录的简历文件；否则写到临时目录，解析后删除
+    """
+    import uuid
+    from datetime import datetime
+
+    try:
+        file_ext = check_extension(resume_file.filename or "resume.pdf", RESUME_ALLOWED_EXTS)
+    except UploadError:
+        raise HTTPException(status_code=400, detail="不支持的文件格式，请上传 PDF/DOCX/TXT 文件。")
+    unique_id = str(uuid.uuid4())[:8]
+    if username:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        dest_dir = _resume_save_dir(resume_type)
+        file_name = f"{username}_{timestamp}_{unique_id}{file_ext}"
+    else:
+        dest_dir = UPLOAD_SPOOL_DIR
+        file_name = f"{uuid.uuid4().hex}{file_ext}"
+    try:
+        return await spool_upload(resume_file, dest_dir, file_name, max_bytes=RESUME_UPLOAD_MAX_BYTES)
+    except UploadError as e:
+        print(f"❌ [analyze_resume] 简历文件接收失败: {e}")
+        raise _upload_http_error(e)
+
+
+async def _read_resume_content(resume_file: Optional[UploadFile], resume_text: Optional[str],
+                               username: Optional[str] = None, resume_type: str = "normal"):
+    """
+    提取简历文本内容
+    
+    返回 (简历文本, 已落盘的简历文件, 错误响应)：
+    - 上传文件先流式落盘，再由解析进程从磁盘读取，整个请求只读一遍上传内容
+    - 只有提供了 username（需要保存历史记录）时才返回已落盘的文件，否则临时文件解析后即删除
+    - 参数缺失、内容为空或解析失败时简历文本为 None，错误响应为对应的 JSONResponse
+    """
+    import traceback
+    
+    spooled = None
+    try:
+        if resume_file:
+            print(f"🔄 [analyze_resume] 开始接收并解析文件: {resume_file.filename}")
+            spooled = await _spool_resume(resume_file, username, resume_type)
+            try:
+                resume_content = await get_extraction_service().extract_file(
+                    spooled.path, resume_file.filename or spooled.file_name, digest=spooled.sha256)
+            except ExtractionError as e:
+                raise _extraction_http_error(e)
+        elif resume_text:
+            print(f"🔄 [analyze_resume] 使用文本输入，长度: {len(resume_text)} 字符")
+            resume_content = resume_text.strip()
+        else:
+            return None, None, JSONResponse(
+                status_code=400,
+                content={"success": False, "error": "请提供简历文件（resume_file）或简历文本（resume_text）"}
+            )
         
-        optimized_resume = _deepseek_markdown(optimize_system_prompt, optimize_user_prompt)
+        if not resume_content:
+            if spooled is not None:
+                spooled.remove()
+            return None, None, JSONResponse(
+                status_code=400,
+                content={"success": False, "error": "简历内容为空，请检查文件或文本内容"}
+            )
         
-        print(f"✅ [analyze_resume] 优化简历生成成功，长度: {len(optimized_resume)} 字符")
+        print(f"✅ [analyze_resume] 简历内容提取成功，长度: {len(resume_content)} 字符")
+        if spooled is not None and not username:
+            spooled.remove()
+            spooled = None
+        return resume_content, spooled, None
     
+    except HTTPException:
+        if spooled is not None:
+            spooled.remove()
+        raise
     except Exception as e:
-        print(f"❌ [analyze_resume] DeepSeek API 调用失败: {e}")
+        if spooled is not None:
+            spooled.remove()
+        print(f"❌ [analyze_resume] 文件解析异常: {e}")
         print(f"❌ [analyze_resume] 错误堆栈: {traceback.format_exc()}")
-        
-        # 降级逻辑：返回预设的诊断报告和优化简历
-        fallback_used = True
-        print(f"⚠️ [analyze_resume] 启用降级逻辑，返回预设内容")
-        
-        diagnosis_report = {
-            "score": 82,
-            "summary": "简历结构清晰，技术栈覆盖全面，但「量化成果」有待提升。",
-            "score_details": [
-                "✅ 基础分70。因项目使用了STAR法则+5分，技术栈匹配+10分；❌ 但缺少GitHub链接-3分。"
-            ],
-            "highlights": [
-                "教育背景优秀",
-                "两段相关实习",
-                "技术栈命中率高"
-            ],
-            "weaknesses": [
-                "缺乏具体性能数据",
-                "自我评价泛泛",
-                "无开源贡献"
-            ]
-        }
-        
-        optimized_resume = (
-            "# 优化简历（降级模式）\n\n"
-            "## 💡 AI优化摘要\n"
-            "优化重点: 基于原始简历内容进行结构化优化，突出技术能力和项目成果。\n\n"
-            "## 🎓 教育背景\n"
-            "（请根据实际简历内容填写）\n\n"
-            "## 💻 项目经历 (精修版)\n"
-            "（请使用STAR法则重构项目描述）\n\n"
-            "## 🛠️ 技能清单\n"
-            "（请列出核心技术栈和工具）\n\n"
-            "## 📄 自我评价\n"
-            "（请补充具体的能力描述和职业目标）\n"
+        return None, None, JSONResponse(
+            status_code=500,
+            content={"success": False, "error": f"文件解析失败: {str(e)}"}
         )
+
+
+@app.post("/api/analyze_resume")
+async def analyze_resume(
+    background_tasks: BackgroundTasks,
+    resume_file: Optional[UploadFile] = File(None),  # 关键修复点：改为可选，支持文本输入
+    resume_text: Optional[str] = Form(None),
+    username: Optional[str] = Form(None),  # 关键修复点：新增用户名参数，用于关联历史记录
+    resume_type: Optional[str] = Form("normal"),  # 关键修复点：新增简历类型参数（normal/vip）
+):
+    """
+    简历诊断与优化接口
     
-    # 3. 关键修复点：自动插入历史记录（如果提供了用户名）
+    支持两种输入方式：
+    1. 文件上传：resume_file（支持 PDF/DOCX/TXT）
+    2. 文本输入：resume_text（直接传入简历文本）
+    
+    返回格式：
+    {
+      "success": true,
+      "diagnosis_report": {
+        "score": 85,
+        "summary": "AI生成的综合评价",
+        "score_details": ["评分依据1", "评分依据2"],
+        "highlights": ["亮点1", "亮点2"],
+        "weaknesses": ["不足1", "不足2"]
+      },
+      "optimized_resume": "AI生成的Markdown格式优化简历",
+      "fallback": false
+    }
+    """
+    print(f"✅ [analyze_resume] 收到简历分析请求")
+    resume_file_name = resume_file.filename if resume_file and hasattr(resume_file, 'filename') else None
+    print(f"✅ [analyze_resume] 参数: resume_file={resume_file_name}, resume_text={'已提供' if resume_text else None}, username={username}, resume_type={resume_type}")
+    
+    # 关键调试信息：记录是否提供了用户名
+    if not username:
+        print(f"⚠️ [analyze_resume] 警告：未提供 username 参数，历史记录将不会保存！")
+        print(f"⚠️ [analyze_resume] 前端必须通过 FormData 传递 username 和 resume_type 参数")
+    
+    # 1. 提取简历文本内容（上传文件流式写入最终位置后再解析）
+    resume_content, saved_file, error_response = await _read_resume_content(
+        resume_file, resume_text, username=username, resume_type=resume_type or "normal")
+    if error_response is not None:
+        return error_response
+    
+    # 2. 并发调用 DeepSeek 生成诊断报告和优化简历（两者都只依赖简历原文，互不依赖）
+    print(f"🔄 [analyze_resume] 并发调用 DeepSeek API 生成诊断报告和优化简历")
+    diagnosis_system_prompt, diagnosis_user_prompt, optimize_system_prompt, optimize_user_prompt = _resume_prompts(resume_content)
+
+    branches = await fan_out(
+        {
+            "diagnosis": lambda: _adeepseek_json(diagnosis_system_prompt, diagnosis_user_prompt, cache_ns="resume_diagnosis"),
+            "optimize": lambda: _adeepseek_markdown(optimize_system_prompt, optimize_user_prompt),
+        },
+        timeouts=ANALYZE_RESUME_BRANCH_TIMEOUTS,
+    )
+
+    # 2.1 诊断报告（失败时使用预设内容降级）
+    fallback_used = False
+    diagnosis_branch = branches["diagnosis"]
+    if diagnosis_branch.ok:
+        diagnosis_report = _normalize_diagnosis_report(diagnosis_branch.value)
+        print(f"✅ [analyze_resume] 诊断报告生成成功，评分: {diagnosis_report['score']}，耗时 {diagnosis_branch.elapsed_ms:.0f}ms")
+    else:
+        fallback_used = True
+        print(f"❌ [analyze_resume] 诊断报告生成失败（{'超时' if diagnosis_branch.timed_out else diagnosis_branch.error}），启用降级内容")
+        diagnosis_report = _fallback_diagnosis_report()
+
+    # 2.2 优化简历（失败时使用预设内容降级）
+    optimize_branch = branches["optimize"]
+    if optimize_branch.ok:
+        optimized_resume = optimize_branch.value
+        print(f"✅ [analyze_resume] 优化简历生成成功，长度: {len(optimized_resume)} 字符，耗时 {optimize_branch.elapsed_ms:.0f}ms")
+    else:
+        fallback_used = True
+        print(f"❌ [analyze_resume] 优化简历生成失败（{'超时' if optimize_branch.timed_out else optimize_branch.error}），启用降级内容")
+        optimized_resume = FALLBACK_OPTIMIZED_RESUME
+
+    # 3. 历史记录（文件落盘 + 数据库写入）放到后台任务，响应在 AI 结果就绪后立即返回
     # 注意：无论 AI 分析成功还是失败（降级模式），都要保存历史记录
-    resume_file_url = ""
     if username:
-        print(f"🔄 [analyze_resume] 开始保存历史记录，用户名: {username}, 简历类型: {resume_type}")
-        try:
-            # 3.1 获取用户ID
-            user = get_user_by_username(username)
-            if not user:
-                print(f"❌ [analyze_resume] 用户 {username} 不存在，跳过历史记录插入")
-            else:
-                user_id = user.get('id') if isinstance(user, dict) else getattr(user, 'id', None)
-                
-                if not user_id:
-                    print(f"❌ [analyze_resume] 用户 {username} 的ID不存在，跳过历史记录插入")
-                else:
-                    print(f"✅ [analyze_resume] 获取到用户ID: {user_id}")
-                    
-                    # 3.2 保存简历文件（如果有文件上传）
-                    if resume_file:
-                        import uuid
-                        from datetime import datetime
-                        
-                        # 生成唯一文件名
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        unique_id = str(uuid.uuid4())[:8]
-                        file_ext = os.path.splitext(resume_file.filename)[1] if resume_file.filename else ".pdf"
-                        safe_filename = f"{username}_{timestamp}_{unique_id}{file_ext}"
-                        
-                        # 根据简历类型选择保存目录
-                        save_dir = "uploads/resumes/normal" if (resume_type == "normal" or not resume_type) else "uploads/resumes/vip"
-                        os.makedirs(save_dir, exist_ok=True)
-                        file_path = os.path.join(save_dir, safe_filename)
-                        
-                        # 保存文件（需要重新读取文件内容，因为之前已经读取过了）
-                        resume_file.file.seek(0)  # 重置文件指针
-                        file_content = await resume_file.read()
-                        with open(file_path, "wb") as f:
-                            f.write(file_content)
-                        
-                        # 生成文件URL
-                        base_url = os.getenv("BASE_URL", "https://ai-career-helper-backend-u1s0.onrender.com")
-                        resume_file_url = f"{base_url}/uploads/resumes/{resume_type or 'normal'}/{safe_filename}"
-                        print(f"✅ [analyze_resume] 简历文件保存成功: {resume_file_url}")
-                    elif resume_text:
-                        # 如果是文本输入，生成一个标识URL（用于历史记录）
-                        from datetime import datetime as dt
-                        resume_file_url = f"text_input_{username}_{dt.now().strftime('%Y%m%d_%H%M%S')}"
-                        print(f"✅ [analyze_resume] 文本输入模式，生成标识URL: {resume_file_url}")
-                    else:
-                        # 如果没有文件也没有文本，使用默认URL
-                        from datetime import datetime as dt
-                        resume_file_url = f"unknown_{username}_{dt.now().strftime('%Y%m%d_%H%M%S')}"
-                        print(f"⚠️ [analyze_resume] 无文件无文本，使用默认URL: {resume_file_url}")
-                    
-                    # 3.3 构建AI分析结果（JSON格式）
-                    # 关键修复点：确保即使 AI 分析失败（降级模式），也要保存历史记录
-                    ai_analysis_data = {
-                        "diagnosis_report": diagnosis_report,
-                        "optimized_resume": optimized_resume,
-                        "fallback": fallback_used
-                    }
-                    import json
-                    ai_analysis_str = json.dumps(ai_analysis_data, ensure_ascii=False)
-                    print(f"✅ [analyze_resume] AI分析结果已构建，长度: {len(ai_analysis_str)} 字符，降级模式: {fallback_used}")
-                    
-                    # 3.4 插入历史记录（关键修复点：无论成功失败都要尝试保存）
-                    print(f"🔄 [analyze_resume] 开始插入历史记录到数据库...")
-                    success, history_id = create_resume_history(
-                        user_id=user_id,
-                        resume_type=resume_type or "normal",
-                        resume_file_url=resume_file_url,
-                        ai_analysis=ai_analysis_str
-                    )
-                    
-                    if success:
-                        print(f"✅ [analyze_resume] 历史记录插入成功！记录ID: {history_id}, 用户ID: {user_id}, 简历类型: {resume_type}")
-                    else:
-                        print(f"❌ [analyze_resume] 历史记录插入失败！用户ID: {user_id}, 简历类型: {resume_type}")
-                        print(f"❌ [analyze_resume] 请检查数据库表 resume_history 是否存在，以及数据库连接是否正常")
-        except Exception as e:
-            print(f"❌ [analyze_resume] 插入历史记录异常: {e}")
-            print(f"❌ [analyze_resume] 错误堆栈: {traceback.format_exc()}")
-            # 历史记录插入失败不影响分析结果返回，但记录详细错误信息
+        background_tasks.add_task(
+            _save_resume_history,
+            username=username,
+            resume_type=resume_type or "normal",
+            diagnosis_report=diagnosis_report,
+            optimized_resume=optimized_resume,
+            fallback_used=fallback_used,
+            saved_file=saved_file,
+            is_text_input=bool(resume_text),
+        )
+        print(f"🔄 [analyze_resume] 历史记录已提交后台保存，用户名: {username}, 简历类型: {resume_type}")
     else:
         print(f"⚠️ [analyze_resume] 未提供用户名（username），跳过历史记录保存")
     
@@ -2267,25 +2306,107 @@ async def analyze_resume(
     }
 
 
-@app.post("/api/analyze-experiment")
-def analyze_experiment(req: AnalyzeExperimentRequest):
+@app.post("/api/analyze_resume/stream")
+async def analyze_resume_stream(
+    resume_file: Optional[UploadFile] = File(None),
+    resume_text: Optional[str] = Form(None),
+    username: Optional[str] = Form(None),
+    resume_type: Optional[str] = Form("normal"),
+):
     """
-    接收 15 题答案字典或竞争力沙盘数据，调用 DeepSeek 生成 Markdown 分析报告
+    /api/analyze_resume 的 SSE 版本：优化简历逐段推送，诊断报告就绪后单独推送
     
-    支持两种场景：
-    1. 虚拟职业体验：接收 15 题答案字典
-    2. 竞争力沙盘：接收 6 维度原始输入 + 量化后的雷达图数据
-    """
-    target_career = req.career or "未指定（请根据答题推断最匹配的方向）"
+    事件：
+    - start：{"stream_id": ...}
+    - delta：{"text": 优化简历的增量 Markdown}
+    - diagnosis：{"diagnosis_report": {...}, "fallback": bool}（与优化简历并发生成，可能先于 delta 结束到达）
+    - done：与 /api/analyze_resume 相同的返回结构 + stream_id
     
-    # 判断是否为竞争力沙盘分析请求
-    is_competitiveness_sandbox = (
+    历史记录在流结束后保存；客户端中途断开时生成任务仍会跑完并保存
+    """
+    print(f"✅ [analyze_resume_stream] 收到简历分析请求，username={username}, resume_type={resume_type}")
+    resume_content, saved_file, error_response = await _read_resume_content(
+        resume_file, resume_text, username=username, resume_type=resume_type or "normal")
+    if error_response is not None:
+        return error_response
+    diagnosis_system_prompt, diagnosis_user_prompt, optimize_system_prompt, optimize_user_prompt = _resume_prompts(resume_content)
+
+    async def producer(emit):
+        diagnosis_state = {"fallback": False}
+
+        async def diagnose():
+            try:
+                data = await asyncio.wait_for(
+                    _adeepseek_json(diagnosis_system_prompt, diagnosis_user_prompt, cache_ns="resume_diagnosis"),
+                    timeout=ANALYZE_RESUME_BRANCH_TIMEOUTS["diagnosis"],
+                )
+                report = _normalize_diagnosis_report(data)
+                print(f"✅ [analyze_resume_stream] 诊断报告生成成功，评分: {report['score']}")
+            except Exception as e:
+                print(f"❌ [analyze_resume_stream] 诊断报告生成失败（{str(e) or '超时'}），启用降级内容")
+                report = _fallback_diagnosis_report()
+                diagnosis_state["fallback"] = True
+            emit("diagnosis", {"diagnosis_report": report, "fallback": diagnosis_state["fallback"]})
+            return report
+
+        diagnosis_task = asyncio.ensure_future(diagnose())
+        parts = []
+        optimize_fallback = False
+        try:
+            async with asyncio.timeout(ANALYZE_RESUME_BRANCH_TIMEOUTS["optimize"]):
+                async for delta in deepseek_gateway.stream(optimize_system_prompt, optimize_user_prompt, temperature=0.4):
+                    parts.append(delta)
+                    emit("delta", {"text": delta})
+            optimized_resume = "".join(parts).strip()
+            print(f"✅ [analyze_resume_stream] 优化简历生成成功，长度: {len(optimized_resume)} 字符")
+        except Exception as e:
+            print(f"❌ [analyze_resume_stream] 优化简历生成失败（{str(e) or '超时'}），启用降级内容")
+            optimize_fallback = True
+            optimized_resume = FALLBACK_OPTIMIZED_RESUME
+            # 已推送的片段作废，客户端以 done 事件中的完整内容为准
+            emit("delta", {"text": "", "reset": True})
+
+        diagnosis_report = await diagnosis_task
+        fallback_used = optimize_fallback or diagnosis_state["fallback"]
+        if username:
+            await _save_resume_history(
+                username=username,
+                resume_type=resume_type or "normal",
+                diagnosis_report=diagnosis_report,
+                optimized_resume=optimized_resume,
+                fallback_used=fallback_used,
+                saved_file=saved_file,
+                is_text_input=bool(resume_text),
+            )
+        else:
+            print(f"⚠️ [analyze_resume_stream] 未提供用户名（username），跳过历史记录保存")
+        return {
+            "success": True,
+            "diagnosis_report": diagnosis_report,
+            "optimized_resume": optimized_resume,
+            "fallback": fallback_used,
+        }
+
+    return sse_response(producer, store=stream_result_store, tag="analyze_resume_stream")
+
+
+def _is_competitiveness_sandbox(req: AnalyzeExperimentRequest) -> bool:
+    """判断是否为竞争力沙盘分析请求"""
+    target_career = req.career or ""
+    return (
         target_career == "个人竞争力沙盘分析" or
         "竞争力沙盘" in target_career or
         ("雷达图量化数据" in str(req.answers) if isinstance(req.answers, dict) else False)
     )
+
+
+def _experiment_prompts(req: AnalyzeExperimentRequest):
+    """
+    虚拟实验/竞争力沙盘报告的 (system_prompt, user_prompt)，普通接口与流式接口共用
+    """
+    target_career = req.career or "未指定（请根据答题推断最匹配的方向）"
     
-    if is_competitiveness_sandbox:
+    if _is_competitiveness_sandbox(req):
         # 竞争力沙盘分析：基于 6 维度原始输入和量化数据生成报告
         system_prompt = (
             "你是一位资深职业竞争力评估专家和生涯规划顾问。\n"
@@ -2315,47 +2436,6 @@ def analyze_experiment(req: AnalyzeExperimentRequest):
             f"{json.dumps(req.answers, ensure_ascii=False, indent=2)}\n\n"
             f"请基于以上数据，生成一份详细的个人竞争力分析报告。"
         )
-        
-        try:
-            markdown = _deepseek_markdown(system_prompt, user_prompt)
-            
-            # 提取量化后的分数（如果存在）
-            quantized_scores = None
-            if isinstance(req.answers, dict) and "雷达图量化数据(0-100)" in req.answers:
-                quantized_scores = req.answers["雷达图量化数据(0-100)"]
-            
-            return {
-                "success": True,
-                "markdown": markdown,
-                "analysis_report": markdown,  # 兼容前端期望的字段名
-                "quantized_scores": quantized_scores,
-                "fallback": False
-            }
-        except Exception as e:
-            print(f"❌ [analyze_experiment] 竞争力沙盘分析失败: {e}")
-            import traceback
-            print(traceback.format_exc())
-            # 降级：返回基础报告
-            fallback_report = (
-                "## 📊 竞争力总览\n\n"
-                "基于您提供的 6 个维度数据，系统已进行初步分析。\n\n"
-                "## 📈 各维度分数\n\n"
-                f"- GPA 学术成绩：{req.answers.get('雷达图量化数据(0-100)', {}).get('gpa', 0) if isinstance(req.answers, dict) else 0}/100\n"
-                f"- 项目实战经验：{req.answers.get('雷达图量化数据(0-100)', {}).get('project', 0) if isinstance(req.answers, dict) else 0}/100\n"
-                f"- 名企实习经历：{req.answers.get('雷达图量化数据(0-100)', {}).get('intern', 0) if isinstance(req.answers, dict) else 0}/100\n"
-                f"- 竞赛获奖情况：{req.answers.get('雷达图量化数据(0-100)', {}).get('competition', 0) if isinstance(req.answers, dict) else 0}/100\n"
-                f"- 英语学术能力：{req.answers.get('雷达图量化数据(0-100)', {}).get('english', 0) if isinstance(req.answers, dict) else 0}/100\n"
-                f"- 领导力与协作：{req.answers.get('雷达图量化数据(0-100)', {}).get('leader', 0) if isinstance(req.answers, dict) else 0}/100\n\n"
-                "## 💡 建议\n\n"
-                "建议重点关注分数较低的维度，制定针对性的提升计划。"
-            )
-            return {
-                "success": True,
-                "markdown": fallback_report,
-                "analysis_report": fallback_report,
-                "quantized_scores": quantized_scores,
-                "fallback": True
-            }
     else:
         # 虚拟职业体验：15 题答案分析
         system_prompt = (
@@ -2376,75 +2456,260 @@ def analyze_experiment(req: AnalyzeExperimentRequest):
             f"{json.dumps(req.answers, ensure_ascii=False, indent=2)}\n"
             "请围绕此目标职业，生成一份匹配度分析报告。"
         )
+    return system_prompt, user_prompt
+
+
+def _experiment_quantized_scores(req: AnalyzeExperimentRequest):
+    """提取竞争力沙盘请求中量化后的分数（如果存在）"""
+    if isinstance(req.answers, dict) and "雷达图量化数据(0-100)" in req.answers:
+        return req.answers["雷达图量化数据(0-100)"]
+    return None
+
+
+def _experiment_fallback_report(req: AnalyzeExperimentRequest) -> str:
+    """竞争力沙盘 AI 失败时的基础报告"""
+    return (
+        "## 📊 竞争力总览\n\n"
+        "基于您提供的 6 个维度数据，系统已进行初步分析。\n\n"
+        "## 📈 各维度分数\n\n"
+        f"- GPA 学术成绩：{req.answers.get('雷达图量化数据(0-100)', {}).get('gpa', 0) if isinstance(req.answers, dict) else 0}/100\n"
+        f"- 项目实战经验：{req.answers.get('雷达图量化数据(0-100)', {}).get('project', 0) if isinstance(req.answers, dict) else 0}/100\n"
+        f"- 名企实习经历：{req.answers.get('雷达图量化数据(0-100)', {}).get('intern', 0) if isinstance(req.answers, dict) else 0}/100\n"
+        f"- 竞赛获奖情况：{req.answers.get('雷达图量化数据(0-100)', {}).get('competition', 0) if isinstance(req.answers, dict) else 0}/100\n"
+        f"- 英语学术能力：{req.answers.get('雷达图量化数据(0-100)', {}).get('english', 0) if isinstance(req.answers, dict) else 0}/100\n"
+        f"- 领导力与协作：{req.answers.get('雷达图量化数据(0-100)', {}).get('leader', 0) if isinstance(req.answers, dict) else 0}/100\n\n"
+        "## 💡 建议\n\n"
+        "建议重点关注分数较低的维度，制定针对性的提升计划。"
+    )
 
-        markdown = _deepseek_markdown(system_prompt, user_prompt)
-        return {"success": True, "markdown": markdown}
+
+@app.post("/api/analyze-experiment")
+def analyze_experiment(req: AnalyzeExperimentRequest):
+    """
+    接收 15 题答案字典或竞争力沙盘数据，调用 DeepSeek 生成 Markdown 分析报告
+    
+    支持两种场景：
+    1. 虚拟职业体验：接收 15 题答案字典
+    2. 竞争力沙盘：接收 6 维度原始输入 + 量化后的雷达图数据
+    """
+    system_prompt, user_prompt = _experiment_prompts(req)
+    
+    if _is_competitiveness_sandbox(req):
+        quantized_scores = _experiment_quantized_scores(req)
+        try:
+            markdown = _deepseek_markdown(system_prompt, user_prompt)
+            return {
+                "success": True,
+                "markdown": markdown,
+                "analysis_report": markdown,  # 兼容前端期望的字段名
+                "quantized_scores": quantized_scores,
+                "fallback": False
+            }
+        except Exception as e:
+            print(f"❌ [analyze_experiment] 竞争力沙盘分析失败: {e}")
+            import traceback
+            print(traceback.format_exc())
+            # 降级：返回基础报告
+            fallback_report = _experiment_fallback_report(req)
+            return {
+                "success": True,
+                "markdown": fallback_report,
+                "analysis_report": fallback_report,
+                "quantized_scores": quantized_scores,
+                "fallback": True
+            }
+    
+    markdown = _deepseek_markdown(system_prompt, user_prompt)
+    return {"success": True, "markdown": markdown}
 
 
-def _quantize_score(value: str, dimension_name: str) -> int:
+@app.post("/api/analyze-experiment/stream")
+async def analyze_experiment_stream(req: AnalyzeExperimentRequest):
     """
-    将用户输入转换为 0-100 的分数
+    /api/analyze-experiment 的 SSE 版本
+    竞争力沙盘场景的 done 事件同样携带 analysis_report / quantized_scores，AI 失败时以降级报告收尾
+    """
+    system_prompt, user_prompt = _experiment_prompts(req)
+    if not _is_competitiveness_sandbox(req):
+        producer = _markdown_stream_producer(system_prompt, user_prompt, tag="analyze_experiment")
+        return sse_response(producer, store=stream_result_store, tag="analyze_experiment")
+    
+    inner = _markdown_stream_producer(
+        system_prompt, user_prompt, tag="analyze_experiment",
+        fallback=_experiment_fallback_report(req),
+        extra={"quantized_scores": _experiment_quantized_scores(req)},
+    )
     
-    参数:
-        value: 用户输入（可能是数字字符串或文字描述）
-        dimension_name: 维度名称（用于 AI 量化时的上下文）
+    async def producer(emit):
+        result = await inner(emit)
+        result["analysis_report"] = result["markdown"]  # 兼容前端期望的字段名
+        return result
     
-    返回:
-        0-100 的整数分数
+    return sse_response(producer, store=stream_result_store, tag="analyze_experiment")
+
+
+# 竞争力分析的 6 个维度：(返回字段名, 维度中文名)
+COMPETITIVENESS_DIMENSIONS = [
+    ("gpa", "GPA"),
+    ("project_experience", "项目实战经验"),
+    ("internship", "名企实习经历"),
+    ("competition", "竞赛获奖情况"),
+    ("english_academic", "英语学术能力"),
+    ("leadership", "领导力与协作"),
+]
+
+# 整个量化阶段的截止时间（秒，同一请求内的多次量化共用），超时的维度按默认 50 分处理
+QUANTIZE_DEADLINE_SECONDS = 20
+
+
+def _quantize_numeric(value: str) -> Optional[int]:
     """
-    value = str(value).strip()
+    纯数字输入直接换算为 0-100 分数，非数字返回 None
     
-    # 尝试直接解析为数字
+    - 0-4：按 4 分制 GPA 换算
+    - 0-100：直接使用
+    - 超出范围：限制在 0-100
+    """
     try:
         num = float(value)
-        # 如果是 0-4 范围，转换为 0-100（假设 4 分制）
-        if 0 <= num <= 4:
-            return int((num / 4) * 100)
-        # 如果是 0-100 范围，直接返回
-        elif 0 <= num <= 100:
-            return int(num)
-        # 超出范围，限制在 0-100
-        else:
-            return max(0, min(100, int(num)))
     except ValueError:
-        # 不是纯数字，需要调用 AI 量化
-        pass
+        return None
+    if 0 <= num <= 4:
+        return int((num / 4) * 100)
+    elif 0 <= num <= 100:
+        return int(num)
+    return max(0, min(100, int(num)))
+
+
+def _quantize_cache_key(value: str, dimension_name: str) -> str:
+    """
+    单个维度取值的缓存键（命名空间 quantize）
+
+    批量请求的提示词随维度组合变化，按整段提示词缓存时 "省二" 这类常见取值几乎不会重复命中，
+    因此按 (维度名称, 用户输入) 逐个缓存分数，批量请求本身不走响应缓存
+    """
+    return make_cache_key(deepseek_gateway.model, 0.0, "quantize_score", f"{dimension_name}\n{value}")
+
+
+async def _quantize_cache_get(value: str, dimension_name: str) -> Optional[int]:
+    if not llm_response_cache.enabled_for("quantize"):
+        return None
+    key = _quantize_cache_key(value, dimension_name)
+    if llm_response_cache.disk:
+        entry, tier = await asyncio.to_thread(llm_response_cache.get, key)
+    else:
+        entry, tier = llm_response_cache.get(key)
+    if entry is None:
+        return None
+    try:
+        score = int(entry.content)
+    except ValueError:
+        return None
+    record_llm_call("quantize", tier, 0.0, entry.tokens, entry.latency_ms)
+    return score
+
+
+async def _quantize_cache_set(value: str, dimension_name: str, score: int):
+    if not llm_response_cache.enabled_for("quantize"):
+        return
+    args = (_quantize_cache_key(value, dimension_name), "quantize", str(score))
+    if llm_response_cache.disk:
+        await asyncio.to_thread(llm_response_cache.set, *args)
+    else:
+        llm_response_cache.set(*args)
+
+
+async def _quantize_scores_batch(items: dict, memo: Optional[dict] = None,
+                                 deadline: float = QUANTIZE_DEADLINE_SECONDS) -> dict:
+    """
+    批量将多个维度的用户输入量化为 0-100 分数
+    
+    参数:
+        items: {字段名: (用户输入, 维度名称)}
+        memo: 备忘表 {(维度名称, 用户输入): 分数}，同一请求内的降级路径可复用已算出的分数
+              （AI 失败的维度也记为默认 50 分，同一请求内不再重试）
+        deadline: 本次调用剩余的时间预算（秒），调用方按整个量化阶段的截止时间扣减后传入
+    
+    返回:
+        {字段名: 0-100 的整数分数}；AI 失败、超时或缺失的维度返回默认 50 分
     
-    # 调用 DeepSeek API 进行文字量化
+    本地规则（local_scorer）能高置信度识别的维度不再调用 AI，已缓存分数的取值直接复用，
+    剩余维度合并为一次 DeepSeek 请求，而不是每个维度各调用一次
+    """
+    memo = {} if memo is None else memo
+    scores = {}
+    pending = {}
+    for key, (value, dimension_name) in items.items():
+        value = str(value).strip()
+        memo_key = (dimension_name, value)
+        if memo_key in memo:
+            scores[key] = memo[memo_key]
+            continue
+        numeric = _quantize_numeric(value)
+        if numeric is not None:
+            scores[key] = memo[memo_key] = numeric
+            continue
+        local = local_scorer.lookup(value, dimension_name)
+        if local is not None:
+            scores[key] = memo[memo_key] = local.score
+            print(f"✅ [quantize_score] {dimension_name}: '{value}' → {local.score} 分（本地规则 {','.join(local.rules)}，置信度 {local.confidence}）")
+            continue
+        cached = await _quantize_cache_get(value, dimension_name)
+        if cached is not None:
+            scores[key] = memo[memo_key] = cached
+            print(f"✅ [quantize_score] {dimension_name}: '{value}' → {cached} 分（缓存）")
+            continue
+        pending[key] = (value, dimension_name)
+
+    if not pending:
+        return scores
+
+    system_prompt = (
+        "你是一位专业的竞争力评估专家。\n"
+        "用户会给出若干个维度的文字描述，请分别将其量化为 0-100 的分数。\n"
+        "评分标准：\n"
+        "- 0-20：较差/无\n"
+        "- 21-40：一般/较少\n"
+        "- 41-60：中等/有一些\n"
+        "- 61-80：良好/较多\n"
+        "- 81-100：优秀/很多\n"
+        "必须严格按照以下 JSON 格式返回，key 与用户给出的字段名一致，不要任何多余话术：\n"
+        "{\n"
+        '  "scores": {"字段名": 数字（0-100）}\n'
+        "}"
+    )
+    user_prompt = (
+        "请量化以下各维度：\n"
+        + "\n".join(f"- {key}（{dimension_name}）：{value}" for key, (value, dimension_name) in pending.items())
+        + "\n\n请给出每个字段 0-100 的量化分数。"
+    )
+
+    ai_scores = {}
     try:
-        system_prompt = (
-            "你是一位专业的竞争力评估专家。\n"
-            "请根据用户提供的文字描述，将其量化为 0-100 的分数。\n"
-            "评分标准：\n"
-            "- 0-20：较差/无\n"
-            "- 21-40：一般/较少\n"
-            "- 41-60：中等/有一些\n"
-            "- 61-80：良好/较多\n"
-            "- 81-100：优秀/很多\n"
-            "必须严格按照以下 JSON 格式返回，不要任何多余话术：\n"
-            "{\n"
-            '  "score": 数字（0-100）\n'
-            "}"
-        )
-        
-        user_prompt = (
-            f"维度：{dimension_name}\n"
-            f"用户输入：{value}\n\n"
-            "请根据上述描述，给出 0-100 的量化分数。"
+        if deadline <= 0:
+            raise asyncio.TimeoutError()
+        result = await asyncio.wait_for(
+            _adeepseek_json(system_prompt, user_prompt),
+            timeout=deadline,
         )
-        
-        result = _deepseek_json(system_prompt, user_prompt)
-        score = result.get("score", 50)  # 默认 50 分
-        
-        # 确保分数在 0-100 范围内
-        score = max(0, min(100, int(score)))
-        print(f"✅ [quantize_score] {dimension_name}: '{value}' → {score} 分")
-        return score
-    
+        ai_scores = result.get("scores") or {}
+    except asyncio.TimeoutError:
+        print(f"❌ [quantize_score] 批量量化超时（剩余 {max(deadline, 0):.1f}s），未完成的维度使用默认 50 分")
     except Exception as e:
-        print(f"❌ [quantize_score] AI 量化失败 ({dimension_name}: '{value}'): {e}")
-        # AI 量化失败，返回默认分数 50
-        return 50
+        print(f"❌ [quantize_score] 批量量化失败: {e}")
+
+    for key, (value, dimension_name) in pending.items():
+        try:
+            score = max(0, min(100, int(float(ai_scores[key]))))
+            # 只有 AI 真正给出的分数才写入响应缓存，失败的维度留给后续请求重试
+            await _quantize_cache_set(value, dimension_name, score)
+            print(f"✅ [quantize_score] {dimension_name}: '{value}' → {score} 分")
+        except (KeyError, TypeError, ValueError):
+            score = 50
+            print(f"⚠️ [quantize_score] {dimension_name}: '{value}' 未得到有效分数，使用默认 50 分")
+        memo[(dimension_name, value)] = score
+        scores[key] = score
+    return scores
 
 
 @app.post("/api/analyze_natural_language")
@@ -2487,6 +2752,25 @@ def analyze_natural_language(req: AnalyzeNaturalLanguageRequest):
         "leader": 50,
     }
 
+    # 先用本地规则识别，6 个维度都有高置信度结果时直接返回，不调用 AI
+    local_scores = {}
+    override_dims = set()  # 命中高特异性规则的维度，AI 返回后仍以本地结果为准
+    for dim, result in local_scorer.score_text(text).items():
+        if local_scorer.is_confident(result):
+            local_scores[dim] = result.score
+            if local_scorer.can_override(result):
+                override_dims.add(dim)
+    for dim in fallback_scores:
+        local_scorer.record(dim, dim in local_scores)
+    if len(local_scores) == len(fallback_scores):
+        print(f"✅ [analyze_natural_language] 本地规则量化结果: {local_scores}")
+        return {
+            "success": True,
+            "scores": {dim: local_scores[dim] for dim in fallback_scores},
+            "fallback": False,
+            "local_dimensions": list(fallback_scores),
+        }
+
     try:
         system_prompt = (
             "你是一位专业的职业竞争力评估专家，擅长从自然语言描述中提取关键信息并量化。\n"
@@ -2533,6 +2817,9 @@ def analyze_natural_language(req: AnalyzeNaturalLanguageRequest):
             "english": _norm("english", fallback_scores["english"]),
             "leader": _norm("leader", fallback_scores["leader"]),
         }
+        # 只有命中高特异性规则（如 "六级560"、"GPA 3.8/4.0"）的维度优先于 AI 结果，
+        # 宽泛的关键词命中交给 AI 结合上下文判断
+        normalized.update({dim: local_scores[dim] for dim in override_dims})
 
         print(f"✅ [analyze_natural_language] 量化结果: {normalized}")
 
@@ -2540,6 +2827,7 @@ def analyze_natural_language(req: AnalyzeNaturalLanguageRequest):
             "success": True,
             "scores": normalized,
             "fallback": False,
+            "local_dimensions": sorted(override_dims),
         }
 
     except HTTPException:
@@ -2547,16 +2835,17 @@ def analyze_natural_language(req: AnalyzeNaturalLanguageRequest):
     except Exception as e:
         print(f"❌ [analyze_natural_language] 量化失败: {e}")
         print(f"❌ [analyze_natural_language] 错误堆栈: {traceback.format_exc()}")
-        # AI 故障时使用兜底规则，保证前端功能可用
+        # AI 故障时使用兜底规则，保证前端功能可用（本地规则识别出的维度仍然保留）
         return {
             "success": True,
-            "scores": fallback_scores,
+            "scores": {**fallback_scores, **local_scores},
             "fallback": True,
+            "local_dimensions": list(local_scores),
         }
 
 
 @app.post("/api/analyze_competitiveness")
-def analyze_competitiveness(req: AnalyzeCompetitivenessRequest):
+async def analyze_competitiveness(req: AnalyzeCompetitivenessRequest):
     """
     竞争力分析接口
     
@@ -2581,18 +2870,23 @@ def analyze_competitiveness(req: AnalyzeCompetitivenessRequest):
     
     print(f"✅ [analyze_competitiveness] 收到竞争力分析请求")
     
+    # 量化备忘表：降级路径直接复用已经算出的分数（包括失败后的默认分），不再重复调用 AI
+    quantize_memo = {}
+    quantize_items = {
+        key: (getattr(req, key, ""), dimension_name)
+        for key, dimension_name in COMPETITIVENESS_DIMENSIONS
+    }
+    loop = asyncio.get_running_loop()
+    quantize_deadline = loop.time() + QUANTIZE_DEADLINE_SECONDS
+    quantized_scores = None
+    
     try:
-        # 1. 量化所有维度分数
+        # 1. 量化所有维度分数（非数字维度合并为一次 AI 请求）
         print(f"🔄 [analyze_competitiveness] 开始量化各维度分数")
         
-        quantized_scores = {
-            "gpa": _quantize_score(req.gpa, "GPA"),
-            "project_experience": _quantize_score(req.project_experience, "项目实战经验"),
-            "internship": _quantize_score(req.internship, "名企实习经历"),
-            "competition": _quantize_score(req.competition, "竞赛获奖情况"),
-            "english_academic": _quantize_score(req.english_academic, "英语学术能力"),
-            "leadership": _quantize_score(req.leadership, "领导力与协作"),
-        }
+        quantized_scores = await _quantize_scores_batch(
+            quantize_items, memo=quantize_memo, deadline=quantize_deadline - loop.time(),
+        )
         
         print(f"✅ [analyze_competitiveness] 量化完成: {quantized_scores}")
         
@@ -2647,7 +2941,7 @@ def analyze_competitiveness(req: AnalyzeCompetitivenessRequest):
             "请基于以上分数，生成一份详细的竞争力分析报告。"
         )
         
-        analysis_report = _deepseek_markdown(system_prompt, user_prompt)
+        analysis_report = await _adeepseek_markdown(system_prompt, user_prompt)
         
         print(f"✅ [analyze_competitiveness] AI 分析报告生成成功，长度: {len(analysis_report)} 字符")
         
@@ -2655,22 +2949,20 @@ def analyze_competitiveness(req: AnalyzeCompetitivenessRequest):
             "success": True,
             "quantized_scores": quantized_scores,
             "analysis_report": analysis_report,
-            "fallback": False
+            "fallback": False,
+            "llm_meta": collect_llm_meta(),
         }
     
     except Exception as e:
         print(f"❌ [analyze_competitiveness] 生成失败: {e}")
         print(f"❌ [analyze_competitiveness] 错误堆栈: {traceback.format_exc()}")
         
-        # 降级逻辑：返回基础分析
-        quantized_scores_fallback = {
-            "gpa": _quantize_score(req.gpa, "GPA") if hasattr(req, 'gpa') else 0,
-            "project_experience": _quantize_score(req.project_experience, "项目实战经验") if hasattr(req, 'project_experience') else 0,
-            "internship": _quantize_score(req.internship, "名企实习经历") if hasattr(req, 'internship') else 0,
-            "competition": _quantize_score(req.competition, "竞赛获奖情况") if hasattr(req, 'competition') else 0,
-            "english_academic": _quantize_score(req.english_academic, "英语学术能力") if hasattr(req, 'english_academic') else 0,
-            "leadership": _quantize_score(req.leadership, "领导力与协作") if hasattr(req, 'leadership') else 0,
-        }
+        # 降级逻辑：返回基础分析（量化已完成时直接复用；否则只补算备忘表中缺失的维度，与第一次共用截止时间）
+        quantized_scores_fallback = quantized_scores
+        if quantized_scores_fallback is None:
+            quantized_scores_fallback = await _quantize_scores_batch(
+                quantize_items, memo=quantize_memo, deadline=quantize_deadline - loop.time(),
+            )
         
         fallback_report = (
             "## 📊 竞争力总览\n\n"
@@ -2694,12 +2986,8 @@ def analyze_competitiveness(req: AnalyzeCompetitivenessRequest):
         }
 
 
-@app.post("/api/generate-career")
-def generate_career(req: GenerateCareerRequest):
-    """
-    接收：性格测试 JSON + 虚拟实验 Markdown + 可选补充说明
-    输出：整合后的生涯规划 Markdown 报告
-    """
+def _career_prompts(req: GenerateCareerRequest):
+    """生涯规划报告的 (system_prompt, user_prompt)，普通接口与流式接口共用"""
     system_prompt = (
         "你是一位资深生涯规划师。你将整合两份输入：\n"
         "- 性格测试结果（JSON：可能含截图/自述/字段）\n"
@@ -2724,18 +3012,35 @@ def generate_career(req: GenerateCareerRequest):
         f"{req.note or ''}\n\n"
         "请输出最终的生涯规划 Markdown 报告。"
     )
+    return system_prompt, user_prompt
 
-    markdown = _deepseek_markdown(system_prompt, user_prompt)
+
+@app.post("/api/generate-career")
+async def generate_career(req: GenerateCareerRequest):
+    """
+    接收：性格测试 JSON + 虚拟实验 Markdown + 可选补充说明
+    输出：整合后的生涯规划 Markdown 报告
+    """
+    system_prompt, user_prompt = _career_prompts(req)
+    markdown = await _adeepseek_markdown(system_prompt, user_prompt)
     return {"success": True, "markdown": markdown}
 
 
-@app.post("/api/generate-interview-report")
-def generate_interview_report(req: GenerateInterviewReportRequest):
+@app.post("/api/generate-career/stream")
+async def generate_career_stream(req: GenerateCareerRequest):
     """
-    生成面试分析报告
-    接收：完整的对话历史记录和目标岗位
-    输出：Markdown 格式的面试分析报告
+    /api/generate-career 的 SSE 版本
+    事件：start → delta（{"text": 增量}）→ done（与普通接口相同的返回结构 + stream_id）| error
     """
+    system_prompt, user_prompt = _career_prompts(req)
+    return sse_response(
+        _markdown_stream_producer(system_prompt, user_prompt, tag="generate_career"),
+        store=stream_result_store, tag="generate_career",
+    )
+
+
+def _interview_report_prompts(req: GenerateInterviewReportRequest):
+    """面试分析报告的 (system_prompt, user_prompt)，普通接口与流式接口共用"""
     system_prompt = (
         "你是一位长期为大学生（本科生 + 研究生）做模拟面试辅导的资深面试官兼职业发展顾问。\n"
         "你会基于【系统已提取的元信息】和【完整对话记录】生成一份**高度贴合本次面试表现的个性化分析报告**，而不是模板化的空洞总结。\n\n"
@@ -2806,13 +3111,36 @@ def generate_interview_report(req: GenerateInterviewReportRequest):
         f"{chat_text}\n"
         "请严格依据以上元信息和对话内容，按照系统提示的 7 个模块结构生成一份面向大学生的个性化面试分析报告。"
     )
-    
+    return system_prompt, user_prompt
+
+
+@app.post("/api/generate-interview-report")
+async def generate_interview_report(req: GenerateInterviewReportRequest):
+    """
+    生成面试分析报告
+    接收：完整的对话历史记录和目标岗位
+    输出：Markdown 格式的面试分析报告
+    """
+    system_prompt, user_prompt = _interview_report_prompts(req)
     try:
-        markdown = _deepseek_markdown(system_prompt, user_prompt)
+        markdown = await _adeepseek_markdown(system_prompt, user_prompt)
         return {"success": True, "markdown": markdown}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+
+@app.post("/api/generate-interview-report/stream")
+async def generate_interview_report_stream(req: GenerateInterviewReportRequest):
+    """
+    /api/generate-interview-report 的 SSE 版本
+    事件：start → delta → done（{"success": true, "markdown": ..., "stream_id": ...}）| error
+    """
+    system_prompt, user_prompt = _interview_report_prompts(req)
+    return sse_response(
+        _markdown_stream_producer(system_prompt, user_prompt, tag="generate_interview_report"),
+        store=stream_result_store, tag="generate_interview_report",
+    )
+
 # ==========================================
 #  Production: Serve Vue frontend
 # ==========================================
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+resume_history.ai_analysis 压缩迁移脚本
+把已有的明文 ai_analysis 分批改写为压缩格式（见 history_codec.py），也可以反向还原为明文
+
+- 按主键 id 分批读取，每批一个事务，可随时中断后重新执行（已压缩的行会被跳过）
+- 新旧格式可以共存，读取时都会被透明解码，迁移期间服务无需停机
+
+用法（在 backend 目录下运行）：
+    python migrate_history_codec.py [--batch-size 200] [--dry-run] [--decode]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from db_config import get_db_cursor
+from history_codec import decode_ai_analysis, encode_ai_analysis, is_encoded
+
+
+def migrate(batch_size: int = 200, dry_run: bool = False, decode: bool = False) -> dict:
+    """逐批迁移，返回统计信息"""
+    stats = {"scanned": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    started = time.time()
+    while True:
+        conn, cursor = get_db_cursor()
+        try:
+            cursor.execute(
+                "SELECT id, ai_analysis FROM resume_history WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                stored = row.get("ai_analysis") or ""
+                if decode:
+                    new_value = decode_ai_analysis(stored) if is_encoded(stored) else stored
+                else:
+                    new_value = stored if is_encoded(stored) else encode_ai_analysis(stored)
+                stats["scanned"] += 1
+                stats["bytes_before"] += len(stored.encode("utf-8"))
+                stats["bytes_after"] += len(new_value.encode("utf-8"))
+                if new_value != stored:
+                    updates.append((new_value, row["id"]))
+            if updates and not dry_run:
+                cursor.executemany("UPDATE resume_history SET ai_analysis = %s WHERE id = %s", updates)
+                conn.commit()
+            stats["rewritten"] += len(updates)
+            last_id = rows[-1]["id"]
+            print(f"🔄 [migrate_history_codec] 已处理到 id={last_id}，累计改写 {stats['rewritten']} 行")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+    stats["seconds"] = round(time.time() - started, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="resume_history.ai_analysis 压缩迁移")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批处理的行数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计压缩效果，不写回数据库")
+    parser.add_argument("--decode", action="store_true", help="反向迁移：把压缩格式还原为明文")
+    args = parser.parse_args()
+
+    mode = "还原为明文" if args.decode else "压缩"
+    print(f"🔄 [migrate_history_codec] 开始{mode}{'（dry-run，不写回）' if args.dry_run else ''}")
+    try:
+        stats = migrate(args.batch_size, args.dry_run, args.decode)
+    except Exception as e:
+        print(f"❌ [migrate_history_codec] 迁移失败（已完成的批次保持不变，可重新执行）：{e}")
+        return False
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    ratio = after / before if before else 1.0
+    print(f"✅ [migrate_history_codec] 完成：扫描 {stats['scanned']} 行，改写 {stats['rewritten']} 行，"
+          f"ai_analysis 总大小 {before / 1024:.1f} KB → {after / 1024:.1f} KB（{ratio:.0%}），耗时 {stats['seconds']}s")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+用户资料（偏好设置）存储
+原先的 data/profiles.csv 每次读取都要线性扫描、每次更新都要整表重写，
+用户量增长后是 O(用户数) 的开销，并发写入还会互相覆盖。这里改为 SQLite（WAL 模式）：
+- 以 username 为主键，读写都是单行操作
+- 字段与旧 CSV 完全一致，值同样按字符串保存（notify/auto_save 为 "True"/"False"），调用方读写语义不变
+- 首次启动时自动从旧 CSV 一次性导入（导入标记记录在库中，不会重复导入；原 CSV 保留作为备份）
+
+本模块不依赖 FastAPI，也可以直接运行做手动迁移：
+    python profile_store.py migrate data/profiles.csv data/profiles.db
+"""
+import os
+import csv
+import sys
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+PROFILE_FIELDS = ["username", "avatar", "email", "phone", "city", "style", "file_format", "notify", "auto_save"]
+
+# 新建资料时未提供的字段取这些默认值（与旧 CSV 新增记录时一致）
+DEFAULT_PROFILE = {
+    "avatar": "",
+    "email": "",
+    "phone": "",
+    "city": "",
+    "style": "专业正式",
+    "file_format": "PDF",
+    "notify": "True",
+    "auto_save": "True",
+}
+
+_VALUE_FIELDS = PROFILE_FIELDS[1:]
+
+
+def _to_text(value) -> str:
+    """统一转成字符串存储，布尔值与旧 CSV 一样存为 "True"/"False" """
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _row_values(profile: Dict):
+    """按列顺序取出除 username 外的字段值，缺失的字段使用默认值"""
+    return [_to_text(profile.get(field, DEFAULT_PROFILE[field])) for field in _VALUE_FIELDS]
+
+
+class ProfileStore:
+    """SQLite 资料存储：单连接 + 锁（与 llm_cache.SQLiteTier 一致），WAL 模式下读写互不阻塞文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 下 NORMAL 已能保证崩溃后数据库一致，只可能丢失最后一次提交
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{field} TEXT NOT NULL DEFAULT ''" for field in _VALUE_FIELDS)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS profiles (username TEXT PRIMARY KEY, {columns}, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS profile_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get(self, username: str) -> Optional[Dict[str, str]]:
+        """按用户名读取一行，返回与 csv.DictReader 行相同结构的 dict；不存在返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles WHERE username = ?", (username,)
+            ).fetchone()
+        return dict(zip(PROFILE_FIELDS, row)) if row is not None else None
+
+    def upsert(self, profile: Dict):
+        """整行写入（对应旧逻辑的 row.update(profile)），未提供的字段使用默认值"""
+        row = _row_values(profile)
+        placeholders = ", ".join("?" for _ in PROFILE_FIELDS)
+        updates = ", ".join(f"{field} = excluded.{field}" for field in _VALUE_FIELDS)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO profiles ({', '.join(PROFILE_FIELDS)}, updated_at) VALUES ({placeholders}, ?)"
+                f" ON CONFLICT(username) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                [profile["username"], *row, time.time()],
+            )
+            self._conn.commit()
+
+    def update_fields(self, username: str, **fields):
+        """只更新指定字段；资料不存在时按默认值新建一行（对应上传头像时的逻辑）"""
+        fields = {k: _to_text(v) for k, v in fields.items() if k in DEFAULT_PROFILE}
+        if not fields:
+            return
+        row = dict(DEFAULT_PROFILE, **fields)
+        placeholders = ", ".join("?" for _ in PROFILE_FIELDS)
+        updates = ", ".join(f"{field} = excluded.{field}" for field in fields)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO profiles ({', '.join(PROFILE_FIELDS)}, updated_at) VALUES ({placeholders}, ?)"
+                f" ON CONFLICT(username) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                [username, *(row[field] for field in _VALUE_FIELDS), time.time()],
+            )
+            self._conn.commit()
+
+    def bulk_upsert(self, profiles: Iterable[Dict]) -> int:
+        """批量整行写入（单个事务），用于迁移和压测造数"""
+        placeholders = ", ".join("?" for _ in PROFILE_FIELDS)
+        now = time.time()
+        rows = [[p["username"], *_row_values(p), now] for p in profiles if p.get("username")]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO profiles ({', '.join(PROFILE_FIELDS)}, updated_at) VALUES ({placeholders}, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM profile_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO profile_meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def migrate_from_csv(self, csv_path: str, force: bool = False) -> int:
+        """
+        从旧的 profiles.csv 一次性导入，返回导入的行数
+
+        已导入过（库中有标记）时直接返回 0，force=True 时重新导入（同名用户以 CSV 为准）
+        """
+        if not force and self._get_meta("csv_migrated"):
+            return 0
+        if not os.path.exists(csv_path):
+            return 0
+        with open(csv_path, "r", encoding="utf-8-sig") as f:
+            imported = self.bulk_upsert(csv.DictReader(f))
+        self._set_meta("csv_migrated", f"{os.path.abspath(csv_path)} @ {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"✅ [profile_store] 已从 {csv_path} 导入 {imported} 条用户资料")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    """
+    获取全局资料存储（首次调用时创建，并从旧 CSV 自动迁移）
+
+    - PROFILE_DB_PATH: SQLite 文件路径（默认 data/profiles.db）
+    - PROFILE_CSV_PATH: 旧 CSV 路径，用于首次迁移（默认 data/profiles.csv）
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = ProfileStore(os.getenv("PROFILE_DB_PATH", os.path.join("data", "profiles.db")))
+                try:
+                    store.migrate_from_csv(os.getenv("PROFILE_CSV_PATH", os.path.join("data", "profiles.csv")))
+                except Exception as e:
+                    print(f"⚠️ [profile_store] 旧 CSV 迁移失败，稍后可手动迁移：{e}")
+                _store = store
+    return _store
+
+
+def close_profile_store():
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+
+
+if __name__ == "__main__":
+    # 手动迁移：python profile_store.py migrate [CSV 路径] [SQLite 路径]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("用法: python profile_store.py migrate [data/profiles.csv] [data/profiles.db]")
+        sys.exit(1)
+    csv_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join("data", "profiles.csv")
+    db_path = sys.argv[3] if len(sys.argv) > 3 else os.path.join("data", "profiles.db")
+    store = ProfileStore(db_path)
+    count = store.migrate_from_csv(csv_path, force=True)
+    print(f"✅ 迁移完成：{count} 条，库中共 {store.count()} 条")
+    store.close()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+简历提示词打包
+PDF 提取出的简历原文往往带着每页重复的页眉页脚、页码和大量空白，直接塞进提示词既浪费 token
+也拖慢生成。这里在调用 LLM 之前做一次本地压缩，让最有用的内容落在 token 预算之内：
+- 本地估算 token 数（不依赖网络分词器），中文按 0.6、其他字符按 0.3 计
+- 去掉跨页重复的页眉/页脚和单独成行的页码，合并多余空白
+- 按简历分节（教育、实习、项目、技能……）的重要程度分配预算，超出预算时先截断/丢弃不重要的分节，
+  输出时仍保持原文顺序
+
+本模块只依赖标准库，后端和 Streamlit 页面都可以直接导入
+"""
+import re
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# 默认预算（token），覆盖绝大多数一到两页的简历
+DEFAULT_TOKEN_BUDGET = 3000
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_SPACE_RE = re.compile(r"[ \t\u00a0\u3000]+")
+# PDF 提取常见的 "北 京 邮 电 大 学"：两个中文字符之间的单个空格
+_CJK_GAP_RE = re.compile(r"(?<=[\u4e00-\u9fff]) (?=[\u4e00-\u9fff])")
+# 单独成行的页码："第 2 页 / 共 3 页"、"- 2 -"、"2/3"、"Page 2 of 3"
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:第\s*\d+\s*页(?:\s*[/，,]?\s*共\s*\d+\s*页)?|-?\s*\d{1,3}\s*-?|\d{1,3}\s*/\s*\d{1,3}"
+    r"|page\s*\d+(?:\s*of\s*\d+)?)$",
+    re.IGNORECASE,
+)
+_DIGITS_RE = re.compile(r"\d+")
+
+# (分节名, 标题关键词, 重要程度)；重要程度越高越晚被截断
+SECTION_RULES: List[Tuple[str, Tuple[str, ...], int]] = [
+    ("基本信息", ("基本信息", "个人信息", "联系方式", "个人资料"), 90),
+    ("求职意向", ("求职意向", "意向岗位", "求职目标", "应聘岗位"), 85),
+    ("教育背景", ("教育背景", "教育经历", "学历", "education"), 80),
+    ("实习经历", ("实习经历", "工作经历", "工作经验", "职业经历", "experience"), 100),
+    ("项目经历", ("项目经历", "项目经验", "项目实践", "projects"), 95),
+    ("专业技能", ("专业技能", "技能", "技术栈", "skills"), 75),
+    ("获奖荣誉", ("获奖", "荣誉", "奖项", "竞赛", "awards"), 60),
+    ("科研经历", ("科研", "论文", "研究经历", "publications", "research"), 60),
+    ("证书资质", ("证书", "资格", "certificates"), 45),
+    ("校园经历", ("校园经历", "学生工作", "社团", "社会实践", "志愿"), 40),
+    ("自我评价", ("自我评价", "个人评价", "个人总结", "自我介绍", "summary"), 30),
+    ("兴趣爱好", ("兴趣爱好", "爱好", "hobbies", "interests"), 10),
+]
+# 第一个标题之前的内容通常是姓名和联系方式
+_PREAMBLE = ("开头", 90)
+# 标题行的最大长度，避免把正文中提到 "项目" 的句子当成标题
+_MAX_HEADING_LEN = 16
+# 省略说明预留的 token
+_NOTE_RESERVE = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文字符约 0.6 token，其他非空白字符约 0.3 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk - text.count(" ") - text.count("\n")
+    return int(math.ceil(cjk * 0.6 + max(other, 0) * 0.3))
+
+
+@dataclass
+class PackedText:
+    """打包结果"""
+    text: str
+    tokens: int
+    original_tokens: int
+    budget: int
+    truncated_sections: List[str] = field(default_factory=list)
+    dropped_sections: List[str] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.truncated_sections or self.dropped_sections)
+
+
+@dataclass
+class _Section:
+    name: str
+    importance: int
+    lines: List[str]
+    order: int
+
+
+def _clean_line(line: str) -> str:
+    line = _SPACE_RE.sub(" ", line).strip()
+    return _CJK_GAP_RE.sub("", line)
+
+
+def _line_signature(line: str) -> str:
+    """页眉页脚里常带页码/日期，比较时忽略数字"""
+    return _DIGITS_RE.sub("#", line)
+
+
+def strip_repeated_lines(pages: List[List[str]], min_pages: int = 2) -> List[List[str]]:
+    """
+    去掉跨页重复的页眉/页脚：每页前两行和后两行中，在 min_pages 页以上重复出现的只保留第一次
+    单页文档不做处理
+    """
+    if len(pages) < min_pages:
+        return pages
+    counts: Dict[str, int] = {}
+    for lines in pages:
+        for sig in {_line_signature(l) for l in lines[:2] + lines[-2:]}:
+            counts[sig] = counts.get(sig, 0) + 1
+    repeated = {sig for sig, n in counts.items() if n >= min_pages}
+    seen = set()
+    result = []
+    for lines in pages:
+        kept = []
+        for index, line in enumerate(lines):
+            sig = _line_signature(line)
+            at_edge = index < 2 or index >= len(lines) - 2
+            if at_edge and sig in repeated:
+                if sig in seen:
+                    continue
+                seen.add(sig)
+            kept.append(line)
+        result.append(kept)
+    return result
+
+
+def normalize_resume_text(source: Union[str, Iterable[str]]) -> str:
+    """
+    清洗简历原文：合并空白、去掉页码和跨页重复的页眉页脚
+
+    source 可以是整段文本，也可以是逐页文本（如 resume_parser.iter_pdf_pages 的输出）；
+    整段文本中的换页符 \\f（extraction_service 用它分隔 PDF 页）会被当作分页
+    """
+    raw_pages = source.split("\f") if isinstance(source, str) else list(source)
+    pages = []
+    for page in raw_pages:
+        lines = []
+        for line in (page or "").splitlines():
+            line = _clean_line(line)
+            if line and not _PAGE_NUMBER_RE.match(line):
+                lines.append(line)
+        pages.append(lines)
+    return "\n".join(line for page in strip_repeated_lines(pages) for line in page)
+
+
+def _match_heading(line: str) -> Optional[Tuple[str, int]]:
+    text = line.strip("#*【】[]:：·•- ").lower()
+    if not text or len(text) > _MAX_HEADING_LEN:
+        return None
+    for name, keywords, importance in SECTION_RULES:
+        if any(text.startswith(k) or text.endswith(k) for k in keywords):
+            return name, importance
+    return None
+
+
+def _split_sections(text: str) -> List[_Section]:
+    """按分节标题切分，标题行作为所属分节的第一行"""
+    sections = [_Section(_PREAMBLE[0], _PREAMBLE[1], [], 0)]
+    for line in text.splitlines():
+        heading = _match_heading(line)
+        if heading is not None:
+            sections.append(_Section(heading[0], heading[1], [line], len(sections)))
+        else:
+            sections[-1].lines.append(line)
+    return [s for s in sections if s.lines]
+
+
+def _lines_cost(lines: List[str]) -> int:
+    return sum(estimate_tokens(line) + 1 for line in lines)
+
+
+def _fit_lines(lines: List[str], budget: int) -> List[str]:
+    """按行截取不超过预算的前缀；第一行就放不下时按比例截断第一行"""
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            if not kept and budget > 1:
+                kept.append(line[:max(1, int(len(line) * (budget - 1) / cost))])
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def pack_resume(source: Union[str, Iterable[str]], budget: int = DEFAULT_TOKEN_BUDGET) -> PackedText:
+    """
+    把简历原文压缩到 token 预算之内（budget <= 0 表示不限制，只做清洗）
+
+    预算足够时只做清洗；超出预算时按分节重要程度加权分配：较短的分节通常能完整保留，
+    较长的分节按行截断，分到的预算过少的分节整体丢弃，并在末尾注明截断/省略了哪些分节
+    """
+    if not isinstance(source, str):
+        source = list(source)
+    original_tokens = estimate_tokens(source if isinstance(source, str) else "\n".join(source))
+    text = normalize_resume_text(source)
+    tokens = estimate_tokens(text)
+    if budget <= 0 or tokens <= budget:
+        return PackedText(text=text, tokens=tokens, original_tokens=original_tokens, budget=budget)
+
+    sections = _split_sections(text)
+    remaining = max(budget - _NOTE_RESERVE, 0)
+    kept: Dict[int, List[str]] = {}
+    # 按重要程度加权分配预算：放得下的分节完整保留，省下的预算再分给其余分节，直到没有分节能完整放下
+    pending = list(sections)
+    while pending:
+        total_weight = sum(s.importance for s in pending)
+        fits = [s for s in pending if _lines_cost(s.lines) <= remaining * s.importance / total_weight]
+        if not fits:
+            break
+        for section in fits:
+            kept[section.order] = section.lines
+            remaining -= _lines_cost(section.lines)
+            pending.remove(section)
+
+    # 剩余分节按份额截断，重要的分节先分配，份额太小的整体丢弃
+    truncated, dropped = [], []
+    total_weight = sum(s.importance for s in pending)
+    for section in sorted(pending, key=lambda s: (-s.importance, s.order)):
+        # 按行截断用不满的份额顺延给后面的分节
+        share = int(remaining * section.importance / total_weight)
+        total_weight -= section.importance
+        lines = _fit_lines(section.lines, share)
+        if lines:
+            kept[section.order] = lines
+            remaining -= _lines_cost(lines)
+            truncated.append(section.name)
+        else:
+            dropped.append(section.name)
+
+    parts = ["\n".join(kept[s.order]) for s in sections if s.order in kept]
+    if truncated or dropped:
+        omitted = "、".join(dict.fromkeys(truncated + dropped))
+        parts.append(f"（简历较长，以下分节已截断或省略：{omitted}）")
+    packed = "\n".join(parts)
+    return PackedText(
+        text=packed,
+        tokens=estimate_tokens(packed),
+        original_tokens=original_tokens,
+        budget=budget,
+        truncated_sections=truncated,
+        dropped_sections=dropped,
+    )
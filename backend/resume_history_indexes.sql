@@ -0,0 +1,25 @@
+-- 为 resume_history 列表分页添加复合索引
+-- 列表接口按 user_id 过滤、按 (created_at, id) 倒序做键集分页：
+--   WHERE user_id = ? AND (created_at < ? OR (created_at = ? AND id < ?))
+--   ORDER BY created_at DESC, id DESC LIMIT ?
+-- 单独的 idx_user_id / idx_created_at 只能用上其中一个，另一个条件仍需回表过滤或额外排序；
+-- (user_id, created_at) 复合索引可以直接定位到游标位置并按索引顺序返回（InnoDB 二级索引自带主键 id，
+-- 同一时间戳内按 id 排序也无需 filesort）
+--
+-- 请在数据库管理界面执行以下 SQL 语句（可重复执行前先用第 1 步确认索引是否已存在）
+
+-- 1. 查看现有索引
+SHOW INDEX FROM resume_history;
+
+-- 2. 添加复合索引（在线 DDL，不锁表）
+ALTER TABLE resume_history ADD INDEX idx_user_created (user_id, created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+-- 3. idx_user_id 是新索引的最左前缀，已经冗余，确认无误后可删除以减少写入开销（可选）
+-- ALTER TABLE resume_history DROP INDEX idx_user_id;
+
+-- 4. 验证列表查询走新索引（key 列应为 idx_user_created，Extra 中不应出现 Using filesort）
+EXPLAIN SELECT id, resume_type, resume_file_url, created_at
+FROM resume_history
+WHERE user_id = 1 AND (created_at < '2026-01-01 00:00:00' OR (created_at = '2026-01-01 00:00:00' AND id < 100))
+ORDER BY created_at DESC, id DESC
+LIMIT 21;
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight 请求合并
+同一时刻相同指纹（如相同 prompt）的多个调用只向上游发起一次，其余调用等待并共享结果：
+- 同时支持线程（同步接口在线程池中调用）与 asyncio 协程等待，二者可以等待同一个调用
+- 每个等待方独立超时，某个等待方超时或被取消不会影响上游调用和其他等待方
+- 上游调用结束（成功或失败）后立即移除，之后的新请求会重新发起调用，不做结果缓存
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class _Call:
+    """一次正在进行中的上游调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.done = False
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        # 协程等待方：(事件循环, Future)
+        self.async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+def _resolve(fut: asyncio.Future, value: Any, error: Optional[BaseException]):
+    if fut.done():  # 等待方已超时或被取消
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(value)
+
+
+class SingleFlight:
+    """
+    按 key 合并并发调用
+
+    - do(key, fn, timeout)：同步版本，第一个调用方在当前线程执行 fn()
+    - do_async(key, fn, timeout)：协程版本，fn() 在独立任务中执行，发起方超时也不会中断它
+    两者都返回 (结果, 是否为共享结果)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._leaders = 0
+        self._coalesced = 0
+        self._waiter_timeouts = 0
+        self._errors = 0
+
+    def _join(self, key: str) -> Tuple[_Call, bool]:
+        """登记为某个调用的等待方；没有进行中的调用时成为发起方（需持有锁）"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call()
+            self._calls[key] = call
+            self._leaders += 1
+            return call, True
+        self._coalesced += 1
+        return call, False
+
+    def _finish(self, key: str, call: _Call, value: Any, error: Optional[BaseException]):
+        with self._lock:
+            call.value, call.error, call.done = value, error, True
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            if error is not None:
+                self._errors += 1
+            waiters = list(call.async_waiters)
+            call.async_waiters.clear()
+        call.event.set()
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, fut, value, error)
+            except RuntimeError:
+                # 等待方所在的事件循环已经关闭
+                pass
+
+    def _count_timeout(self):
+        with self._lock:
+            self._waiter_timeouts += 1
+
+    # ---------- 同步路径 ----------
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        with self._lock:
+            call, leader = self._join(key)
+        if leader:
+            try:
+                value = fn()
+            except BaseException as e:
+                self._finish(key, call, None, e)
+                raise
+            self._finish(key, call, value, None)
+            return value, False
+        if not call.event.wait(timeout):
+            self._count_timeout()
+            raise TimeoutError(f"等待合并请求超时（{timeout}s）")
+        if call.error is not None:
+            raise call.error
+        return call.value, True
+
+    # ---------- 异步路径 ----------
+    async def do_async(self, key: str, fn: Callable[[], Awaitable], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with self._lock:
+            call, leader = self._join(key)
+            if call.done:
+                _resolve(fut, call.value, call.error)
+            else:
+                call.async_waiters.append((loop, fut))
+        if leader:
+            task = asyncio.ensure_future(self._run(key, call, fn))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            value = await asyncio.wait_for(fut, timeout) if timeout else await fut
+        except asyncio.TimeoutError:
+            self._count_timeout()
+            raise TimeoutError(f"等待合并请求超时（{timeout}s）")
+        return value, not leader
+
+    async def _run(self, key: str, call: _Call, fn: Callable[[], Awaitable]):
+        try:
+            value = await fn()
+        except BaseException as e:
+            self._finish(key, call, None, e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        self._finish(key, call, value, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._leaders + self._coalesced
+            return {
+                "upstream_calls": self._leaders,
+                "coalesced": self._coalesced,
+                "waiter_timeouts": self._waiter_timeouts,
+                "errors": self._errors,
+                "in_flight": len(self._calls),
+                "coalesce_rate": round(self._coalesced / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+SSE（Server-Sent Events）流式响应工具
+Markdown 生成类接口边生成边推送，首字节时间从整段生成耗时降到首个 token 到达：
+- 生成过程在独立任务中运行，客户端中途断开也会跑完，保证最终文档能落库/缓存
+- 完整结果按 stream_id 暂存，客户端断线后可通过 /api/stream-result/{stream_id} 取回
+- 事件格式：start → delta*（以及业务自定义事件）→ done | error
+"""
+import json
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from fastapi.responses import StreamingResponse
+
+# emit(事件名, 数据)：生成任务向客户端推送一条事件
+Emit = Callable[[str, Dict], None]
+Producer = Callable[[Emit], Awaitable[Dict]]
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # 关闭 Nginx 等反向代理的缓冲，否则 token 会被攒成一整块再下发
+    "X-Accel-Buffering": "no",
+}
+
+_DONE = object()
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """按 SSE 协议编码一条事件"""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class StreamResultStore:
+    """流式生成结果的短期暂存（TTL + 条目数上限）"""
+
+    def __init__(self, ttl: int = 600, max_entries: int = 500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, stream_id: str, result: Dict):
+        with self._lock:
+            self._data.pop(stream_id, None)
+            self._data[stream_id] = (time.time() + self.ttl, result)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get(self, stream_id: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(stream_id)
+            if item is None:
+                return None
+            if item[0] <= time.time():
+                self._data.pop(stream_id, None)
+                return None
+            return item[1]
+
+
+# 持有后台生成任务的引用，避免客户端断开后任务被垃圾回收
+_running_streams: Set[asyncio.Task] = set()
+
+
+def sse_response(producer: Producer, store: Optional[StreamResultStore] = None,
+                 tag: str = "sse") -> StreamingResponse:
+    """
+    把生成任务包装成 SSE 响应
+
+    producer(emit) 负责推送增量事件，返回值作为 done 事件的数据并写入 store；
+    producer 抛出异常时推送 error 事件
+    """
+    stream_id = uuid.uuid4().hex
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Dict):
+        queue.put_nowait((event, data))
+
+    async def run():
+        try:
+            result = await producer(emit)
+            result = dict(result or {}, stream_id=stream_id)
+            event = "done"
+        except Exception as e:
+            print(f"❌ [{tag}] 流式生成失败: {e}")
+            detail = getattr(e, "detail", None) or str(e)
+            result = {"success": False, "error": detail, "stream_id": stream_id}
+            event = "error"
+        if store is not None:
+            store.put(stream_id, result)
+        queue.put_nowait((event, result))
+        queue.put_nowait(_DONE)
+
+    task = asyncio.ensure_future(run())
+    _running_streams.add(task)
+    task.add_done_callback(_running_streams.discard)
+
+    async def body():
+        yield sse_event("start", {"stream_id": stream_id})
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield sse_event(*item)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
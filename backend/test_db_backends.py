@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库后端一致性测试
+对 sync（db_config + 线程池）和 async（aiomysql）两种后端运行同一组检查，
+确认 get_async_db() 返回的接口在两种配置下行为一致
+
+使用当前 DB_* 环境变量配置的数据库，测试用户名带随机后缀，结束后删除测试数据。
+需要 users、resume_history 两张表（init_db.py / test_resume_history.sql 创建）
+
+不连接真实数据库时，可以在仓库根目录运行 python -m pytest backend/tests/test_db_backends.py，
+用内存 SQLite 模拟 MySQL 对两种后端运行同一组 run_checks
+
+用法（在 backend 目录下运行）：
+    python test_db_backends.py                 # 两种后端都测（未安装 aiomysql 时跳过 async）
+    python test_db_backends.py --backend sync
+"""
+import os
+import sys
+import json
+import uuid
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import db_config
+import db_backend
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def expect(condition, message: str):
+    if not condition:
+        raise CheckFailed(message)
+    print(f"  ✅ {message}")
+
+
+async def run_checks(db, username: str):
+    """同一组检查，db 为 get_async_db(name) 的返回值"""
+    ok, _ = await db.create_user(username, "pw123456", "大三", "后端开发")
+    expect(ok, "create_user 注册成功")
+    ok, message = await db.create_user(username, "pw123456", "大三", "后端开发")
+    expect(not ok and "已被注册" in message, "create_user 重复用户名被拒绝")
+
+    user = await db.get_user_by_username(username)
+    expect(user is not None and user["username"] == username, "get_user_by_username 查到新用户")
+    user_id = user["id"]
+    by_id = await db.get_user_by_id(user_id)
+    expect(by_id is not None and by_id["username"] == username, "get_user_by_id 与按用户名查询一致")
+    expect(await db.get_user_by_username(username + "_none") is None, "不存在的用户返回 None")
+
+    ok, message, profile = await db.authenticate_user(username, "pw123456")
+    expect(ok and profile["id"] == user_id and "password" not in profile, "authenticate_user 密码正确")
+    ok, message, _ = await db.authenticate_user(username, "wrong")
+    expect(not ok and message == "密码错误", "authenticate_user 密码错误")
+    ok, message = await db.user_login(username + "_none", "x")
+    expect(not ok and message == "用户名不存在", "user_login 用户名不存在")
+
+    expect(await db.update_user_field(username, "grade", "研一"), "update_user_field 更新成功")
+    expect((await db.get_user_by_username(username))["grade"] == "研一", "更新后读取到新值（缓存已失效）")
+    expect(await db.update_user_multiple_fields(username, {"grade": "研二", "target_role": "算法"}),
+           "update_user_multiple_fields 更新成功")
+    user = await db.get_user_by_username(username)
+    expect(user["grade"] == "研二" and user["target_role"] == "算法", "多字段更新后读取到新值")
+
+    for _ in range(3):
+        expect(await db.increment_user_field(username, "createTaskNum"), "increment_user_field 递增成功")
+    expect(await db.decrement_user_field(username, "createTaskNum"), "decrement_user_field 递减成功")
+    expect(await db.decrement_user_field(username, "uploadedResumeNum", 5), "decrement_user_field 不低于 0")
+    user = await db.get_user_by_username(username)
+    expect(user["createTaskNum"] == 2 and user["uploadedResumeNum"] == 0, "计数读取包含未写回的增量")
+    db_config.flush_user_counters()
+    user = await db.get_user_by_username(username)
+    expect(user["createTaskNum"] == 2, "写回后计数不变")
+    expect(not await db.increment_user_field(username + "_none", "createTaskNum"), "不存在的用户递增失败")
+    expect(any(u["username"] == username for u in await db.get_all_users()), "get_all_users 包含新用户")
+
+    ids = []
+    for i in range(3):
+        ok, history_id = await db.create_resume_history(
+            user_id, "normal", f"text_input_{username}_{i}",
+            {"diagnosis_report": {"score": i}, "optimized_resume": "内容" * 400, "fallback": False},
+        )
+        expect(ok and history_id, f"create_resume_history 第 {i + 1} 条")
+        ids.append(history_id)
+
+    page, cursor = await db.list_resume_history(user_id, limit=2)
+    expect(len(page) == 2 and cursor is not None and "ai_analysis" not in page[0], "list_resume_history 第一页")
+    rest, cursor = await db.list_resume_history(user_id, limit=2, cursor=cursor)
+    expect(len(rest) == 1 and cursor is None, "list_resume_history 第二页")
+    expect(sorted(h["id"] for h in page + rest) == sorted(ids), "分页结果不重不漏")
+
+    history = await db.get_resume_history_by_user_id(user_id)
+    expect(len(history) == 3, "get_resume_history_by_user_id 返回全部记录")
+    record = await db.get_resume_history_by_id(ids[0], user_id)
+    expect(record is not None and json.loads(record["ai_analysis"])["diagnosis_report"]["score"] == 0,
+           "get_resume_history_by_id 还原 ai_analysis")
+    expect(await db.get_resume_history_by_id(ids[0], user_id + 1_000_000) is None, "不能读取其他用户的记录")
+
+
+def cleanup(username: str):
+    """删除测试用户及其历史记录（用同步连接，与后端无关）"""
+    db_config.flush_user_counters()
+    with db_config.db_cursor() as (conn, cursor):
+        cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("DELETE FROM resume_history WHERE user_id = %s", (row["id"],))
+        cursor.execute("DELETE FROM users WHERE username = %s", (username,))
+        conn.commit()
+    db_config.user_cache.invalidate(username)
+
+
+async def run_backend(name: str) -> bool:
+    username = f"dbtest_{name}_{uuid.uuid4().hex[:8]}"
+    print(f"\n[{name}] 测试用户: {username}")
+    db = db_backend.get_async_db(name)
+    try:
+        await run_checks(db, username)
+        return True
+    except CheckFailed as e:
+        print(f"  ❌ {e}")
+        return False
+    finally:
+        if name == "async":
+            await db.close_async_pool()
+        cleanup(username)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库后端一致性测试")
+    parser.add_argument("--backend", choices=("both",) + db_backend.DB_BACKENDS, default="both")
+    args = parser.parse_args()
+
+    names = list(db_backend.DB_BACKENDS) if args.backend == "both" else [args.backend]
+    print("=" * 60)
+    print(f"数据库后端一致性测试：{', '.join(names)}")
+    print("=" * 60)
+
+    results = {}
+    for name in names:
+        try:
+            results[name] = asyncio.run(run_backend(name))
+        except RuntimeError as e:
+            # 未安装 aiomysql
+            if args.backend == "both" and name == "async":
+                print(f"\n[{name}] ⚠️ 跳过：{e}")
+                continue
+            raise
+
+    print("\n" + "=" * 60)
+    for name, passed in results.items():
+        print(f"  {name}: {'✅ 通过' if passed else '❌ 失败'}")
+    db_config.close_user_counters()
+    db_config.close_db_pool()
+    return bool(results) and all(results.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
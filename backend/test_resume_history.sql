@@ -16,7 +16,8 @@ CREATE TABLE IF NOT EXISTS `resume_history` (
   `ai_analysis` TEXT NOT NULL COMMENT 'AI分析结果（JSON格式）',
   `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   INDEX `idx_user_id` (`user_id`),
-  INDEX `idx_created_at` (`created_at`)
+  INDEX `idx_created_at` (`created_at`),
+  INDEX `idx_user_created` (`user_id`, `created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='简历历史记录表';
 
 -- 4. 测试插入一条记录（使用用户 alice 的 ID，通常是 1）
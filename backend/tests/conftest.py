@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+后端回归测试的公共夹具
+
+main.py 导入时会在当前目录下创建 static/、uploads/ 等目录，这里先切换到临时目录再导入，
+不启动 startup 事件，也不会连接数据库或调用 DeepSeek
+
+数据库相关测试使用 fake_mysql（sqlite_mysql 模拟的 MySQL）。db_config / db_async 按顶层模块导入，
+与 backend 目录下的脚本（test_db_backends.py 等）共用同一份模块实例
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    from fastapi.testclient import TestClient
+
+    os.environ.setdefault("DEEPSEEK_API_KEY", "test")
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        from backend import main
+    finally:
+        os.chdir(cwd)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def fake_mysql(monkeypatch):
+    import db_async
+    import db_config
+    from .sqlite_mysql import SqliteMySQL
+
+    for name in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME"):
+        monkeypatch.setenv(name, "test")
+    fake = SqliteMySQL()
+    db_config.close_db_pool()
+    monkeypatch.setattr(db_config, "_open_raw_connection", fake.connect)
+    monkeypatch.setattr(db_async, "aiomysql", fake.aiomysql_module())
+    db_config.db_breaker.record_success()
+    db_config.user_cache.clear()
+    yield fake
+    fake.down = False
+    db_config.db_breaker.record_success()
+    db_config.flush_user_counters()
+    db_config.close_db_pool()
+    db_config.user_cache.clear()
+    asyncio.run(db_async.close_async_pool())
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+用内存 SQLite 模拟 MySQL，供数据库后端测试使用（无需 MySQL 服务和 aiomysql）
+
+- SqliteMySQL.connect()：替换 db_config._open_raw_connection，返回行为类似 pymysql 连接的对象，
+  同步后端仍走真实的连接池、熔断器和会话初始化
+- SqliteMySQL.aiomysql_module()：与 db_async 用到的 aiomysql 接口一致的模块对象
+  （create_pool / DictCursor / OperationalError / MySQLError），连接池记录借出与关闭情况
+
+SQL 转换只覆盖本项目用到的写法：%s 占位符、NOW()、GREATEST()，SET 会话语句直接忽略
+"""
+import sqlite3
+import threading
+import types
+
+import pymysql
+
+SCHEMA = [
+    """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT, grade TEXT, target_role TEXT,
+        email TEXT, phone TEXT, city TEXT, avatar TEXT,
+        createTaskNum INTEGER DEFAULT 0, uploadedResumeNum INTEGER DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE resume_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL, resume_type TEXT, resume_file_url TEXT,
+        ai_analysis TEXT, created_at TIMESTAMP
+    )
+    """,
+]
+
+
+def _translate(sql: str) -> str:
+    return sql.replace("%s", "?").replace("NOW()", "CURRENT_TIMESTAMP").replace("GREATEST(", "MAX(")
+
+
+class SqliteMySQL:
+    """一个共享的内存数据库；down=True 时新建连接和 ping 都抛出 OperationalError（模拟数据库宕机）"""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None,
+                                  detect_types=sqlite3.PARSE_DECLTYPES)
+        self.db.row_factory = sqlite3.Row
+        for ddl in SCHEMA:
+            self.db.execute(ddl)
+        self.lock = threading.RLock()
+        self.down = False
+        self.dials = 0
+        self.statements = []
+
+    def _check_up(self):
+        if self.down:
+            raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server (模拟宕机)")
+
+    def execute(self, sql: str, params=()):
+        """执行一条 SQL，返回 (行列表, rowcount, lastrowid)"""
+        self._check_up()
+        self.statements.append(sql.strip().split()[0].upper())
+        if sql.lstrip().upper().startswith("SET "):
+            return [], 0, 0
+        with self.lock:
+            cur = self.db.execute(_translate(sql), list(params or ()))
+            rows = [dict(row) for row in cur.fetchall()] if cur.description else []
+            return rows, cur.rowcount, cur.lastrowid
+
+    # ---------- 同步：pymysql 风格的连接 ----------
+    def connect(self):
+        self.dials += 1
+        self._check_up()
+        return _SyncConnection(self)
+
+    # ---------- 异步：aiomysql 风格的模块 ----------
+    def aiomysql_module(self):
+        backend = self
+        module = types.ModuleType("aiomysql")
+        module.DictCursor = object
+        module.OperationalError = pymysql.err.OperationalError
+        module.MySQLError = pymysql.err.MySQLError
+        module.pools = []
+
+        async def create_pool(minsize=1, maxsize=10, pool_recycle=-1, **kwargs):
+            pool = _AsyncPool(backend, maxsize, kwargs)
+            module.pools.append(pool)
+            return pool
+
+        module.create_pool = create_pool
+        return module
+
+
+class _SyncCursor:
+    def __init__(self, backend: SqliteMySQL):
+        self._backend = backend
+        self._rows = []
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def execute(self, sql, params=()):
+        self._rows, self.rowcount, self.lastrowid = self._backend.execute(sql, params)
+        return self.rowcount
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class _SyncConnection:
+    def __init__(self, backend: SqliteMySQL):
+        self._backend = backend
+        self.open = True
+
+    def cursor(self):
+        return _SyncCursor(self._backend)
+
+    def ping(self, reconnect=False):
+        self._backend._check_up()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+class _AsyncCursor(_SyncCursor):
+    async def execute(self, sql, params=()):
+        return _SyncCursor.execute(self, sql, params)
+
+    async def fetchone(self):
+        return _SyncCursor.fetchone(self)
+
+    async def fetchall(self):
+        return _SyncCursor.fetchall(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _AsyncConnection:
+    def __init__(self, backend: SqliteMySQL):
+        self._backend = backend
+        self.closed = False
+
+    def cursor(self, cursor_class=None):
+        return _AsyncCursor(self._backend)
+
+    async def ping(self, reconnect=True):
+        self._backend._check_up()
+
+    def close(self):
+        self.closed = True
+
+
+class _AsyncPool:
+    """与 aiomysql.Pool 相同的借还语义：release 不是协程，已关闭的连接归还后不再复用"""
+
+    def __init__(self, backend: SqliteMySQL, maxsize: int, kwargs: dict):
+        self._backend = backend
+        self.minsize = 1
+        self.maxsize = maxsize
+        self.kwargs = kwargs
+        self.free = []
+        self.used = set()
+        self.closed = False
+
+    async def acquire(self):
+        self._backend._check_up()
+        if self.free:
+            conn = self.free.pop()
+        else:
+            self._backend.dials += 1
+            conn = _AsyncConnection(self._backend)
+        self.used.add(conn)
+        return conn
+
+    def release(self, conn):
+        self.used.discard(conn)
+        if not conn.closed and not self.closed:
+            self.free.append(conn)
+
+    def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.closed = True
+        for conn in list(self.used):
+            conn.close()
+        self.used.clear()
+
+    async def wait_closed(self):
+        for conn in self.free:
+            conn.close()
+        self.free.clear()
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""/api/analyze_resume 与 /api/analyze_resume/stream 的参数校验"""
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/analyze_resume", "/api/analyze_resume/stream"])
+def test_missing_file_and_text_returns_400(client, path):
+    resp = client.post(path, data={"username": "alice"})
+    assert resp.status_code == 400
+    assert resp.json() == {"success": False, "error": "请提供简历文件（resume_file）或简历文本（resume_text）"}
+
+
+@pytest.mark.parametrize("path", ["/api/analyze_resume", "/api/analyze_resume/stream"])
+def test_blank_text_returns_400(client, path):
+    resp = client.post(path, data={"resume_text": "   "})
+    assert resp.status_code == 400
+    assert resp.json()["success"] is False
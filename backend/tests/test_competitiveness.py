@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""/api/analyze_competitiveness 的量化、降级路径与 llm_meta"""
+import asyncio
+import uuid
+
+from backend import main
+
+
+def _fields():
+    # 带随机后缀，避免命中本地规则和量化缓存
+    tag = uuid.uuid4().hex[:6]
+    return {key: f"说不清楚 {tag}" for key, _ in main.COMPETITIVENESS_DIMENSIONS}
+
+
+def _failing_json(calls):
+    async def fake(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError("DeepSeek 不可用")
+    return fake
+
+
+def test_failed_dimensions_not_requantized(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "_adeepseek_json", _failing_json(calls))
+    items = {key: (value, name) for (key, name), value in zip(main.COMPETITIVENESS_DIMENSIONS, _fields().values())}
+    memo = {}
+
+    async def scenario():
+        first = await main._quantize_scores_batch(items, memo=memo)
+        second = await main._quantize_scores_batch(items, memo=memo)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {key: 50 for key in items}
+    assert len(calls) == 1
+
+
+def test_report_failure_reuses_quantized_scores(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "_adeepseek_json", _failing_json(calls))
+
+    async def failing_markdown(*args, **kwargs):
+        raise RuntimeError("报告生成失败")
+
+    monkeypatch.setattr(main, "_adeepseek_markdown", failing_markdown)
+    body = client.post("/api/analyze_competitiveness", json=_fields()).json()
+    assert body["fallback"] is True
+    assert set(body["quantized_scores"].values()) == {50}
+    assert len(calls) == 1
+
+
+def test_llm_meta_scoped_to_each_api_request(client, monkeypatch):
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    assert not any(issubclass(m.cls, BaseHTTPMiddleware) for m in main.app.user_middleware)
+
+    async def fake_json(*args, **kwargs):
+        main.record_llm_call("quantize", None, 1.0)
+        return {"scores": {}}
+
+    async def fake_markdown(*args, **kwargs):
+        main.record_llm_call("competitiveness", None, 1.0)
+        return "## 报告"
+
+    monkeypatch.setattr(main, "_adeepseek_json", fake_json)
+    monkeypatch.setattr(main, "_adeepseek_markdown", fake_markdown)
+    for _ in range(2):
+        body = client.post("/api/analyze_competitiveness", json=_fields()).json()
+        assert body["fallback"] is False
+        assert body["llm_meta"]["calls"] == 2
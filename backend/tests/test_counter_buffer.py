@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""CounterBuffer 写回期间的读取：不等待慢的 UPDATE，叠加后的计数不重复也不遗漏"""
+import threading
+
+from backend.counter_buffer import CounterBuffer
+
+KEY = ("alice", "createTaskNum")
+
+
+class SlowTable:
+    """模拟一张表：UPDATE 阶段可以被卡住，COMMIT 之后其他连接才看得到新值"""
+
+    def __init__(self):
+        self.committed = 0
+        self.updating = threading.Event()
+        self.release_update = threading.Event()
+
+    def flush(self, deltas, begin_commit):
+        self.updating.set()
+        self.release_update.wait(5)
+        begin_commit()
+        self.committed += deltas[KEY]
+
+    def read(self):
+        return self.committed
+
+
+def _buffer(table):
+    return CounterBuffer(table.flush, interval=3600)
+
+
+def test_read_does_not_wait_for_slow_update():
+    table = SlowTable()
+    buffer = _buffer(table)
+    buffer.add(*KEY, 3)
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    try:
+        assert table.updating.wait(5)
+        done = threading.Event()
+        results = []
+
+        def reader():
+            results.append(buffer.consistent_read(table.read))
+            done.set()
+
+        threading.Thread(target=reader).start()
+        assert done.wait(1), "读取被正在执行的 UPDATE 阻塞"
+        value, pending = results[0]
+        assert value + pending[KEY] == 3
+    finally:
+        table.release_update.set()
+        flusher.join(5)
+    value, pending = buffer.consistent_read(table.read)
+    assert value == 3 and pending == {}
+
+
+def test_read_overlapping_commit_is_retried():
+    table = SlowTable()
+    table.release_update.set()
+    buffer = _buffer(table)
+    buffer.add(*KEY, 2)
+    loads = []
+
+    def loader():
+        # 第一次读取期间恰好发生了提交
+        if not loads:
+            buffer.flush()
+        loads.append(table.read())
+        return loads[-1]
+
+    value, pending = buffer.consistent_read(loader)
+    assert len(loads) == 2
+    assert value + pending.get(KEY, 0) == 2
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+sync / async 两种数据库后端跑同一组检查（backend/test_db_backends.py 中的 run_checks）
+
+数据库用 sqlite_mysql 模拟：同步后端走真实的连接池、熔断器和会话初始化，
+异步后端的 aiomysql 替换为同一个内存数据库上的模拟实现。对真实 MySQL 运行请直接执行
+python test_db_backends.py（见该脚本说明）
+"""
+import asyncio
+import uuid
+
+import pytest
+
+# conftest 已把 backend 目录加入 sys.path（按顶层模块导入，与脚本共用同一份 db_config）
+import db_async
+import db_backend
+import db_config
+import test_db_backends as suite
+
+
+@pytest.mark.parametrize("backend", db_backend.DB_BACKENDS)
+def test_same_checks_pass_on_both_backends(fake_mysql, backend):
+    username = f"dbtest_{backend}_{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        db = db_backend.get_async_db(backend)
+        try:
+            await suite.run_checks(db, username)
+        finally:
+            if backend == "async":
+                await db.close_async_pool()
+
+    asyncio.run(scenario())
+    suite.cleanup(username)
+    rows, _, _ = fake_mysql.execute("SELECT COUNT(*) AS n FROM users WHERE username = %s", (username,))
+    assert rows[0]["n"] == 0
+
+
+def test_async_pool_uses_session_settings(fake_mysql):
+    async def scenario():
+        return await db_async.get_async_pool()
+
+    pool = asyncio.run(scenario())
+    assert pool.kwargs["autocommit"] is True
+    assert pool.kwargs["init_command"] == db_config.build_session_init_sql()
+
+
+def test_async_pool_closed_when_event_loop_changes(fake_mysql):
+    async def borrow_and_keep():
+        # 模拟旧事件循环结束时仍有连接借出未归还
+        pool = await db_async.get_async_pool()
+        conn = await pool.acquire()
+        return pool, conn
+
+    old_pool, old_conn = asyncio.run(borrow_and_keep())
+    new_pool = asyncio.run(db_async.get_async_pool())
+    assert new_pool is not old_pool
+    assert old_pool.closed and old_conn.closed and not old_pool.used
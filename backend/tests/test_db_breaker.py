@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""数据库熔断器：同步/异步借连接时的失败计数、探测和连接回收，以及 /health 的探测缓存"""
+import asyncio
+import threading
+import time
+
+import pymysql
+import pytest
+
+import db_async
+import db_config
+from circuit_breaker import CLOSED, OPEN
+
+from .sqlite_mysql import _AsyncConnection
+
+
+async def _borrow():
+    async with db_async.db_cursor() as (conn, cursor):
+        await cursor.execute("SELECT 1 AS one")
+        return await cursor.fetchone()
+
+
+async def _try_borrow():
+    try:
+        await _borrow()
+    except Exception as e:
+        return e
+    return None
+
+
+@pytest.fixture
+def breaker(fake_mysql, monkeypatch):
+    monkeypatch.setattr(db_config.db_breaker, "failure_threshold", 2)
+    monkeypatch.setattr(db_config.db_breaker, "reset_timeout", 0)
+    return db_config.db_breaker
+
+
+def test_async_success_resets_failure_count(fake_mysql, breaker):
+    async def scenario():
+        fake_mysql.down = True
+        assert isinstance(await _try_borrow(), pymysql.err.OperationalError)
+        fake_mysql.down = False
+        assert await _borrow() == {"one": 1}
+        assert breaker.stats()["consecutive_failures"] == 0
+        fake_mysql.down = True
+        await _try_borrow()
+        fake_mysql.down = False
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.parametrize("error", [asyncio.TimeoutError(), ConnectionRefusedError("refused")])
+def test_async_timeout_and_oserror_open_the_breaker(fake_mysql, breaker, monkeypatch, error):
+    async def scenario():
+        pool = await db_async.get_async_pool()
+
+        async def failing_acquire():
+            raise error
+
+        monkeypatch.setattr(pool, "acquire", failing_acquire)
+        await _try_borrow()
+        await _try_borrow()
+
+    monkeypatch.setattr(breaker, "reset_timeout", 60)
+    asyncio.run(scenario())
+    assert breaker.state == OPEN
+    assert isinstance(asyncio.run(_try_borrow()), db_config.DatabaseUnavailableError)
+
+
+def test_async_failed_probe_closes_connection(fake_mysql, breaker, monkeypatch):
+    async def scenario():
+        await _borrow()  # 连接池里留下一条空闲连接
+        pool = await db_async.get_async_pool()
+        idle = pool.free[0]
+        breaker.record_failure(RuntimeError("x"))
+        breaker.record_failure(RuntimeError("x"))
+
+        async def dead_ping(self, reconnect=True):
+            raise pymysql.err.OperationalError(2013, "Lost connection")
+
+        monkeypatch.setattr(_AsyncConnection, "ping", dead_ping)
+        error = await _try_borrow()
+        return pool, idle, error
+
+    pool, idle, error = asyncio.run(scenario())
+    assert isinstance(error, pymysql.err.OperationalError)
+    assert idle.closed and idle not in pool.free and not pool.used
+    assert breaker.state == OPEN
+
+
+def test_async_connection_released_on_other_errors(fake_mysql, breaker, monkeypatch):
+    def broken_cursor(self, cursor_class=None):
+        raise RuntimeError("cursor failed")
+
+    async def scenario():
+        pool = await db_async.get_async_pool()
+        monkeypatch.setattr(_AsyncConnection, "cursor", broken_cursor)
+        error = await _try_borrow()
+        return pool, error
+
+    pool, error = asyncio.run(scenario())
+    assert isinstance(error, RuntimeError)
+    assert not pool.used and len(pool.free) == 1
+    assert breaker.state == CLOSED
+
+
+def test_sync_fails_fast_while_open(fake_mysql, breaker, monkeypatch):
+    monkeypatch.setattr(breaker, "reset_timeout", 60)
+    fake_mysql.down = True
+    for _ in range(2):
+        with pytest.raises(pymysql.err.OperationalError):
+            db_config.get_db_cursor()
+    dials = fake_mysql.dials
+    with pytest.raises(db_config.DatabaseUnavailableError):
+        db_config.get_db_cursor()
+    assert fake_mysql.dials == dials
+    assert breaker.state == OPEN
+
+
+def test_health_callers_wait_for_first_probe(fake_mysql, monkeypatch):
+    monkeypatch.setattr(db_config, "_health_state", {"db_ok": None, "db_error": None, "checked_at": 0.0})
+    release = threading.Event()
+    real_get_db_cursor = db_config.get_db_cursor
+
+    def slow_get_db_cursor(*args, **kwargs):
+        release.wait(5)
+        return real_get_db_cursor(*args, **kwargs)
+
+    monkeypatch.setattr(db_config, "get_db_cursor", slow_get_db_cursor)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(db_config.check_db_health())) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)  # 让其余调用方在第一次探测进行中到达
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert [r["db_ok"] for r in results] == [True, True, True]
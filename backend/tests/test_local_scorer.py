@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""本地规则量化（local_scorer + data/score_rules.json）的命中与误判"""
+import pytest
+
+from backend import main
+from backend.local_scorer import LocalScorer
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return LocalScorer.from_file()
+
+
+@pytest.mark.parametrize("value, dimension, score", [
+    ("GPA 3.8/4.0", "gpa", 95),
+    ("排名前10%", "gpa", 88),
+    ("六级560", "english", 87),
+    ("雅思7", "english", 85),
+    ("省一", "competition", 80),
+    ("班长", "leader", 76),
+])
+def test_common_inputs_scored_locally(scorer, value, dimension, score):
+    result = scorer.lookup(value, dimension)
+    assert result is not None and result.score == score
+
+
+@pytest.mark.parametrize("value, dimension", [
+    ("参与", "leader"),
+    ("项目组成员", "leader"),
+])
+def test_weak_keywords_left_to_llm(scorer, value, dimension):
+    assert scorer.lookup(value, dimension) is None
+
+
+def test_science_is_not_an_sci_paper(scorer):
+    results = scorer.score_text("本科 Computer Science 专业，GPA 3.6/4.0")
+    assert "english" not in results
+    assert scorer.score("发表 SCI 论文", "english").rules == ["english_paper"]
+
+
+def test_no_english_certificate_takes_precedence(scorer):
+    result = scorer.score_text("Computer Science 专业，一作 SCI 论文一篇，没有英语证书")["english"]
+    assert result.score == 25 and result.rules == ["english_none_text"]
+
+
+def test_free_text_keywords_discounted_by_clause_coverage(scorer):
+    results = scorer.score_text("参与过字节实习")
+    assert not scorer.is_confident(results["leader"])
+    assert not scorer.is_confident(results["intern"])
+    results = scorer.score_text("GPA 3.8/4.0，六级560，字节实习3个月，省一，班长")
+    assert all(scorer.is_confident(r) for r in results.values())
+    assert scorer.can_override(results["english"])
+
+
+def test_llm_answer_kept_unless_high_specificity_rule(client, monkeypatch):
+    llm_scores = {"gpa": 60, "project": 61, "intern": 62, "competition": 63, "english": 64, "leader": 65}
+    monkeypatch.setattr(main, "_deepseek_json", lambda *args, **kwargs: {"scores": llm_scores})
+    resp = client.post("/api/analyze_natural_language", json={"text": "计算机专业，六级560，参与过实验室项目"})
+    body = resp.json()
+    assert body["scores"]["english"] == 87
+    assert body["scores"]["leader"] == 65
+    assert body["local_dimensions"] == ["english"]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""UploadLog 写入/覆盖/删除"""
+from backend.upload_log import UploadLog
+
+
+def _record(task_id, report="r"):
+    return {"task_id": task_id, "username": "alice", "filename": "a.pdf", "report": report, "score": "80", "date": ""}
+
+
+def test_put_reports_new_vs_replaced(tmp_path):
+    log = UploadLog(str(tmp_path))
+    assert log.put(_record("t1")) is True
+    assert log.put(_record("t1", report="r2")) is False
+    assert log.put(_record("t2")) is True
+    assert log.count() == 2
+    assert log.delete("alice", "t1") is True
+    assert log.put(_record("t1")) is True
+    log.close()
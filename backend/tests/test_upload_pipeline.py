@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""spool_upload 落盘、摘要与大小上限"""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from backend.upload_pipeline import UploadError, spool_upload
+
+
+def _upload(data: bytes):
+    return UploadFile(io.BytesIO(data), filename="resume.pdf")
+
+
+def test_spooled_file_and_digest(tmp_path, monkeypatch):
+    data = os.urandom(200 * 1024)
+    loop_thread = threading.get_ident()
+    writers = set()
+    real_open = open
+
+    class Recorder:
+        def __init__(self, *args, **kwargs):
+            self._f = real_open(*args, **kwargs)
+
+        def write(self, chunk):
+            writers.add(threading.get_ident())
+            return self._f.write(chunk)
+
+        def close(self):
+            self._f.close()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.close()
+
+    monkeypatch.setattr("builtins.open", Recorder)
+    saved = asyncio.run(spool_upload(_upload(data), str(tmp_path), "a.pdf", max_bytes=1024 * 1024))
+    monkeypatch.undo()
+    assert saved.size == len(data) and saved.sha256 == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "a.pdf").read_bytes() == data
+    assert writers and loop_thread not in writers
+
+
+def test_oversized_upload_rejected_and_removed(tmp_path):
+    with pytest.raises(UploadError) as exc:
+        asyncio.run(spool_upload(_upload(b"x" * 5000), str(tmp_path), "big.pdf", max_bytes=4096, chunk_size=1024))
+    assert exc.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
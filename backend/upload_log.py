@@ -0,0 +1,511 @@
+# -*- coding: utf-8 -*-
+"""
+已上传简历报告存储（追加写日志 + 内存索引）
+原先的 data/uploaded_resumes.csv 每次列表都要解析全部行（包括每条完整的 Markdown 报告），
+删除一条记录也要整表重写。这里改为按段切分的追加写日志：
+- 写入/删除都只在当前段末尾追加一行：删除写入墓碑记录，不改动已有数据
+- 内存索引 (username, task_id) -> 元数据 + 报告所在的段和偏移量，列表只读内存中的元数据，
+  报告正文在需要时按偏移量从磁盘读取
+- 每行格式为 "元数据 JSON\\t报告 JSON\\n"，重启重建索引时只解析元数据部分
+- 废弃数据（被删除/覆盖的记录、墓碑）占比过高时，由后台线程把已封存的段压缩成一个新段，不阻塞请求
+- 按写入序号 seq 维护有序索引（全局 + 按用户），分页以 seq 作为游标，翻到第 N 页只需二分定位，不扫描前面的记录
+
+同一 (username, task_id) 重复上传时以最后一次为准。本模块不依赖 FastAPI
+"""
+import os
+import csv
+import json
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".log"
+# 从旧 CSV 导入过的标记文件，避免日志被清空后重复导入
+MIGRATED_MARKER = ".migrated_from_csv"
+
+# 列表返回的元数据字段（不含报告正文）
+META_FIELDS = ["task_id", "username", "filename", "score", "date"]
+
+Key = Tuple[str, str]
+
+
+@dataclass
+class _Entry:
+    """索引条目：元数据 + 记录在日志中的位置"""
+    meta: Dict
+    seq: int
+    segment: int
+    offset: int      # 整行在段文件中的起始偏移
+    length: int      # 整行字节数（含换行符）
+    report_at: int   # 报告 JSON 相对行首的偏移
+
+
+class _SeqIndex:
+    """
+    按 seq 递增排列的有序列表，支持 "取小于游标的最新 N 条"
+
+    seq 单调递增，新记录直接追加到末尾；删除/覆盖只从 live 集合移除，列表中的旧 seq 延迟清理，
+    失效的 seq 多于有效的 seq 时整体重建，保证遍历时跳过的失效项不会无限增长
+    """
+
+    def __init__(self):
+        self._seqs: List[int] = []
+        self._live = set()
+
+    def add(self, seq: int):
+        self._seqs.append(seq)
+        self._live.add(seq)
+
+    def discard(self, seq: int):
+        self._live.discard(seq)
+        if len(self._seqs) > 64 and len(self._seqs) > 2 * len(self._live):
+            self._seqs = [s for s in self._seqs if s in self._live]
+
+    def iter_before(self, cursor: Optional[int] = None):
+        """从新到旧遍历 seq < cursor 的有效 seq（cursor 为空时从最新一条开始）"""
+        end = len(self._seqs) if cursor is None else bisect.bisect_left(self._seqs, cursor)
+        for i in range(end - 1, -1, -1):
+            seq = self._seqs[i]
+            if seq in self._live:
+                yield seq
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+
+def _in_date_range(date, date_from: Optional[str], date_to: Optional[str]) -> bool:
+    """date 为 "YYYY-MM-DD HH:MM:SS" 字符串；date_to 只给到日期时包含当天"""
+    date = str(date or "")
+    if date_from and date < date_from:
+        return False
+    if date_to and date[:len(date_to)] > date_to:
+        return False
+    return True
+
+
+def _segment_name(segment_id: int) -> str:
+    return f"{SEGMENT_PREFIX}{segment_id:06d}{SEGMENT_SUFFIX}"
+
+
+def _encode_put(meta: Dict, report: str) -> Tuple[bytes, int]:
+    head = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    body = json.dumps(report or "", ensure_ascii=False).encode("utf-8")
+    return head + b"\t" + body + b"\n", len(head) + 1
+
+
+def _encode_delete(seq: int, key: Key) -> bytes:
+    record = {"op": "del", "seq": seq, "username": key[0], "task_id": key[1]}
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class UploadLog:
+    """
+    追加写日志存储
+
+    - segment_max_bytes: 单个段的大小上限，写满后封存并开启新段
+    - compact_ratio / compact_min_bytes: 废弃字节占比和绝对量都超过阈值时触发后台压缩
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 4 * 1024 * 1024,
+                 compact_ratio: float = 0.5, compact_min_bytes: int = 1024 * 1024):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._index: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._by_seq: Dict[int, Key] = {}
+        self._order = _SeqIndex()
+        self._user_order: Dict[str, _SeqIndex] = {}
+        self._seq = 0
+        self._segments: Dict[int, int] = {}   # 段 id -> 文件大小
+        self._live_bytes = 0
+        self._active_id = 0
+        self._active_file = None
+        self._compactions = 0
+        self._compact_thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # ---------- 启动：重放日志重建索引 ----------
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, _segment_name(segment_id))
+
+    def _list_segments(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    ids.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(ids)
+
+    def _load(self):
+        # 每个 key 以 seq 最大的记录为准（压缩生成的新段 id 可能大于仍在写入的段，不能按段顺序覆盖）
+        latest: Dict[Key, Tuple[int, Optional[_Entry]]] = {}
+        for segment_id in self._list_segments():
+            path = self._segment_path(segment_id)
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    length = len(line)
+                    if not line.endswith(b"\n"):
+                        # 写入中途崩溃留下的半行：截掉，后续追加从完整行之后开始
+                        print(f"⚠️ [upload_log] {path} 末尾有不完整记录，已丢弃 {length} 字节")
+                        f.close()
+                        os.truncate(path, offset)
+                        break
+                    head, sep, _ = line.partition(b"\t")
+                    try:
+                        record = json.loads(head)
+                    except ValueError:
+                        print(f"⚠️ [upload_log] {path} 偏移 {offset} 处记录损坏，已跳过")
+                        offset += length
+                        continue
+                    seq = int(record.get("seq", 0))
+                    key = (str(record.get("username", "")), str(record.get("task_id", "")))
+                    self._seq = max(self._seq, seq)
+                    if seq >= latest.get(key, (-1, None))[0]:
+                        if record.get("op") == "del" or not sep:
+                            latest[key] = (seq, None)
+                        else:
+                            meta = {field: record.get(field) for field in META_FIELDS}
+                            latest[key] = (seq, _Entry(meta, seq, segment_id, offset, length, len(head) + 1))
+                    offset += length
+            self._segments[segment_id] = os.path.getsize(path)
+
+        live = sorted((entry for _, entry in latest.values() if entry is not None), key=lambda e: e.seq)
+        for entry in live:
+            self._link(entry)
+        self._open_active(max(self._segments) if self._segments else 1)
+
+    def _open_active(self, segment_id: int):
+        if self._active_file is not None:
+            self._active_file.close()
+        self._active_id = segment_id
+        self._active_file = open(self._segment_path(segment_id), "ab")
+        self._segments.setdefault(segment_id, self._active_file.tell())
+
+    def _link(self, entry: _Entry):
+        """把条目加入主索引和 seq 有序索引（需持有锁）"""
+        key = (entry.meta["username"], entry.meta["task_id"])
+        self._index[key] = entry
+        self._by_seq[entry.seq] = key
+        self._order.add(entry.seq)
+        self._user_order.setdefault(key[0], _SeqIndex()).add(entry.seq)
+        self._live_bytes += entry.length
+
+    def _unlink(self, key: Key) -> Optional[_Entry]:
+        """从所有索引中移除条目（需持有锁）"""
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return None
+        self._by_seq.pop(entry.seq, None)
+        self._order.discard(entry.seq)
+        user_index = self._user_order.get(key[0])
+        if user_index is not None:
+            user_index.discard(entry.seq)
+            if not len(user_index):
+                del self._user_order[key[0]]
+        self._live_bytes -= entry.length
+        return entry
+
+    def _roll(self):
+        """封存当前段并开启新段（需持有锁）"""
+        self._open_active(max(self._segments) + 1)
+
+    # ---------- 写入 ----------
+    def _append(self, data: bytes) -> int:
+        """在当前段末尾追加一行，返回该行的起始偏移（需持有锁）"""
+        if self._segments[self._active_id] and self._segments[self._active_id] + len(data) > self.segment_max_bytes:
+            self._roll()
+        offset = self._segments[self._active_id]
+        self._active_file.write(data)
+        self._active_file.flush()
+        self._segments[self._active_id] = offset + len(data)
+        return offset
+
+    def put(self, record: Dict) -> bool:
+        """
+        写入一条上传记录（record 包含 META_FIELDS 和 report）；同一 (username, task_id) 覆盖旧记录
+
+        返回是否为新记录（覆盖已有记录时返回 False，调用方据此决定是否累加上传计数）
+        """
+        key = (str(record["username"]), str(record["task_id"]))
+        with self._lock:
+            self._seq += 1
+            meta = {field: record.get(field) for field in META_FIELDS}
+            meta["username"], meta["task_id"] = key
+            data, report_at = _encode_put(dict(meta, seq=self._seq), record.get("report") or "")
+            offset = self._append(data)
+            replaced = self._unlink(key) is not None
+            self._link(_Entry(meta, self._seq, self._active_id, offset, len(data), report_at))
+        self._maybe_compact()
+        return not replaced
+
+    def put_many(self, records: Iterable[Dict]) -> int:
+        count = 0
+        for record in records:
+            if record.get("username") is not None and record.get("task_id") is not None:
+                self.put(record)
+                count += 1
+        return count
+
+    def delete(self, username: str, task_id: str) -> bool:
+        """写入墓碑记录删除一条上传记录；不存在返回 False"""
+        key = (username, task_id)
+        with self._lock:
+            if key not in self._index:
+                return False
+            self._seq += 1
+            self._append(_encode_delete(self._seq, key))
+            self._unlink(key)
+        self._maybe_compact()
+        return True
+
+    # ---------- 读取 ----------
+    def get_meta(self, username: str, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._index.get((username, task_id))
+            return dict(entry.meta) if entry is not None else None
+
+    def list_meta(self, newest_first: bool = True) -> List[Dict]:
+        """返回所有记录的元数据（不读磁盘，不含报告正文）"""
+        with self._lock:
+            entries = list(self._index.values())
+        if newest_first:
+            entries.reverse()
+        return [dict(e.meta) for e in entries]
+
+    def query(self, cursor: Optional[int] = None, limit: int = 50, username: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+        """
+        按时间倒序分页查询元数据，返回 (本页记录, 下一页游标)；没有下一页时游标为 None
+
+        - cursor: 上一页返回的游标（即上一页最后一条的 seq），从该位置之后继续
+        - username: 只看某个用户，走按用户的有序索引
+        - date_from / date_to: 按 date 字段过滤（字符串比较，如 "2026-01-01"），在遍历中判断
+        """
+        limit = max(int(limit), 1)
+        page: List[Dict] = []
+        with self._lock:
+            order = self._order if username is None else self._user_order.get(username)
+            if order is None:
+                return [], None
+            for seq in order.iter_before(cursor):
+                entry = self._index[self._by_seq[seq]]
+                if not _in_date_range(entry.meta.get("date"), date_from, date_to):
+                    continue
+                if len(page) == limit:
+                    # 已取满且后面还有符合条件的记录
+                    return page, page[-1]["seq"]
+                page.append(dict(entry.meta, seq=seq))
+        return page, None
+
+    def count(self, username: Optional[str] = None, date_from: Optional[str] = None,
+              date_to: Optional[str] = None) -> int:
+        """统计记录数；不按日期过滤时直接读索引大小"""
+        with self._lock:
+            if username is not None:
+                order = self._user_order.get(username)
+                if order is None:
+                    return 0
+                if not (date_from or date_to):
+                    return len(order)
+                entries = (self._index[self._by_seq[seq]] for seq in order.iter_before())
+            else:
+                if not (date_from or date_to):
+                    return len(self._index)
+                entries = self._index.values()
+            return sum(1 for e in entries if _in_date_range(e.meta.get("date"), date_from, date_to))
+
+    def load_report(self, username: str, task_id: str) -> Optional[str]:
+        """按偏移量读取报告正文；记录不存在返回 None"""
+        for _ in range(3):
+            with self._lock:
+                entry = self._index.get((username, task_id))
+                if entry is None:
+                    return None
+                path = self._segment_path(entry.segment)
+                offset, length, report_at = entry.offset, entry.length, entry.report_at
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset + report_at)
+                    return json.loads(f.read(length - report_at))
+            except FileNotFoundError:
+                # 读取期间所在段被压缩删除，索引已指向新位置，重试
+                continue
+        return None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    # ---------- 压缩 ----------
+    def _needs_compaction(self) -> bool:
+        total = sum(self._segments.values())
+        garbage = total - self._live_bytes
+        return garbage >= self.compact_min_bytes and total > 0 and garbage / total >= self.compact_ratio
+
+    def _maybe_compact(self):
+        """废弃数据超过阈值时在后台线程压缩，请求线程只做判断"""
+        with self._lock:
+            if not self._needs_compaction():
+                return
+            if self._compact_thread is not None and self._compact_thread.is_alive():
+                return
+            self._compact_thread = threading.Thread(target=self.compact, name="upload-log-compact", daemon=True)
+            self._compact_thread.start()
+
+    def compact(self) -> Dict:
+        """
+        把所有已封存的段压缩为一个新段：只保留仍有效的记录，丢弃被覆盖/删除的记录和墓碑
+
+        1. 持锁封存当前段，之后的写入都进入新的活动段
+        2. 不持锁复制有效记录到临时文件
+        3. 持锁把索引中仍指向旧位置的条目改为新位置，原子替换文件并删除旧段
+        """
+        with self._compact_lock:
+            started = time.time()
+            with self._lock:
+                self._roll()
+                sealed = sorted(sid for sid in self._segments if sid != self._active_id)
+                sealed_set = set(sealed)
+                snapshot = [(key, e.segment, e.offset, e.length) for key, e in self._index.items()
+                            if e.segment in sealed_set]
+                target_id = self._active_id + 1
+                # 预留 id，之后再封存活动段时跳过它
+                self._segments[target_id] = 0
+            before = sum(self._segments.get(sid, 0) for sid in sealed)
+
+            target_path = self._segment_path(target_id)
+            tmp_path = target_path + ".tmp"
+            moved: Dict[Key, Tuple[int, int, int]] = {}
+            handles = {}
+            try:
+                with open(tmp_path, "wb") as out:
+                    position = 0
+                    for key, segment_id, offset, length in snapshot:
+                        f = handles.get(segment_id)
+                        if f is None:
+                            f = handles[segment_id] = open(self._segment_path(segment_id), "rb")
+                        f.seek(offset)
+                        out.write(f.read(length))
+                        moved[key] = (segment_id, offset, position)
+                        position += length
+                    out.flush()
+                    os.fsync(out.fileno())
+            except Exception:
+                with self._lock:
+                    self._segments.pop(target_id, None)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            finally:
+                for f in handles.values():
+                    f.close()
+
+            with self._lock:
+                os.replace(tmp_path, target_path)
+                for key, (segment_id, offset, position) in moved.items():
+                    entry = self._index.get(key)
+                    # 压缩期间被覆盖或删除的条目不再指向旧位置，保持不变
+                    if entry is not None and entry.segment == segment_id and entry.offset == offset:
+                        entry.segment, entry.offset = target_id, position
+                self._segments[target_id] = os.path.getsize(target_path)
+                for sid in sealed:
+                    self._segments.pop(sid, None)
+                    try:
+                        os.remove(self._segment_path(sid))
+                    except FileNotFoundError:
+                        pass
+                self._compactions += 1
+                after = self._segments[target_id]
+            print(f"✅ [upload_log] 压缩完成：{len(sealed)} 个段 {before} 字节 → {after} 字节，"
+                  f"耗时 {(time.time() - started) * 1000:.0f}ms")
+            return {"segments": len(sealed), "before_bytes": before, "after_bytes": after}
+
+    # ---------- 迁移 ----------
+    def migrate_from_csv(self, csv_path: str) -> int:
+        """从旧的 uploaded_resumes.csv 一次性导入（按文件顺序，后出现的为新）"""
+        marker = os.path.join(self.directory, MIGRATED_MARKER)
+        if os.path.exists(marker) or not os.path.exists(csv_path):
+            return 0
+        with open(csv_path, "r", encoding="utf-8-sig") as f:
+            imported = self.put_many(csv.DictReader(f))
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write(f"{os.path.abspath(csv_path)} @ {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        print(f"✅ [upload_log] 已从 {csv_path} 导入 {imported} 条上传记录")
+        return imported
+
+    def is_fresh(self) -> bool:
+        """从未写入过任何记录（也没有从 CSV 导入过）"""
+        with self._lock:
+            return self._seq == 0 and not os.path.exists(os.path.join(self.directory, MIGRATED_MARKER))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self._segments.values())
+            return {
+                "records": len(self._index),
+                "segments": len(self._segments),
+                "bytes": total,
+                "live_bytes": self._live_bytes,
+                "garbage_ratio": round((total - self._live_bytes) / total, 4) if total else 0.0,
+                "compactions": self._compactions,
+            }
+
+    def close(self):
+        thread = self._compact_thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=10)
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.close()
+                self._active_file = None
+
+
+_log: Optional[UploadLog] = None
+_log_lock = threading.Lock()
+
+
+def get_upload_log() -> UploadLog:
+    """
+    获取全局上传记录存储（首次调用时创建，并从旧 CSV 自动导入）
+
+    - UPLOAD_LOG_DIR: 日志目录（默认 data/uploaded_resumes）
+    - UPLOAD_LOG_CSV_PATH: 旧 CSV 路径（默认 data/uploaded_resumes.csv）
+    - UPLOAD_LOG_SEGMENT_BYTES: 单个段的大小上限（默认4MB）
+    """
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                try:
+                    segment_bytes = int(os.getenv("UPLOAD_LOG_SEGMENT_BYTES", 4 * 1024 * 1024))
+                except ValueError:
+                    segment_bytes = 4 * 1024 * 1024
+                log = UploadLog(os.getenv("UPLOAD_LOG_DIR", os.path.join("data", "uploaded_resumes")),
+                                segment_max_bytes=segment_bytes)
+                try:
+                    log.migrate_from_csv(os.getenv("UPLOAD_LOG_CSV_PATH", os.path.join("data", "uploaded_resumes.csv")))
+                except Exception as e:
+                    print(f"⚠️ [upload_log] 旧 CSV 导入失败：{e}")
+                _log = log
+    return _log
+
+
+def close_upload_log():
+    global _log
+    with _log_lock:
+        log, _log = _log, None
+    if log is not None:
+        log.close()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+流式上传落盘
+把 UploadFile 按块复制到最终位置，复制的同时计算 SHA-256、检查大小上限，整个过程只读一遍：
+- 请求体此时已由 Starlette 解析 multipart 时暂存（小文件在内存，大文件在临时文件），
+  大小上限在复制阶段检查：超出时中止并删除已写入的部分，不会再把整个文件读进内存或写到最终目录
+- 磁盘写入在线程池中执行，不阻塞事件循环
+- 先写同目录下的临时文件，完成后原子替换为最终文件名，其他请求不会读到写了一半的文件
+- 返回的 sha256 可以直接作为解析缓存的键（见 extraction_service.extract_file），无需再读一遍文件
+"""
+import os
+import uuid
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+# 每次从上传流中读取的块大小
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """上传不合法；status_code 沿用接口层语义（400 格式错误，413 文件过大，500 落盘失败）"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message, status_code)
+        self.message = message
+        self.status_code = status_code
+
+    def __str__(self):
+        return self.message
+
+
+@dataclass
+class SpooledUpload:
+    """已落盘的上传文件"""
+    path: str
+    file_name: str      # 落盘后的文件名（不含目录）
+    original_name: str  # 客户端上传时的文件名
+    size: int
+    sha256: str
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+def check_extension(file_name: Optional[str], allowed_exts: Optional[Iterable[str]] = None) -> str:
+    """校验文件名和扩展名，返回小写扩展名（含点）"""
+    if not file_name:
+        raise UploadError("文件名不能为空", 400)
+    ext = os.path.splitext(file_name)[1].lower()
+    if allowed_exts is not None:
+        allowed = [e.lower() for e in allowed_exts]
+        if ext not in allowed:
+            raise UploadError(f"不支持的文件格式，仅支持: {', '.join(allowed)}", 400)
+    return ext
+
+
+async def spool_upload(upload_file, dest_dir: str, file_name: str, max_bytes: int = 0,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> SpooledUpload:
+    """
+    把 UploadFile 按块写入 dest_dir/file_name
+
+    - max_bytes: 大小上限（0 表示不限制），超出时抛出 UploadError(413) 并删除已写入的内容
+    - 读取从文件当前位置开始，调用方不应提前 read()
+    - 打开、写入、替换文件都在线程池中执行
+    """
+    path = os.path.join(dest_dir, file_name)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        await asyncio.to_thread(os.makedirs, dest_dir, exist_ok=True)
+        out = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await upload_file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadError(
+                        f"文件大小不能超过 {_format_mb(max_bytes)}，已接收超过 {_format_mb(size)}", 413)
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        finally:
+            await asyncio.to_thread(out.close)
+        await asyncio.to_thread(os.replace, tmp_path, path)
+    except UploadError:
+        _remove_quietly(tmp_path)
+        raise
+    except OSError as e:
+        _remove_quietly(tmp_path)
+        raise UploadError(f"文件保存失败: {str(e)}", 500)
+    except BaseException:
+        # 客户端断开、请求被取消等情况也不能留下临时文件
+        _remove_quietly(tmp_path)
+        raise
+    return SpooledUpload(
+        path=path,
+        file_name=file_name,
+        original_name=getattr(upload_file, "filename", None) or file_name,
+        size=size,
+        sha256=digest.hexdigest(),
+    )
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+用户信息读穿缓存
+get_user_by_username 几乎在每个接口上都会调用（登录、资料、头像、历史记录、简历分析、改密码……），
+每次都要从连接池借连接查一次库。这里在它前面加一层进程内缓存：
+- 按 username 缓存整行用户数据，同时维护 id -> username 索引，按 id 查询也能命中
+- TTL + LRU：超过 ttl 秒过期，超过 max_entries 条时淘汰最久未访问的用户
+- 负缓存：查询成功但用户不存在时缓存一小段时间（negative_ttl），挡住对不存在用户名的反复查询；
+  查询出错不缓存
+- db_config 中修改用户的函数在写入后主动失效对应条目；失效时正在进行的加载结果不会写回缓存
+- 统计命中/未命中/负缓存命中/淘汰/失效次数
+
+本模块只依赖标准库
+"""
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+
+@dataclass
+class _CachedUser:
+    user: Optional[Dict]   # None 表示负缓存（用户不存在）
+    expires_at: float
+
+
+class UserCache:
+    """
+    线程安全的用户缓存
+
+    - ttl: 正常条目的存活秒数，<= 0 时缓存关闭（每次都直接查库）
+    - negative_ttl: 负缓存条目的存活秒数，<= 0 时不做负缓存
+    - max_entries: 最多缓存的用户数（含负缓存条目）
+    """
+
+    def __init__(self, ttl: int = 60, negative_ttl: int = 10, max_entries: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, _CachedUser]" = OrderedDict()
+        self._by_id: Dict[object, str] = {}
+        # 失效计数：加载开始时记下当前计数，写回时若该用户在此之后被失效过则放弃写回
+        self._counter = 0
+        self._invalidated_at: Dict[str, int] = {}
+        # 早于该计数开始的加载一律不写回（失效记录被整体清空后用它兜底）
+        self._floor = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _pop(self, username: str):
+        """移除一个条目及其 id 索引（需持有锁）"""
+        cached = self._data.pop(username, None)
+        if cached is not None and cached.user is not None:
+            self._by_id.pop(cached.user.get("id"), None)
+
+    def _lookup(self, username: str):
+        """返回 (是否命中, 用户副本)（需持有锁）"""
+        cached = self._data.get(username)
+        if cached is None:
+            return False, None
+        if cached.expires_at <= time.time():
+            self._pop(username)
+            return False, None
+        self._data.move_to_end(username)
+        if cached.user is None:
+            self._stats["negative_hits"] += 1
+            return True, None
+        self._stats["hits"] += 1
+        return True, dict(cached.user)
+
+    def _store(self, username: str, user: Optional[Dict], token: int):
+        """写入加载结果；加载期间被失效过则放弃（需持有锁）"""
+        if token < self._floor or self._invalidated_at.get(username, 0) > token:
+            return
+        ttl = self.ttl if user is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._pop(username)
+        self._data[username] = _CachedUser(dict(user) if user is not None else None, time.time() + ttl)
+        if user is not None and user.get("id") is not None:
+            self._by_id[user["id"]] = username
+        while len(self._data) > self.max_entries:
+            self._pop(next(iter(self._data)))
+            self._stats["evictions"] += 1
+
+    def get_by_username(self, username: str, loader: Callable[[str], Optional[Dict]]) -> Optional[Dict]:
+        """
+        读穿查询：命中直接返回副本，否则调用 loader(username) 查库并缓存
+
+        loader 查询成功时返回用户 dict 或 None（不存在），查询出错时应抛出异常（异常不缓存，原样抛出）
+        """
+        if not self.enabled:
+            return loader(username)
+        with self._lock:
+            hit, user = self._lookup(username)
+            if hit:
+                return user
+            self._stats["misses"] += 1
+            token = self._counter
+        user = loader(username)
+        with self._lock:
+            self._store(username, user, token)
+        return dict(user) if user is not None else None
+
+    def get_by_id(self, user_id, loader: Callable[[object], Optional[Dict]]) -> Optional[Dict]:
+        """按 id 查询：通过 id -> username 索引命中缓存，否则调用 loader(user_id) 查库"""
+        if not self.enabled:
+            return loader(user_id)
+        with self._lock:
+            username = self._by_id.get(user_id)
+            if username is not None:
+                hit, user = self._lookup(username)
+                if hit and user is not None:
+                    return user
+            self._stats["misses"] += 1
+            token = self._counter
+        user = loader(user_id)
+        if user is None:
+            # 不存在的 id 不做负缓存（没有 username 可作为键）
+            return None
+        with self._lock:
+            self._store(user.get("username"), user, token)
+        return dict(user)
+
+    async def aget_by_username(self, username: str, loader: Callable[[str], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """get_by_username 的异步版本（loader 为协程函数，供 db_async 使用），缓存与统计共用"""
+        if not self.enabled:
+            return await loader(username)
+        with self._lock:
+            hit, user = self._lookup(username)
+            if hit:
+                return user
+            self._stats["misses"] += 1
+            token = self._counter
+        user = await loader(username)
+        with self._lock:
+            self._store(username, user, token)
+        return dict(user) if user is not None else None
+
+    async def aget_by_id(self, user_id, loader: Callable[[object], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """get_by_id 的异步版本"""
+        if not self.enabled:
+            return await loader(user_id)
+        with self._lock:
+            username = self._by_id.get(user_id)
+            if username is not None:
+                hit, user = self._lookup(username)
+                if hit and user is not None:
+                    return user
+            self._stats["misses"] += 1
+            token = self._counter
+        user = await loader(user_id)
+        if user is None:
+            return None
+        with self._lock:
+            self._store(user.get("username"), user, token)
+        return dict(user)
+
+    def invalidate(self, username: str):
+        """用户数据被修改（或新建）后调用，删除正/负缓存条目并让进行中的加载结果作废"""
+        with self._lock:
+            self._counter += 1
+            self._invalidated_at[username] = self._counter
+            if len(self._invalidated_at) > self.max_entries:
+                # 失效记录只需覆盖 "加载进行中" 的窗口，过多时整体清空，此前开始的加载全部不写回
+                self._invalidated_at.clear()
+                self._floor = self._counter
+            self._pop(username)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._counter += 1
+            self._floor = self._counter
+            self._invalidated_at.clear()
+            self._data.clear()
+            self._by_id.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["negative_hits"] + self._stats["misses"]
+            hit_rate = (self._stats["hits"] + self._stats["negative_hits"]) / lookups if lookups else 0.0
+            return dict(
+                self._stats,
+                entries=len(self._data),
+                hit_rate=round(hit_rate, 4),
+                ttl=self.ttl,
+                negative_ttl=self.negative_ttl,
+                max_entries=self.max_entries,
+            )